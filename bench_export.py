@@ -0,0 +1,142 @@
+# ISG_Project/bench_export.py
+"""
+Benchmarks project export on a synthetic, image-heavy project.
+
+Builds a throwaway database and upload folder, fills a project with pages that each
+reference an image (random bytes behind real JPEG/PNG/GIF headers, i.e. as incompressible
+as real photos) plus a few SVGs, then times build_project_archive() under several
+compression policies and prints CPU time and archive size for each.
+
+    python bench_export.py [--pages 50] [--images 200] [--image-kb 200] [--repeat 3]
+"""
+import os
+import json
+import io
+import time
+import shutil
+import argparse
+import tempfile
+
+from werkzeug.datastructures import FileStorage
+
+from internal_site_generator import create_app, db
+from internal_site_generator.config import Config
+from internal_site_generator.models import PageTemplate, WebsiteProject, ProjectPage
+from internal_site_generator.rendering import apply_injection_plan, apply_placeholder_schema
+from internal_site_generator.asset_storage import add_project_asset
+from internal_site_generator.export import build_project_archive
+
+IMAGE_HEADERS = {
+    'jpg': b'\xff\xd8\xff\xe0\x00\x10JFIF\x00',
+    'png': b'\x89PNG\r\n\x1a\n',
+    'gif': b'GIF89a',
+}
+
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="200">'
+    + ''.join(f'<circle cx="{i * 7 % 200}" cy="{i * 13 % 200}" r="{i % 9 + 1}" fill="#{i * 40503 % 0xffffff:06x}"/>' for i in range(400))
+    + '</svg>'
+)
+
+PAGE_TEMPLATE_HTML = '''<!DOCTYPE html>
+<html><head><title>{{ hero.title }}</title></head>
+<body>
+<!-- CUSTOM MARKER -->
+<h1>{{ hero.title }}</h1>
+<img src="{{ hero.image }}" alt="">
+<p>{{ body.text }}</p>
+</body></html>'''
+
+# (label, config overrides) -- "before" is the old deflate-everything behaviour.
+POLICIES = [
+    ('before: deflate all, level 6', {'EXPORT_STORED_EXTENSIONS': set(), 'EXPORT_DEFLATE_LEVEL': 6}),
+    ('after: store images, level 6', {}),
+    ('after: store images, level 1', {'EXPORT_DEFLATE_LEVEL': 1}),
+    ('after: store images, level 9', {'EXPORT_DEFLATE_LEVEL': 9}),
+]
+
+
+def build_project(app, pages, images, image_kb):
+    with app.app_context():
+        db.create_all()
+        template = PageTemplate(name='Bench Template', html_content=PAGE_TEMPLATE_HTML)
+        apply_injection_plan(template)
+        apply_placeholder_schema(template)
+        project = WebsiteProject(project_name='Bench Project', global_css='body { margin: 0; }' * 50)
+        db.session.add_all([template, project])
+        db.session.commit()
+
+        extensions = list(IMAGE_HEADERS)
+        stored_names = []
+        for i in range(images):
+            extension = extensions[i % len(extensions)]
+            data = IMAGE_HEADERS[extension] + os.urandom(image_kb * 1024)
+            upload = FileStorage(io.BytesIO(data), filename=f'image{i}.{extension}')
+            stored_names.append(add_project_asset(project.id, 'image', upload).stored_filename)
+        for i in range(max(images // 20, 1)):
+            upload = FileStorage(io.BytesIO(SVG_TEMPLATE.replace('200', str(200 + i)).encode()), filename=f'icon{i}.svg')
+            stored_names.append(add_project_asset(project.id, 'image', upload).stored_filename)
+
+        for i in range(pages):
+            content = {
+                'hero.title': f'Page {i}',
+                'hero.image': stored_names[i % len(stored_names)],
+                'body.text': 'Lorem ipsum dolor sit amet. ' * 200,
+            }
+            db.session.add(ProjectPage(
+                title=f'Page {i}', slug=f'page-{i}' if i else 'index',
+                website_project_id=project.id, page_template_id=template.id,
+                content_data_json=json.dumps(content)
+            ))
+        db.session.commit()
+        return project.id
+
+
+def run_export(app, project_id):
+    with app.test_request_context():
+        project = db.session.get(WebsiteProject, project_id)
+        with tempfile.TemporaryFile() as out:
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            build_project_archive(out, project)
+            cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+            size = out.tell()
+        db.session.remove()
+    return cpu, wall, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--image-kb', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per policy; the fastest is reported.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='isg-bench-')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        EXPORT_RENDER_CACHE_DIR = os.path.join(workdir, 'render_cache')
+        PAGE_TEMPLATE_BYTECODE_CACHE = False
+
+    try:
+        app = create_app(BenchConfig)
+        project_id = build_project(app, args.pages, args.images, args.image_kb)
+        print(f"{args.pages} pages, {args.images} images x {args.image_kb} KB, {max(args.images // 20, 1)} SVGs\n")
+
+        run_export(app, project_id) # Warm the render cache so only packing is measured
+        defaults = {key: app.config[key] for key in ('EXPORT_STORED_EXTENSIONS', 'EXPORT_DEFLATE_LEVEL')}
+        print(f"{'policy':<32} {'cpu s':>8} {'wall s':>8} {'archive MB':>11}")
+        for label, overrides in POLICIES:
+            app.config.update(defaults)
+            app.config.update(overrides)
+            runs = [run_export(app, project_id) for _ in range(args.repeat)]
+            cpu, wall, size = min(runs)
+            print(f"{label:<32} {cpu:>8.3f} {wall:>8.3f} {size / 1024 / 1024:>11.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# ISG_Project/bench_sqlite.py
+"""
+Benchmarks concurrent SQLite reads and writes with and without SQLITE_PRAGMAS.
+
+For each profile builds a throwaway database holding a few projects with pages and
+navbars, then runs reader threads (page list, page + template lookup, navbar join, the
+queries behind editing and previews) alongside writer threads (page content saves and
+navbar reorders, each its own commit) for a fixed time, and prints operations per
+second and the "database is locked" errors each profile hit.
+
+    python bench_sqlite.py [--readers 8] [--writers 2] [--seconds 5] [--projects 4] [--pages 100]
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from internal_site_generator import create_app, db
+from internal_site_generator.config import Config
+from internal_site_generator.models import PageTemplate, WebsiteProject, ProjectPage, NavbarItem
+
+PAGE_TEMPLATE_HTML = '''<!DOCTYPE html>
+<html><head><title>{{ hero.title }}</title></head>
+<body><h1>{{ hero.title }}</h1><p>{{ body.text }}</p></body></html>'''
+
+# (label, SQLITE_PRAGMAS) -- "default" is SQLite's rollback journal with a full fsync per commit.
+PROFILES = [
+    ('default', {}),
+    ('tuned (Config.SQLITE_PRAGMAS)', Config.SQLITE_PRAGMAS),
+]
+
+
+def build_database(app, projects, pages):
+    with app.app_context():
+        db.create_all()
+        template = PageTemplate(name='Bench Template', html_content=PAGE_TEMPLATE_HTML)
+        db.session.add(template)
+        db.session.flush()
+        for p in range(projects):
+            project = WebsiteProject(project_name=f'Bench Project {p}', global_css='body { margin: 0; }')
+            db.session.add(project)
+            db.session.flush()
+            for i in range(pages):
+                page = ProjectPage(
+                    title=f'Page {i}', slug=f'page-{i}' if i else 'index',
+                    website_project_id=project.id, page_template_id=template.id,
+                    content_data_json=json.dumps({'hero.title': f'Page {i}', 'body.text': 'Lorem ipsum. ' * 100})
+                )
+                db.session.add(page)
+                db.session.flush()
+                if i < 8:
+                    db.session.add(NavbarItem(website_project_id=project.id, project_page_id=page.id,
+                                              link_text=page.title, order=i))
+        db.session.commit()
+        return db.session.scalars(select(WebsiteProject.id)).all()
+
+
+def read_once(rng, project_ids):
+    project_id = rng.choice(project_ids)
+    pages = db.session.scalars(
+        select(ProjectPage).where(ProjectPage.website_project_id == project_id).order_by(ProjectPage.title)
+    ).all()
+    page = rng.choice(pages)
+    page.template.name
+    db.session.execute(
+        select(NavbarItem.link_text, ProjectPage.slug)
+        .join(ProjectPage, NavbarItem.project_page_id == ProjectPage.id)
+        .where(NavbarItem.website_project_id == project_id).order_by(NavbarItem.order)
+    ).all()
+
+
+def write_once(rng, project_ids):
+    project_id = rng.choice(project_ids)
+    if rng.random() < 0.8:
+        page = db.session.scalars(
+            select(ProjectPage).where(ProjectPage.website_project_id == project_id).limit(1)
+            .offset(rng.randrange(20))
+        ).first()
+        page.content_data_json = json.dumps({'hero.title': page.title, 'body.text': f'Edit {rng.random()} ' * 100})
+    else:
+        items = db.session.scalars(select(NavbarItem).where(NavbarItem.website_project_id == project_id)).all()
+        for item, order in zip(items, rng.sample(range(len(items)), len(items))):
+            item.order = order
+        db.session.get(WebsiteProject, project_id).bump_navbar_version()
+    db.session.commit()
+
+
+def worker(app, operation, project_ids, deadline, counts, seed):
+    rng = random.Random(seed)
+    done = errors = 0
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                operation(rng, project_ids)
+                done += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+            finally:
+                if operation is read_once:
+                    db.session.rollback() # End the read transaction like the end of a request does
+        db.session.remove()
+    with counts['lock']:
+        counts[operation.__name__] += done
+        counts['errors'] += errors
+
+
+def run_profile(workdir, name, pragmas, args):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, f'{name}.db')
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': args.readers + args.writers}
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        PAGE_TEMPLATE_BYTECODE_CACHE = False
+        SQLITE_PRAGMAS = pragmas
+
+    app = create_app(BenchConfig)
+    project_ids = build_database(app, args.projects, args.pages)
+    counts = {'lock': threading.Lock(), 'read_once': 0, 'write_once': 0, 'errors': 0}
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(app, operation, project_ids, deadline, counts, seed))
+        for seed, operation in enumerate([read_once] * args.readers + [write_once] * args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+    return counts['read_once'] / args.seconds, counts['write_once'] / args.seconds, counts['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--projects', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='isg-bench-')
+    try:
+        print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s, "
+              f"{args.projects} projects x {args.pages} pages\n")
+        print(f"{'profile':<32} {'reads/s':>9} {'writes/s':>9} {'lock errors':>12}")
+        for index, (label, pragmas) in enumerate(PROFILES):
+            reads, writes, errors = run_profile(workdir, f'bench{index}', pragmas, args)
+            print(f"{label:<32} {reads:>9.0f} {writes:>9.0f} {errors:>12}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,10 +27,21 @@ def create_app(config_class=Config):
             raise
 
     db.init_app(app)
+    from . import sqlite_tuning
+    sqlite_tuning.init_app(app, db)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app) # <--- INITIALIZE CSRFProtect WITH THE APP
 
+    from . import rendering
+    rendering.init_app(app)
+
+    from . import compression
+    compression.init_app(app)
+
+    from . import asset_gc
+    asset_gc.init_app(app)
+
     from .models import User
 
     @login_manager.user_loader
@@ -43,8 +54,32 @@ def create_app(config_class=Config):
     from .main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from .cli import register_commands
+    register_commands(app)
+
     @app.route('/test_init/')
     def test_init_page():
         return '<h1>Testing the Flask Application Factory from __init__.py!</h1>'
 
     return app
+
+
+def create_render_worker_app(config_class=Config):
+    """
+    The part of create_app() an export render worker process needs: config, the database
+    and the page template environment. No asset GC, SQLite tuning, login, CSRF or CLI.
+    Only the main blueprint is registered, so url_for() in page templates resolves as it
+    does in the web process.
+    """
+    app = Flask(__name__, instance_relative_config=True)
+    app.config.from_object(config_class)
+
+    db.init_app(app)
+
+    from . import rendering
+    rendering.init_app(app)
+
+    from .main import bp as main_bp
+    app.register_blueprint(main_bp)
+
+    return app
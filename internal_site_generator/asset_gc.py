@@ -0,0 +1,328 @@
+# ISG_Project/internal_site_generator/asset_gc.py
+import os
+import json
+import time
+import shutil
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, or_
+from sqlalchemy.orm import joinedload
+from .models import db, WebsiteProject, ProjectPage, ProjectAsset, AssetBlob
+from .asset_storage import (
+    ASSET_TYPE_DISK_FOLDERS, blob_root, legacy_asset_path,
+    release_project_asset, purge_unreferenced_blobs
+)
+
+# fcntl is POSIX-only; elsewhere every process runs its own periodic collection.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+GC_LOCK_FILENAME = 'asset_gc.lock'
+
+_gc_thread = None
+_gc_thread_lock = threading.Lock()
+
+
+class GCReport:
+    """What a collection removed (or, for a dry run, would remove)."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.assets = [] # (project_id, stored_filename, size)
+        self.blobs = []  # (sha256, size)
+        self.files = []  # (path, size)
+        self.legacy_bytes = 0 # Files of legacy (pre-blob) assets; other asset bytes are freed with their blobs
+        self.skipped_projects = set() # Projects with unreadable page content, left untouched
+
+    @property
+    def bytes_reclaimed(self):
+        return self.legacy_bytes + sum(size for _sha, size in self.blobs) + sum(size for _path, size in self.files)
+
+    def lines(self):
+        verb = 'Would remove' if self.dry_run else 'Removed'
+        yield f"{verb} {len(self.assets)} unreferenced asset(s):"
+        for project_id, stored_filename, _size in self.assets:
+            yield f"  project {project_id}: {stored_filename}"
+        yield f"{verb} {len(self.blobs)} unreferenced blob(s)."
+        yield f"{verb} {len(self.files)} file(s) with no database row:"
+        for path, _size in self.files:
+            yield f"  {path}"
+        if self.skipped_projects:
+            yield f"Skipped projects with unreadable page content: {', '.join(map(str, sorted(self.skipped_projects)))}"
+        yield f"{self.bytes_reclaimed} bytes {'reclaimable' if self.dry_run else 'reclaimed'}."
+
+
+def build_reference_index(batch_size):
+    """
+    {project_id: stored filenames referenced by its pages' content or its favicon}, plus
+    the set of projects with page content that cannot be parsed. Every string value in
+    content_data_json counts, whatever the field, so nothing in use is ever collected.
+    """
+    index = {}
+    unreadable = set()
+    for project_id, favicon_path in db.session.query(WebsiteProject.id, WebsiteProject.favicon_path):
+        index[project_id] = {favicon_path} if favicon_path else set()
+
+    last_id = 0
+    while True:
+        rows = db.session.query(ProjectPage.id, ProjectPage.website_project_id, ProjectPage.content_data_json)\
+            .filter(ProjectPage.id > last_id).order_by(ProjectPage.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for page_id, project_id, content_json in rows:
+            if not content_json:
+                continue
+            try:
+                content = json.loads(content_json)
+            except json.JSONDecodeError:
+                current_app.logger.warning(f"Asset GC: page {page_id} has unreadable content; keeping all assets of project {project_id}")
+                unreadable.add(project_id)
+                continue
+            if isinstance(content, dict):
+                index.setdefault(project_id, set()).update(v for v in content.values() if isinstance(v, str))
+    return index, unreadable
+
+
+def _is_referenced(asset, referenced):
+    # Derivatives count through their parent: naming a variant directly keeps the original too.
+    if asset.stored_filename in referenced:
+        return True
+    return any(d.stored_filename in referenced for d in asset.derivatives)
+
+
+def _last_used(asset):
+    return max((t for t in (asset.created_at, asset.last_referenced_at) if t), default=None)
+
+
+def _claim_unreferenced(asset, cutoff):
+    """
+    Write-locks the asset row for the delete; False if an upload has reused it since the
+    batch was read. Uploads that reuse it later wait for the commit and then find it gone.
+    """
+    result = db.session.execute(
+        update(ProjectAsset).where(
+            ProjectAsset.id == asset.id,
+            or_(ProjectAsset.last_referenced_at.is_(None), ProjectAsset.last_referenced_at <= cutoff)
+        ).values(last_referenced_at=ProjectAsset.last_referenced_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _collect_assets(report, index, batch_size, cutoff):
+    """
+    Releases unreferenced ProjectAssets, committing per batch. Their blobs are purged by
+    _collect_blobs(); for a dry run, returns {blob_id: references that would be dropped}.
+    """
+    dropped = {}
+    last_id = 0
+    while True:
+        batch = ProjectAsset.query.options(joinedload(ProjectAsset.blob))\
+            .filter(ProjectAsset.id > last_id).order_by(ProjectAsset.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for asset in batch:
+            project_id = asset.website_project_id
+            last_used = _last_used(asset)
+            if project_id in report.skipped_projects or (last_used and last_used > cutoff):
+                continue
+            if _is_referenced(asset, index.get(project_id, ())):
+                continue
+            if not report.dry_run and not _claim_unreferenced(asset, cutoff):
+                continue
+            if asset.blob is not None:
+                size = asset.blob.size
+            else:
+                path = legacy_asset_path(asset)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                report.legacy_bytes += size
+            report.assets.append((project_id, asset.stored_filename, size))
+            if report.dry_run:
+                for blob_id in [asset.blob_id] + [d.blob_id for d in asset.derivatives]:
+                    if blob_id is not None:
+                        dropped[blob_id] = dropped.get(blob_id, 0) + 1
+            else:
+                release_project_asset(asset)
+
+        if not report.dry_run:
+            db.session.commit()
+        db.session.expunge_all()
+    return dropped
+
+
+def _collect_blobs(report, dropped, batch_size):
+    """Blob rows no asset or derivative refers to any more, purged batch_size at a time."""
+    candidates = AssetBlob.query.filter(AssetBlob.ref_count <= 0).all()
+    dropped_ids = list(dropped)
+    for start in range(0, len(dropped_ids), batch_size):
+        candidates.extend(AssetBlob.query.filter(
+            AssetBlob.ref_count > 0, AssetBlob.id.in_(dropped_ids[start:start + batch_size])
+        ))
+
+    blob_ids = []
+    for blob in candidates:
+        if blob.ref_count - dropped.get(blob.id, 0) <= 0:
+            report.blobs.append((blob.sha256, blob.size))
+            blob_ids.append(blob.id)
+    if not report.dry_run:
+        for start in range(0, len(blob_ids), batch_size):
+            purge_unreferenced_blobs(blob_ids[start:start + batch_size])
+
+
+def _file_is_settled(path, cutoff_ts):
+    # Uploads write the file before committing its row; leave young files alone.
+    try:
+        return os.path.getmtime(path) < cutoff_ts
+    except OSError:
+        return False
+
+
+def _remove_stray(report, path, cutoff_ts):
+    if not _file_is_settled(path, cutoff_ts):
+        return
+    size = os.path.getsize(path) if os.path.isfile(path) else sum(
+        os.path.getsize(os.path.join(d, f)) for d, _dirs, files in os.walk(path) for f in files
+    )
+    report.files.append((path, size))
+    if report.dry_run:
+        return
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError as e:
+        current_app.logger.error(f"Asset GC could not delete {path}: {e}")
+
+
+def _collect_blob_files(report, cutoff_ts, removed_shas, batch_size):
+    root = blob_root()
+    if not os.path.isdir(root):
+        return
+    for fan_out in sorted(os.listdir(root)):
+        directory = os.path.join(root, fan_out)
+        if fan_out.startswith('.upload-'):
+            _remove_stray(report, directory, cutoff_ts) # Temp file of an interrupted upload
+            continue
+        if len(fan_out) != 2 or not os.path.isdir(directory):
+            continue
+        names = os.listdir(directory)
+        known = set()
+        for start in range(0, len(names), batch_size):
+            chunk = names[start:start + batch_size]
+            known.update(sha for (sha,) in db.session.query(AssetBlob.sha256).filter(AssetBlob.sha256.in_(chunk)))
+        for name in names:
+            # In a dry run, blobs that would be purged above still have rows; count their files once.
+            if name not in known and name not in removed_shas:
+                _remove_stray(report, os.path.join(directory, name), cutoff_ts)
+
+
+def _collect_legacy_files(report, cutoff_ts):
+    """Files under UPLOAD_FOLDER/<project_id>/<type>/ with no legacy ProjectAsset row."""
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(upload_root):
+        return
+    project_ids = {project_id for (project_id,) in db.session.query(WebsiteProject.id)}
+    for entry in sorted(os.listdir(upload_root)):
+        directory = os.path.join(upload_root, entry)
+        if not entry.isdigit() or not os.path.isdir(directory):
+            continue # blobs/, upload_sessions/ and anything else that is not a project folder
+        project_id = int(entry)
+        if project_id not in project_ids:
+            _remove_stray(report, directory, cutoff_ts)
+            continue
+        legacy_names = {
+            (asset_type, name) for asset_type, name in db.session.query(ProjectAsset.asset_type, ProjectAsset.stored_filename)
+            .filter(ProjectAsset.website_project_id == project_id, ProjectAsset.blob_id.is_(None))
+        }
+        for asset_type, folder in ASSET_TYPE_DISK_FOLDERS.items():
+            type_directory = os.path.join(directory, folder)
+            if not os.path.isdir(type_directory):
+                continue
+            for name in os.listdir(type_directory):
+                if (asset_type, name) not in legacy_names:
+                    _remove_stray(report, os.path.join(type_directory, name), cutoff_ts)
+
+
+def collect_garbage(dry_run=False, batch_size=None, min_age=None):
+    """
+    Removes assets no page or favicon refers to, blobs no asset refers to, and upload
+    files with no row at all. Assets and files younger than min_age seconds
+    (ASSET_GC_MIN_AGE) are kept, as they may belong to an upload still in flight;
+    for an asset an upload deduplicated onto, the age counts from that upload.
+    Commits once per batch. Returns a GCReport; with dry_run nothing is changed.
+    """
+    batch_size = batch_size or current_app.config.get('ASSET_GC_BATCH_SIZE', 200)
+    min_age = current_app.config.get('ASSET_GC_MIN_AGE', 60 * 60) if min_age is None else min_age
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    cutoff_ts = time.time() - min_age
+
+    report = GCReport(dry_run)
+    index, report.skipped_projects = build_reference_index(batch_size)
+    dropped = _collect_assets(report, index, batch_size, cutoff)
+    _collect_blobs(report, dropped, batch_size)
+    _collect_blob_files(report, cutoff_ts, {sha for sha, _size in report.blobs} if dry_run else set(), batch_size)
+    _collect_legacy_files(report, cutoff_ts)
+
+    current_app.logger.info(
+        f"Asset GC{' (dry run)' if dry_run else ''}: {len(report.assets)} assets, {len(report.blobs)} blobs, "
+        f"{len(report.files)} stray files, {report.bytes_reclaimed} bytes"
+    )
+    return report
+
+
+# --- Periodic collection ---
+def init_app(app):
+    """Runs collect_garbage() every ASSET_GC_INTERVAL seconds once the app serves requests (off when None)."""
+    if not app.config.get('ASSET_GC_INTERVAL'):
+        return
+
+    @app.before_request
+    def _start_asset_gc():
+        # Started from a request, not at import, so CLI commands such as `flask db upgrade` never collect.
+        if _gc_thread is None:
+            _start_gc_thread(app)
+
+
+def _start_gc_thread(app):
+    global _gc_thread
+    with _gc_thread_lock:
+        if _gc_thread is None:
+            _gc_thread = threading.Thread(target=_gc_loop, args=(app,), name='asset-gc', daemon=True)
+            _gc_thread.start()
+
+
+def _gc_loop(app):
+    interval = app.config['ASSET_GC_INTERVAL']
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                _run_exclusively(app)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Periodic asset GC failed: {e}", exc_info=True)
+            finally:
+                db.session.remove()
+
+
+def _run_exclusively(app):
+    """With several server processes, only the one holding the lock file collects this round."""
+    if fcntl is None:
+        collect_garbage()
+        return
+    with open(os.path.join(app.instance_path, GC_LOCK_FILENAME), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        try:
+            collect_garbage()
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
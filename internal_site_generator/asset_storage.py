@@ -0,0 +1,269 @@
+# ISG_Project/internal_site_generator/asset_storage.py
+import os
+import uuid
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update, delete, func
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from .models import db, ProjectAsset, AssetBlob, AssetDerivative
+
+# Where asset types from ProjectAsset are stored on disk relative to UPLOAD_FOLDER/<project_id>/,
+# for legacy assets saved before blob storage. This should match the `serve_asset` route's subfolder logic.
+ASSET_TYPE_DISK_FOLDERS = {
+    'image': 'images',
+    'favicon': 'favicons',
+}
+
+
+def blob_root():
+    return current_app.config.get('ASSET_BLOB_FOLDER') or \
+        os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs')
+
+
+def blob_path(sha256):
+    """Blobs are fanned out by the first two hex digits to keep directories small."""
+    return os.path.join(blob_root(), sha256[:2], sha256)
+
+
+def legacy_asset_path(asset):
+    return os.path.join(
+        current_app.config['UPLOAD_FOLDER'],
+        str(asset.website_project_id),
+        ASSET_TYPE_DISK_FOLDERS.get(asset.asset_type, asset.asset_type),
+        asset.stored_filename
+    )
+
+
+def asset_file_path(asset):
+    """Path of the file holding an asset's bytes, whether blob-backed or legacy."""
+    if asset.blob_id is not None:
+        return blob_path(asset.blob.sha256)
+    return legacy_asset_path(asset)
+
+
+def store_blob(stream):
+    """
+    Streams `stream` to disk while hashing it and returns the AssetBlob for its digest,
+    creating it if these bytes have not been stored before. The blob is added to the
+    session but its ref_count is left to the caller (see add_project_asset).
+    """
+    root = blob_root()
+    os.makedirs(root, exist_ok=True)
+    chunk_size = current_app.config.get('UPLOAD_CHUNK_SIZE', 64 * 1024)
+
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix='.upload-')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return store_blob_file(tmp_path, digest.hexdigest(), size, move=True)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def store_blob_file(path, sha256, size, move=False):
+    """
+    Returns the AssetBlob for a file already on disk whose digest the caller computed.
+    With move set the file is renamed into blob storage (if these bytes are new);
+    otherwise it is hard-linked, or copied across filesystems, and left in place.
+
+    An existing row is claimed with an UPDATE before its file is checked: that write
+    holds purge_unreferenced_blobs() off until the caller commits its reference, and a
+    row purged since the lookup is stored again from scratch.
+    """
+    blob = AssetBlob.query.filter_by(sha256=sha256).first()
+    if blob is not None and not _claim_blob(blob):
+        db.session.expunge(blob)
+        blob = None
+    final_path = blob_path(sha256)
+    if blob is None or not os.path.exists(final_path):
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        if move:
+            os.replace(path, final_path)
+        else:
+            # Link or copy to a temp name first so the blob path only ever holds complete files.
+            tmp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, final_path)
+
+    if blob is None:
+        try:
+            with db.session.begin_nested():
+                blob = AssetBlob(sha256=sha256, size=size, ref_count=0)
+                db.session.add(blob)
+        except IntegrityError:
+            # Another request stored the same bytes first.
+            blob = AssetBlob.query.filter_by(sha256=sha256).one()
+    return blob
+
+
+def _claim_blob(blob):
+    """Write-locks a blob row for the rest of the transaction; False if it has been deleted."""
+    result = db.session.execute(
+        update(AssetBlob).where(AssetBlob.id == blob.id).values(ref_count=AssetBlob.ref_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _touch_asset(asset):
+    """
+    Marks a reused asset as just referenced, so asset GC's minimum age starts over, and
+    write-locks its row for the rest of the transaction; False if it has been deleted.
+    """
+    result = db.session.execute(
+        update(ProjectAsset).where(ProjectAsset.id == asset.id).values(last_referenced_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def add_project_asset(project_id, asset_type, file, stored_filename_stem=None):
+    """
+    Stores an uploaded FileStorage for a project and returns its ProjectAsset (not committed).
+    Uploading bytes the project already has as the same asset type returns the existing
+    asset, so the file is referenced, and exported, once.
+    """
+    blob = store_blob(file.stream)
+    return add_project_asset_for_blob(project_id, asset_type, blob, file.filename, stored_filename_stem)
+
+
+def add_project_asset_for_blob(project_id, asset_type, blob, filename, stored_filename_stem=None):
+    """add_project_asset() for bytes already in blob storage (e.g. a finished chunked upload)."""
+    original_filename = secure_filename(filename)
+    extension = original_filename.rsplit('.', 1)[1].lower()
+    existing_assets = ProjectAsset.query.filter_by(
+        website_project_id=project_id, asset_type=asset_type, blob_id=blob.id
+    ).all()
+    for existing in existing_assets:
+        # Same bytes under another extension would be served with the wrong type; keep those apart.
+        if existing.stored_filename.rsplit('.', 1)[-1].lower() == extension and _touch_asset(existing):
+            return existing
+
+    stored_filename = f"{stored_filename_stem or uuid.uuid4().hex}.{extension}"
+    asset = ProjectAsset(
+        website_project_id=project_id, asset_type=asset_type,
+        original_filename=original_filename, stored_filename=stored_filename,
+        blob=blob
+    )
+    db.session.add(asset)
+    blob.ref_count = AssetBlob.ref_count + 1 # Incremented in SQL, safe against concurrent uploads
+    return asset
+
+
+def adopt_legacy_asset(asset):
+    """
+    Moves a legacy asset's bytes into blob storage (not committed). Returns the legacy
+    file's path, to delete after the commit, or None if the file is missing.
+    """
+    legacy_path = legacy_asset_path(asset)
+    if not os.path.exists(legacy_path):
+        return None
+    with open(legacy_path, 'rb') as f:
+        blob = store_blob(f)
+    asset.blob = blob
+    blob.ref_count = AssetBlob.ref_count + 1
+    return legacy_path
+
+
+def _drop_blob_references(blob_counts):
+    for blob_id, count in blob_counts.items():
+        db.session.execute(
+            update(AssetBlob).where(AssetBlob.id == blob_id).values(ref_count=AssetBlob.ref_count - count)
+        )
+
+
+def release_project_asset(asset):
+    """
+    Deletes an asset row and its derivatives (not committed) and drops their blob
+    references. Legacy files are removed right away. Returns the blob ids to hand to
+    purge_unreferenced_blobs() once the session has been committed.
+    """
+    blob_counts = {}
+    for derivative in asset.derivatives:
+        blob_counts[derivative.blob_id] = blob_counts.get(derivative.blob_id, 0) + 1
+    if asset.blob_id is not None:
+        blob_counts[asset.blob_id] = blob_counts.get(asset.blob_id, 0) + 1
+    _drop_blob_references(blob_counts)
+    if asset.blob_id is None:
+        legacy_path = legacy_asset_path(asset)
+        if os.path.exists(legacy_path):
+            try:
+                os.remove(legacy_path)
+            except OSError as e:
+                current_app.logger.error(f"Error deleting asset file {legacy_path}: {e}")
+    db.session.delete(asset)
+    return list(blob_counts)
+
+
+def release_project_assets(project_id):
+    """
+    Drops the blob references held by all of a project's assets and their derivatives
+    (rows are left to the caller). Returns the blob ids.
+    """
+    blob_counts = dict(
+        db.session.query(ProjectAsset.blob_id, func.count(ProjectAsset.id))
+        .filter(ProjectAsset.website_project_id == project_id, ProjectAsset.blob_id.isnot(None))
+        .group_by(ProjectAsset.blob_id)
+        .all()
+    )
+    derivative_counts = db.session.query(AssetDerivative.blob_id, func.count(AssetDerivative.id))\
+        .join(ProjectAsset, AssetDerivative.project_asset_id == ProjectAsset.id)\
+        .filter(ProjectAsset.website_project_id == project_id)\
+        .group_by(AssetDerivative.blob_id)
+    for blob_id, count in derivative_counts:
+        blob_counts[blob_id] = blob_counts.get(blob_id, 0) + count
+    _drop_blob_references(blob_counts)
+    return list(blob_counts)
+
+
+def purge_unreferenced_blobs(blob_ids=None):
+    """
+    Deletes blobs no asset references any more. Limited to blob_ids if given.
+    Returns the number of blobs removed.
+
+    Each row is deleted only while its ref_count is still <= 0, so a reference taken
+    after the candidates were read keeps the blob. A file is removed only once its row
+    is gone and before the commit: store_blob_file() cannot claim the row in between,
+    and once the commit lands it stores the bytes again rather than trusting a file
+    this purge is about to delete.
+    """
+    query = db.session.query(AssetBlob.id, AssetBlob.sha256).filter(AssetBlob.ref_count <= 0)
+    if blob_ids is not None:
+        blob_ids = [blob_id for blob_id in blob_ids if blob_id is not None]
+        if not blob_ids:
+            return 0
+        query = query.filter(AssetBlob.id.in_(blob_ids))
+
+    removed = 0
+    for blob_id, sha256 in query.all():
+        result = db.session.execute(
+            delete(AssetBlob).where(AssetBlob.id == blob_id, AssetBlob.ref_count <= 0)
+        )
+        if result.rowcount != 1:
+            continue # Referenced again since it was read
+        removed += 1
+        path = blob_path(sha256)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.error(f"Error deleting blob file {path}: {e}")
+    db.session.commit()
+    return removed
@@ -0,0 +1,72 @@
+# ISG_Project/internal_site_generator/cache.py
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A small thread-safe, process-wide least-recently-used cache.
+    Entries beyond `maxsize` are evicted oldest-first.
+    """
+    _missing = object()
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, self._missing)
+            if value is self._missing:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while self.maxsize is not None and len(self._data) > max(self.maxsize, 0):
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """
+        Returns the cached value for `key`, calling `factory()` to build it on a miss.
+        The factory runs outside the lock; if it raises, nothing is cached.
+        """
+        value = self.get(key, self._missing)
+        if value is self._missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def discard_where(self, predicate):
+        """Removes every entry whose key satisfies predicate(key). Returns the number removed."""
+        with self._lock:
+            stale_keys = [key for key in self._data if predicate(key)]
+            for key in stale_keys:
+                del self._data[key]
+            return len(stale_keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,288 @@
+# ISG_Project/internal_site_generator/chunked_uploads.py
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from flask import current_app
+from werkzeug.utils import secure_filename
+from .asset_storage import store_blob_file, add_project_asset_for_blob
+
+# fcntl is POSIX-only; elsewhere chunk appends are only serialized within a process.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Each upload lives in <upload session root>/<upload_id>/ as session.json plus the bytes received so far.
+# The size of the data file is the acknowledged offset, so a restart loses nothing that was written.
+SESSION_FILENAME = 'session.json'
+SESSION_DATA_FILENAME = 'data'
+# Held (flock) around the offset check and the append, so server processes take turns.
+SESSION_LOCK_FILENAME = 'lock'
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Running digests of the data files, so each chunk is hashed once: {upload_id: (offset, hasher)}.
+# hashlib objects cannot be persisted; another process or a restart rehashes the file once.
+_hashers = {}
+_session_locks = {}
+_state_lock = threading.Lock()
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk was sent for an offset other than the one the server has acknowledged."""
+
+    def __init__(self, expected_offset):
+        super().__init__(f"Upload is at offset {expected_offset}.")
+        self.expected_offset = expected_offset
+
+
+def upload_session_root():
+    return current_app.config.get('UPLOAD_SESSION_DIR') or \
+        os.path.join(current_app.config['UPLOAD_FOLDER'], 'upload_sessions')
+
+
+class UploadSession:
+    """A resumable upload of one project asset, sent as a sequence of chunks."""
+
+    def __init__(self, upload_id, project_id, directory, filename, size, sha256=None, created_at=None):
+        self.id = upload_id
+        self.project_id = project_id
+        self.directory = directory
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.created_at = created_at if created_at is not None else time.time()
+
+    @property
+    def data_path(self):
+        return os.path.join(self.directory, SESSION_DATA_FILENAME)
+
+    @property
+    def offset(self):
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            return 0
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'filename': self.filename,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data, directory):
+        return cls(
+            data['id'], data['project_id'], directory, data['filename'], data['size'],
+            sha256=data.get('sha256'), created_at=data.get('created_at')
+        )
+
+    def save(self):
+        session_path = os.path.join(self.directory, SESSION_FILENAME)
+        tmp_path = f"{session_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, session_path)
+
+
+def _session_lock(upload_id):
+    with _state_lock:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+
+@contextmanager
+def _locked_session(session):
+    """
+    Exclusive access to a session's data file across threads and server processes.
+    Offsets must be read after entering: another process may have appended meanwhile.
+    """
+    with _session_lock(session.id):
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(os.path.join(session.directory, SESSION_LOCK_FILENAME), 'a')
+        except FileNotFoundError:
+            raise ValueError('The upload session no longer exists.')
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _forget_session(upload_id):
+    with _state_lock:
+        _hashers.pop(upload_id, None)
+        _session_locks.pop(upload_id, None)
+
+
+def create_upload_session(project_id, filename, size, sha256=None):
+    """
+    Starts a chunked upload of `size` bytes for a project. The caller validates the
+    filename's extension; size and the optional expected sha256 are checked here.
+    Raises ValueError for a bad request.
+    """
+    cleanup_expired_upload_sessions()
+
+    filename = secure_filename(filename or '')
+    if '.' not in filename:
+        raise ValueError('A filename with an extension is required.')
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        raise ValueError('size must be a non-negative integer.')
+    max_size = current_app.config.get('UPLOAD_SESSION_MAX_SIZE')
+    if max_size is not None and size > max_size:
+        raise ValueError(f"Uploads are limited to {max_size} bytes.")
+    if sha256 is not None:
+        sha256 = str(sha256).lower()
+        if not SHA256_RE.match(sha256):
+            raise ValueError('sha256 must be 64 hex digits.')
+
+    upload_id = uuid.uuid4().hex
+    directory = os.path.join(upload_session_root(), upload_id)
+    os.makedirs(directory)
+    open(os.path.join(directory, SESSION_DATA_FILENAME), 'wb').close()
+    session = UploadSession(upload_id, project_id, directory, filename, size, sha256)
+    session.save()
+    current_app.logger.info(f"Started chunked upload {upload_id} ({size} bytes) for project {project_id}")
+    return session
+
+
+def get_upload_session(upload_id, project_id=None):
+    """The session with this id (and project, if given), or None if unknown or expired."""
+    if not UPLOAD_ID_RE.match(upload_id or ''):
+        return None
+    directory = os.path.join(upload_session_root(), upload_id)
+    try:
+        with open(os.path.join(directory, SESSION_FILENAME)) as f:
+            session = UploadSession.from_dict(json.load(f), directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    if project_id is not None and session.project_id != project_id:
+        return None
+    return session
+
+
+def _current_hasher(session, offset):
+    """A sha256 object fed with the first `offset` bytes of the data file."""
+    with _state_lock:
+        cached = _hashers.get(session.id)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+    hasher = hashlib.sha256()
+    chunk_size = current_app.config.get('UPLOAD_CHUNK_SIZE', 64 * 1024)
+    with open(session.data_path, 'rb') as f:
+        remaining = offset
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+def append_upload_chunk(session, offset, stream):
+    """
+    Appends the bytes read from `stream` at `offset`, which must be the acknowledged
+    offset (else UploadOffsetMismatch). Bytes are hashed as they are written and
+    synced to disk before returning; if the client disconnects part way, whatever
+    arrived is kept and the next chunk resumes from there. Returns the new offset.
+    """
+    chunk_size = current_app.config.get('UPLOAD_CHUNK_SIZE', 64 * 1024)
+    with _locked_session(session):
+        current_offset = session.offset
+        if offset != current_offset:
+            raise UploadOffsetMismatch(current_offset)
+        hasher = _current_hasher(session, current_offset)
+        remaining = session.size - current_offset
+        try:
+            with open(session.data_path, 'ab') as out:
+                try:
+                    while True:
+                        chunk = stream.read(chunk_size)
+                        if not chunk:
+                            break
+                        if len(chunk) > remaining:
+                            raise ValueError(f"Chunk runs past the declared upload size of {session.size} bytes.")
+                        out.write(chunk)
+                        hasher.update(chunk)
+                        current_offset += len(chunk)
+                        remaining -= len(chunk)
+                finally:
+                    out.flush()
+                    os.fsync(out.fileno())
+        finally:
+            with _state_lock:
+                _hashers[session.id] = (current_offset, hasher)
+        return current_offset
+
+
+def finalize_upload_session(session, asset_type='image'):
+    """
+    Turns a complete upload into a ProjectAsset (not committed; see add_project_asset).
+    The data file is linked into blob storage, so if the commit fails the session can
+    be finalized again; call discard_upload_session() once the asset is committed.
+    Raises ValueError if bytes are missing or do not match the expected sha256.
+    """
+    with _locked_session(session):
+        offset = session.offset
+        if offset != session.size:
+            raise ValueError(f"Upload is incomplete: {offset} of {session.size} bytes received.")
+        sha256 = _current_hasher(session, offset).hexdigest()
+        if session.sha256 and sha256 != session.sha256:
+            raise ValueError(f"Upload digest {sha256} does not match the expected {session.sha256}.")
+        blob = store_blob_file(session.data_path, sha256, offset)
+        return add_project_asset_for_blob(session.project_id, asset_type, blob, session.filename)
+
+
+def discard_upload_session(session):
+    shutil.rmtree(session.directory, ignore_errors=True)
+    _forget_session(session.id)
+
+
+def cleanup_expired_upload_sessions(now=None):
+    """
+    Deletes uploads that have not received a chunk for UPLOAD_SESSION_TTL seconds.
+    Returns the number of sessions removed.
+    """
+    root = upload_session_root()
+    if not os.path.isdir(root):
+        return 0
+    now = now if now is not None else time.time()
+    ttl = current_app.config.get('UPLOAD_SESSION_TTL', 24 * 60 * 60)
+
+    removed = 0
+    for upload_id in os.listdir(root):
+        directory = os.path.join(root, upload_id)
+        if not UPLOAD_ID_RE.match(upload_id) or not os.path.isdir(directory):
+            continue
+        data_path = os.path.join(directory, SESSION_DATA_FILENAME)
+        try:
+            last_activity = os.path.getmtime(data_path)
+        except OSError:
+            last_activity = os.path.getmtime(directory)
+        if now - last_activity < ttl:
+            continue
+
+        shutil.rmtree(directory, ignore_errors=True)
+        _forget_session(upload_id)
+        removed += 1
+    if removed:
+        current_app.logger.info(f"Removed {removed} expired upload session(s) from {root}")
+    return removed
@@ -0,0 +1,191 @@
+# ISG_Project/internal_site_generator/cli.py
+import os
+import json
+import click
+from sqlalchemy import update
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .models import db, PageTemplate, ProjectAsset
+from .asset_storage import adopt_legacy_asset
+from .image_derivatives import derivatives_enabled, generate_image_derivatives, DERIVABLE_EXTENSIONS
+from .export_jobs import cleanup_expired_export_jobs
+from .chunked_uploads import cleanup_expired_upload_sessions
+from .asset_gc import collect_garbage
+from .query_plans import check_query_plans
+from .dashboard_stats import recount_stats
+from .rendering import (
+    get_page_environment, precompile_page_templates, compute_injection_plan, injection_plan_is_current,
+    apply_placeholder_schema, placeholder_schema_is_current
+)
+
+
+@click.command('precompile-templates')
+@click.option('--clear', is_flag=True, help='Remove existing compiled bytecode before precompiling.')
+@with_appcontext
+def precompile_templates_command(clear):
+    """Compile every stored PageTemplate and write its bytecode to the instance cache."""
+    env = get_page_environment()
+    if env.bytecode_cache is None:
+        click.echo('Bytecode cache is disabled (PAGE_TEMPLATE_BYTECODE_CACHE); templates will only be compiled in memory.')
+    elif clear:
+        env.bytecode_cache.clear()
+        click.echo('Cleared compiled template bytecode.')
+
+    templates = PageTemplate.query.order_by(PageTemplate.id).all()
+
+    # Backfill injection plans and placeholder schemas for templates saved before they
+    # existed (or edited outside the app). A core UPDATE keeps updated_at, and with it
+    # the compiled template's name, unchanged.
+    refreshed = 0
+    for template_obj in templates:
+        values = {}
+        if not injection_plan_is_current(template_obj):
+            values['injection_plan_json'] = json.dumps(compute_injection_plan(template_obj.html_content))
+        if not placeholder_schema_is_current(template_obj):
+            apply_placeholder_schema(template_obj)
+            values['placeholder_schema_json'] = template_obj.placeholder_schema_json
+        if values:
+            db.session.expunge(template_obj)
+            db.session.execute(
+                update(PageTemplate)
+                .where(PageTemplate.id == template_obj.id)
+                .values(updated_at=PageTemplate.updated_at, **values)
+            )
+            refreshed += 1
+    if refreshed:
+        db.session.commit()
+        click.echo(f"Stored injection plans / placeholder schemas for {refreshed} page templates.")
+        templates = PageTemplate.query.order_by(PageTemplate.id).all()
+
+    failures = precompile_page_templates(templates)
+    for template_obj, error in failures:
+        current_app.logger.error(f"Failed to precompile template {template_obj.id} ('{template_obj.name}'): {error}")
+        click.echo(f"  FAILED  {template_obj.id} {template_obj.name}: {error}", err=True)
+
+    click.echo(f"Precompiled {len(templates) - len(failures)} of {len(templates)} page templates.")
+
+
+@click.command('cleanup-export-jobs')
+@with_appcontext
+def cleanup_export_jobs_command():
+    """Delete background export archives older than EXPORT_JOB_TTL."""
+    removed = cleanup_expired_export_jobs()
+    click.echo(f"Removed {removed} expired export job(s).")
+
+
+@click.command('cleanup-upload-sessions')
+@with_appcontext
+def cleanup_upload_sessions_command():
+    """Delete unfinished chunked uploads idle for longer than UPLOAD_SESSION_TTL."""
+    removed = cleanup_expired_upload_sessions()
+    click.echo(f"Removed {removed} expired upload session(s).")
+
+
+@click.command('migrate-assets-to-blobs')
+@click.option('--batch-size', default=100, show_default=True, help='Assets moved per commit.')
+@with_appcontext
+def migrate_assets_to_blobs_command(batch_size):
+    """Move assets uploaded before content-addressed storage into blobs, storing identical files once."""
+    moved = missing = 0
+    last_id = 0
+    while True:
+        assets = ProjectAsset.query.filter(ProjectAsset.blob_id.is_(None), ProjectAsset.id > last_id)\
+            .order_by(ProjectAsset.id).limit(batch_size).all()
+        if not assets:
+            break
+        last_id = assets[-1].id
+        legacy_paths = []
+        for asset in assets:
+            legacy_path = adopt_legacy_asset(asset)
+            if legacy_path is None:
+                click.echo(f"  MISSING  asset {asset.id} ({asset.stored_filename}) has no file on disk", err=True)
+                missing += 1
+            else:
+                legacy_paths.append(legacy_path)
+        db.session.commit()
+        # Only drop the old files once the blobs are committed.
+        for legacy_path in legacy_paths:
+            os.remove(legacy_path)
+        moved += len(legacy_paths)
+    click.echo(f"Moved {moved} assets into blob storage; {missing} had no file.")
+
+
+@click.command('generate-image-derivatives')
+@with_appcontext
+def generate_image_derivatives_command():
+    """Make srcset variants for images uploaded before derivatives existed (or while Pillow was missing)."""
+    if not derivatives_enabled():
+        click.echo('Image derivatives are disabled (IMAGE_DERIVATIVES) or Pillow is not installed.', err=True)
+        raise SystemExit(1)
+    asset_ids = [asset_id for (asset_id,) in db.session.query(ProjectAsset.id).filter(
+        ProjectAsset.asset_type == 'image',
+        ProjectAsset.blob_id.isnot(None),
+        ProjectAsset.width.is_(None)
+    ).order_by(ProjectAsset.id)]
+    made = failed = 0
+    for asset_id in asset_ids:
+        asset = db.session.get(ProjectAsset, asset_id)
+        if asset.stored_filename.rsplit('.', 1)[-1].lower() not in DERIVABLE_EXTENSIONS:
+            continue
+        try:
+            made += generate_image_derivatives(asset)
+        except Exception as e:
+            db.session.rollback()
+            failed += 1
+            click.echo(f"  FAILED  asset {asset_id} ({asset.stored_filename}): {e}", err=True)
+    click.echo(f"Generated {made} image derivatives; {failed} images could not be read.")
+
+
+@click.command('gc-assets')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without changing anything.')
+@click.option('--batch-size', type=int, default=None, help='Rows per commit (default: ASSET_GC_BATCH_SIZE).')
+@click.option('--min-age', type=int, default=None, help='Keep assets and files younger than this many seconds (default: ASSET_GC_MIN_AGE).')
+@with_appcontext
+def gc_assets_command(dry_run, batch_size, min_age):
+    """Delete uploaded assets no page or favicon uses, unreferenced blobs, and stray upload files."""
+    report = collect_garbage(dry_run=dry_run, batch_size=batch_size, min_age=min_age)
+    for line in report.lines():
+        click.echo(line)
+
+
+@click.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only the failing ones.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """EXPLAIN QUERY PLAN the hot queries; exit non-zero if any scans a whole table (missing index)."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo(f"Query plan checks need SQLite; this database is {db.engine.dialect.name}.", err=True)
+        raise SystemExit(2)
+    results = check_query_plans()
+    failed = 0
+    for name, plan, scans in results:
+        if scans:
+            failed += 1
+        if scans or verbose:
+            click.echo(f"{'SCAN' if scans else 'ok  '}  {name}")
+            for detail in plan:
+                click.echo(f"        {detail}")
+    click.echo(f"{len(results) - failed} of {len(results)} hot queries use indexes.")
+    if failed:
+        raise SystemExit(1)
+
+
+
+@click.command('recount-stats')
+@with_appcontext
+def recount_stats_command():
+    """Rebuild the dashboard counters from COUNT(*) (after raw SQL or bulk deletes)."""
+    for name, value in recount_stats().items():
+        click.echo(f"{name}: {value}")
+    click.echo('Per-project page and asset totals recounted.')
+
+def register_commands(app):
+    app.cli.add_command(precompile_templates_command)
+    app.cli.add_command(cleanup_export_jobs_command)
+    app.cli.add_command(cleanup_upload_sessions_command)
+    app.cli.add_command(migrate_assets_to_blobs_command)
+    app.cli.add_command(generate_image_derivatives_command)
+    app.cli.add_command(gc_assets_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(recount_stats_command)
@@ -0,0 +1,97 @@
+# ISG_Project/internal_site_generator/compression.py
+import gzip
+import hashlib
+from flask import current_app, request
+from .cache import LRUCache
+
+# Brotli is optional: without it only gzip is offered and exported.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encoded bodies keyed by (content digest, encoding, level), so identical bytes are compressed once.
+compressed_variant_cache = LRUCache()
+
+# File extension of the precompressed sibling written next to a file in exports.
+SIBLING_EXTENSIONS = {'br': 'br', 'gzip': 'gz'}
+
+
+def init_app(app):
+    compressed_variant_cache.maxsize = app.config.get('COMPRESSED_VARIANT_CACHE_SIZE', 512)
+
+
+def available_encodings():
+    """Encodings this process can produce, preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def is_compressible(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension in current_app.config.get('COMPRESSIBLE_EXTENSIONS', ())
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output byte-identical for identical input (stable digests in export manifests).
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compressed_variant(digest, encoding, level, load_data):
+    """The `encoding` form of the bytes identified by digest; load_data() is only called on a miss."""
+    return compressed_variant_cache.get_or_set(
+        (digest, encoding, level),
+        lambda: compress(load_data(), encoding, level)
+    )
+
+
+def precompressed_siblings(path, data, digest=None):
+    """
+    [(sibling path, bytes)] of .br/.gz copies of data for static hosts to serve as-is.
+    Variants that would not be smaller are left out.
+    """
+    digest = digest or hashlib.sha256(data).hexdigest()
+    siblings = []
+    for encoding in available_encodings():
+        level = current_app.config.get('PRECOMPRESS_BROTLI_QUALITY', 11) if encoding == 'br' \
+            else current_app.config.get('PRECOMPRESS_GZIP_LEVEL', 9)
+        encoded = compressed_variant(digest, encoding, level, lambda: data)
+        if len(encoded) < len(data):
+            siblings.append((f"{path}.{SIBLING_EXTENSIONS[encoding]}", encoded))
+    return siblings
+
+
+def negotiate_encoding():
+    """The best encoding the client accepts (Accept-Encoding), or None for identity."""
+    if not current_app.config.get('RESPONSE_COMPRESSION', True):
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def negotiate_compressed_body(digest, load_data, size):
+    """
+    (encoding, body) for the best encoding the client accepts, compressed once per
+    digest, or None to send the identity body: nothing acceptable, a body under
+    COMPRESS_MIN_SIZE or over COMPRESS_MAX_SIZE, or no saving.
+    """
+    if size < current_app.config.get('COMPRESS_MIN_SIZE', 1024) or \
+            size > current_app.config.get('COMPRESS_MAX_SIZE', 8 * 1024 * 1024):
+        return None
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return None
+    level = current_app.config.get('BROTLI_RESPONSE_QUALITY', 5) if encoding == 'br' \
+        else current_app.config.get('GZIP_RESPONSE_LEVEL', 6)
+    body = compressed_variant(digest, encoding, level, load_data)
+    if len(body) >= size:
+        return None
+    return encoding, body
+
+
+def set_encoded_body(response, encoding, body, digest):
+    """Each encoding is its own representation, so it gets its own strong ETag."""
+    response.set_data(body)
+    response.content_encoding = encoding
+    response.set_etag(f"{digest}-{encoding}")
+    return response
@@ -16,3 +16,59 @@ class Config:
     UPLOAD_FOLDER = os.path.join(project_root, 'instance', UPLOAD_FOLDER_RELATIVE) # Store in instance folder
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB upload limit
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'ico'} # For favicons too
+    COMPILED_TEMPLATE_CACHE_SIZE = 128 # Compiled page templates kept in memory per process (LRU)
+    PAGE_TEMPLATE_BYTECODE_CACHE = True # Persist compiled page templates to disk, shared by workers on the host
+    PAGE_TEMPLATE_BYTECODE_CACHE_DIR = None # Defaults to <instance>/jinja_bytecode
+    RENDERED_PAGE_CACHE_SIZE = 256 # Rendered preview pages kept in memory per process (LRU)
+    NAVBAR_FRAGMENT_CACHE_SIZE = 256 # Per-project navbar HTML kept in memory per process (LRU)
+    EXPORT_STREAMING = True # Stream ZIP exports to the client instead of building them in memory
+    EXPORT_QUERY_BATCH_SIZE = 100 # Rows fetched per batch when iterating pages/assets for export
+    EXPORT_CHUNK_SIZE = 64 * 1024 # Bytes read per chunk when copying assets into an export
+    EXPORT_RENDER_WORKERS = 0 # Off by default: pages render on the request thread; N > 0 renders in a pool of N processes
+    EXPORT_RENDER_CHUNK_SIZE = 8 # Pages handed to a render worker per task
+    EXPORT_RENDER_CACHE = True # Reuse rendered export pages whose content hash is unchanged
+    EXPORT_RENDER_CACHE_DIR = None # Defaults to <instance>/export_render_cache
+    EXPORT_JOB_WORKERS = 2 # Background export jobs run at once (threads in the submitting web process; not resumed after it exits)
+    EXPORT_JOB_DIR = None # Defaults to <instance>/export_jobs
+    EXPORT_JOB_TTL = 24 * 60 * 60 # Seconds a finished export archive is kept
+    ASSET_BLOB_FOLDER = None # Content-addressed upload storage; defaults to <UPLOAD_FOLDER>/blobs
+    UPLOAD_CHUNK_SIZE = 64 * 1024 # Bytes read per chunk while hashing uploads
+    EXPORT_DEFLATE_LEVEL = 6 # zlib level (1-9) for HTML/CSS/SVG and other text in exports
+    EXPORT_STORED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'ico', 'webp', 'avif'} # Already compressed; added to exports uncompressed
+    ASSET_CACHE_MAX_AGE = 365 * 24 * 60 * 60 # Seconds browsers may cache uuid/blob-named assets without revalidating
+    ASSET_X_ACCEL_REDIRECT_PREFIX = None # e.g. '/_protected_uploads/': nginx internal location aliased to UPLOAD_FOLDER. For X-Sendfile set USE_X_SENDFILE = True
+    IMAGE_DERIVATIVES = True # Make resized srcset variants of uploaded images (needs Pillow; skipped without it)
+    IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1024, 1600) # Variant widths in px; only those narrower than the original are made
+    IMAGE_DERIVATIVE_FORMAT = 'webp' # Encoding for variants (any Pillow format, e.g. 'webp' or 'avif')
+    IMAGE_DERIVATIVE_QUALITY = 80
+    IMAGE_DERIVATIVE_WORKERS = 2 # Background threads; 0 generates variants inside the upload request
+    UPLOAD_SESSION_DIR = None # Partial chunked uploads; defaults to <UPLOAD_FOLDER>/upload_sessions (same filesystem as blobs)
+    UPLOAD_SESSION_MAX_SIZE = 1024 * 1024 * 1024 # Largest file accepted through the chunked upload API
+    UPLOAD_SESSION_CHUNK_MAX = 8 * 1024 * 1024 # Body limit per chunk request (replaces MAX_CONTENT_LENGTH for chunks)
+    UPLOAD_SESSION_TTL = 24 * 60 * 60 # Seconds an unfinished upload is kept after its last chunk
+    ASSET_GC_BATCH_SIZE = 200 # Rows handled per commit by the asset garbage collector
+    ASSET_GC_MIN_AGE = 60 * 60 # Seconds; younger assets and files are never collected (uploads may still be in flight)
+    ASSET_GC_INTERVAL = None # Seconds between background collections in the web process; None disables (use `flask gc-assets`)
+    COMPRESSIBLE_EXTENSIONS = {'html', 'css', 'js', 'svg', 'json', 'txt', 'xml'} # Worth gzip/brotli (for responses and export siblings)
+    RESPONSE_COMPRESSION = True # Compress previews and SVG/CSS/JS assets per Accept-Encoding
+    COMPRESS_MIN_SIZE = 1024 # Bytes; smaller bodies are sent as is
+    COMPRESS_MAX_SIZE = 8 * 1024 * 1024 # Bytes; larger files are streamed uncompressed rather than held in memory
+    GZIP_RESPONSE_LEVEL = 6
+    BROTLI_RESPONSE_QUALITY = 5 # 0-11; brotli (optional package) is preferred over gzip when installed
+    COMPRESSED_VARIANT_CACHE_SIZE = 512 # Compressed bodies kept in memory, keyed by content digest
+    EXPORT_PRECOMPRESS = False # Default for exports: add .gz (and .br) siblings of compressible files for static hosts
+    PRECOMPRESS_GZIP_LEVEL = 9
+    PRECOMPRESS_BROTLI_QUALITY = 11
+    # Applied to each new SQLite connection (see sqlite_tuning); set to {} for SQLite's defaults.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',      # Readers no longer block on (or block) a writer
+        'busy_timeout': 5000,       # ms a writer waits for the lock before "database is locked"
+        'synchronous': 'NORMAL',    # Safe with WAL: durable at checkpoints, no fsync per commit
+        'cache_size': -20000,       # Negative = KiB of page cache per connection (~20 MB)
+        'mmap_size': 268435456,     # Bytes of the file read through memory mapping
+    }
+    DASHBOARD_STATS_TTL = 30 # Seconds a process reuses the dashboard's counts and samples; 0 reads them on every load
+    DASHBOARD_SAMPLE_SIZE = 5 # Templates and projects listed on the dashboard
+    LIST_PAGE_SIZE = 10 # Templates / projects per page of the admin lists
+    PROJECT_PAGES_PAGE_SIZE = 50 # Pages per page of a project's page list
+    LIST_APPROXIMATE_TOTALS = True # Show list totals from the dashboard counters (no COUNT per request)
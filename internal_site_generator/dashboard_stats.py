@@ -0,0 +1,187 @@
+# ISG_Project/internal_site_generator/dashboard_stats.py
+import time
+import threading
+from flask import current_app
+from sqlalchemy import event, select, update, insert, func
+from sqlalchemy.orm import Session, object_session
+from .models import db, StatCounter, PageTemplate, WebsiteProject, ProjectPage, ProjectAsset
+
+# Models whose row totals are kept in StatCounter, keyed by table name.
+COUNTED_MODELS = (PageTemplate, WebsiteProject, ProjectPage, ProjectAsset)
+
+# WebsiteProject column holding the per-project total of each child model.
+PROJECT_COUNT_COLUMNS = {ProjectPage: 'page_count', ProjectAsset: 'asset_count'}
+
+# Set in Session.info when a flush changed something the dashboard shows.
+_STATS_DIRTY_KEY = 'dashboard_stats_dirty'
+
+# Session.info entry holding {model: net rows inserted} for the flush in progress; the
+# counters are moved once per flush, after all of its rows are written.
+_COUNTER_DELTAS_KEY = 'dashboard_counter_deltas'
+
+# (expires at, DashboardStats); `_stats_generation` is bumped on every invalidation so a
+# load that raced with a commit does not store what it read before the commit.
+_stats_cache = None
+_stats_generation = 0
+_stats_lock = threading.Lock()
+
+
+class DashboardStats:
+    """Site totals plus the first few templates and projects by name, as plain rows."""
+
+    def __init__(self, counts, templates, projects):
+        self.template_count = counts.get(PageTemplate.__tablename__, 0)
+        self.project_count = counts.get(WebsiteProject.__tablename__, 0)
+        self.page_count = counts.get(ProjectPage.__tablename__, 0)
+        self.asset_count = counts.get(ProjectAsset.__tablename__, 0)
+        self.templates = templates # Rows of (id, name)
+        self.projects = projects   # Rows of (id, project_name, page_count, asset_count)
+
+
+def load_dashboard_stats():
+    """
+    The dashboard's numbers: one read of StatCounter plus two LIMIT queries on indexed
+    names. With DASHBOARD_STATS_TTL set, the result is shared by the process's requests
+    for that many seconds; commits in this process that change it invalidate it at once,
+    other processes see them once their copy expires.
+    """
+    global _stats_cache
+    ttl = current_app.config.get('DASHBOARD_STATS_TTL', 0)
+    if not ttl:
+        return _query_dashboard_stats()
+    with _stats_lock:
+        cached, generation = _stats_cache, _stats_generation
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    stats = _query_dashboard_stats()
+    with _stats_lock:
+        if generation == _stats_generation:
+            _stats_cache = (time.monotonic() + ttl, stats)
+    return stats
+
+
+def counted_total(model):
+    """The maintained row total of a counted model (one primary-key read), or None if it has no counter yet."""
+    return db.session.scalar(select(StatCounter.value).where(StatCounter.name == model.__tablename__))
+
+
+def invalidate_dashboard_stats():
+    global _stats_cache, _stats_generation
+    with _stats_lock:
+        _stats_cache = None
+        _stats_generation += 1
+
+
+def _query_dashboard_stats():
+    sample_size = current_app.config.get('DASHBOARD_SAMPLE_SIZE', 5)
+    counts = dict(db.session.execute(select(StatCounter.name, StatCounter.value)).all())
+    templates = db.session.execute(
+        select(PageTemplate.id, PageTemplate.name).order_by(PageTemplate.name).limit(sample_size)
+    ).all()
+    projects = db.session.execute(
+        select(WebsiteProject.id, WebsiteProject.project_name, WebsiteProject.page_count, WebsiteProject.asset_count)
+        .order_by(WebsiteProject.project_name).limit(sample_size)
+    ).all()
+    return DashboardStats(counts, templates, projects)
+
+
+def recount_stats():
+    """
+    Rebuilds every counter from COUNT(*), for rows written outside the ORM (raw SQL,
+    bulk deletes) which the listeners below never see. Returns {counter: value}.
+    """
+    counter_table = StatCounter.__table__
+    totals = {}
+    for model in COUNTED_MODELS:
+        name = model.__tablename__
+        totals[name] = db.session.scalar(select(func.count()).select_from(model.__table__))
+        db.session.execute(counter_table.delete().where(counter_table.c.name == name))
+        db.session.execute(insert(counter_table).values(name=name, value=totals[name]))
+    for model, column in PROJECT_COUNT_COLUMNS.items():
+        per_project = select(func.count()).select_from(model.__table__)\
+            .where(model.website_project_id == WebsiteProject.id).scalar_subquery()
+        db.session.execute(update(WebsiteProject).values({column: per_project}))
+    db.session.commit()
+    invalidate_dashboard_stats()
+    return totals
+
+
+def _adjust_counter(connection, model, delta):
+    counter_table = StatCounter.__table__
+    result = connection.execute(
+        update(counter_table).where(counter_table.c.name == model.__tablename__)
+        .values(value=counter_table.c.value + delta)
+    )
+    if result.rowcount == 0:
+        # No row yet (e.g. a database created with create_all): start from the real total,
+        # which already includes every row this flush inserted or deleted.
+        connection.execute(insert(counter_table).values(
+            name=model.__tablename__,
+            value=connection.scalar(select(func.count()).select_from(model.__table__))
+        ))
+
+
+def _adjust_project_count(connection, target, delta):
+    column = PROJECT_COUNT_COLUMNS[type(target)]
+    project_table = WebsiteProject.__table__
+    connection.execute(
+        update(project_table).where(project_table.c.id == target.website_project_id)
+        .values({column: project_table.c[column] + delta})
+    )
+
+
+def _mark_dirty(target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_STATS_DIRTY_KEY] = True
+
+
+def _counting_listener(delta):
+    def listener(_mapper, connection, target):
+        if type(target) in PROJECT_COUNT_COLUMNS:
+            _adjust_project_count(connection, target, delta)
+        session = object_session(target)
+        if session is not None:
+            deltas = session.info.setdefault(_COUNTER_DELTAS_KEY, {})
+            deltas[type(target)] = deltas.get(type(target), 0) + delta
+        _mark_dirty(target)
+    return listener
+
+
+for _model in COUNTED_MODELS:
+    event.listen(_model, 'after_insert', _counting_listener(1))
+    event.listen(_model, 'after_delete', _counting_listener(-1))
+
+# Renames change the name-ordered samples.
+for _model in (PageTemplate, WebsiteProject):
+    event.listen(_model, 'after_update', lambda _mapper, _connection, target: _mark_dirty(target))
+
+
+@event.listens_for(Session, 'before_flush')
+def _reset_counter_deltas(session, _flush_context, _instances):
+    # Left over only if an earlier flush failed before after_flush; its rows were rolled back.
+    session.info.pop(_COUNTER_DELTAS_KEY, None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_counter_deltas(session, _flush_context):
+    # Batched INSERTs write every row before the first after_insert runs, so a counter
+    # seeded from COUNT(*) inside the per-row listener would count the batch twice.
+    deltas = session.info.pop(_COUNTER_DELTAS_KEY, None)
+    if not deltas:
+        return
+    connection = session.connection()
+    for model, delta in deltas.items():
+        if delta:
+            _adjust_counter(connection, model, delta)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop(_STATS_DIRTY_KEY, False):
+        invalidate_dashboard_stats()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(_STATS_DIRTY_KEY, None)
@@ -0,0 +1,623 @@
+# ISG_Project/internal_site_generator/export.py
+import os
+import json
+import atexit
+import hashlib
+import pickle
+import zipfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from .models import db, WebsiteProject, ProjectPage
+from .snapshots import ProjectSnapshot
+from .cache import LRUCache
+from .asset_storage import asset_file_path, blob_path
+from .compression import is_compressible, precompressed_siblings
+
+# Tells render_final_page_html how to construct relative URLs inside the export.
+ASSET_PATHS_IN_ZIP = {
+    'image': 'assets/images',    # Where images from content_data_json will be linked from (relative to HTML files)
+    'favicon': 'assets/favicons', # Where favicon will be linked from (relative to HTML files)
+    'css': 'assets/css'          # Where the shared, hash-named project stylesheet is written
+}
+
+# Written as the last entry of every archive: {"format", "project_id", "files": {path: {"sha256", "size"}}}.
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+
+# sha256 of asset files keyed by (path, size, mtime_ns), for delta exports.
+file_digest_cache = LRUCache(maxsize=4096)
+
+# Bump when a code change alters rendered export HTML, so memoized pages are not reused.
+EXPORT_RENDER_FORMAT = 2
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+# Set inside render worker processes by _init_render_worker.
+_worker_app = None
+
+
+class _StreamSink:
+    """
+    A write-only, non-seekable file object for zipfile.ZipFile.
+    zipfile falls back to data descriptors for unseekable output, so entries can be
+    handed to the client as soon as they are written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def page_export_filename(page):
+    page_filename = f"{page.slug}.html" if page.slug else f"page_{page.id}.html"
+    if page_filename == ".html" or page_filename == "None.html": # Handle empty or None slug
+        page_filename = f"page_{page.id}.html"
+    if page.slug == 'index': # Common convention for homepage
+        page_filename = 'index.html'
+    return page_filename
+
+
+def render_export_page(snapshot, page):
+    """Renders one page for the static export. Returns None if the page has no template."""
+    from .main import render_final_page_html
+
+    project = snapshot.project
+    template_obj = snapshot.template_for(page)
+    if not template_obj:
+        current_app.logger.warning(f"Page '{page.title}' (ID: {page.id}) in project {project.id} has no template, skipping for export.")
+        return None
+
+    content_data = {}
+    if page.content_data_json:
+        try:
+            content_data = json.loads(page.content_data_json)
+        except json.JSONDecodeError:
+            current_app.logger.error(f"JSONDecodeError for page ID {page.id} content: {page.content_data_json}")
+
+    # Every page links the one stylesheet written by generate_project_archive() instead of inlining it.
+    stylesheet_path = site_stylesheet_path(snapshot)
+    return render_final_page_html(
+        raw_template_html=template_obj.html_content,
+        content_data_dict=content_data,
+        global_css=project.global_css if project.global_css else "",
+        project=project,
+        page_obj=page,
+        export_mode=True,
+        asset_path_config=ASSET_PATHS_IN_ZIP,
+        template_obj=template_obj,
+        snapshot=snapshot,
+        stylesheet_href=stylesheet_path
+    )
+
+
+def site_stylesheet_path(snapshot):
+    """Path in the archive of the project's shared stylesheet, or None if it has no CSS."""
+    if snapshot.site_stylesheet is None:
+        return None
+    return f"{ASSET_PATHS_IN_ZIP['css']}/{snapshot.site_stylesheet[0]}"
+
+
+# WebsiteProject columns a rendered page depends on. Bookkeeping columns (timestamps,
+# the dashboard page/asset counters) are left out so they never invalidate the memo.
+PROJECT_RENDER_COLUMNS = (
+    'project_name', 'site_title', 'favicon_path', 'global_css',
+    'primary_color', 'secondary_color', 'accent_color', 'navbar_version',
+)
+
+
+def _row_fingerprint(obj, columns=None):
+    """Column values of a row (all of them minus timestamps, or only `columns`), for content hashing."""
+    if columns is None:
+        columns = [column.key for column in obj.__table__.columns if column.key not in ('created_at', 'updated_at')]
+    return {key: getattr(obj, key) for key in columns}
+
+
+class RenderMemo:
+    """
+    On-disk memo of rendered export pages, one directory per project.
+    A page's key hashes everything its HTML depends on: template HTML, the page row
+    (content JSON, title, slug, ...), the project's settings (theme colours, CSS,
+    favicon, ...), the navbar HTML and the export path config. Unchanged pages are
+    reused byte-for-byte; only changed pages are rendered.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.enabled = current_app.config.get('EXPORT_RENDER_CACHE', True)
+        self.directory = os.path.join(export_render_cache_root(), str(snapshot.project.id))
+        self.used_keys = set()
+        self._template_digests = {}
+        self._base_digest = None
+
+    def _project_digest(self):
+        if self._base_digest is None:
+            base = [
+                EXPORT_RENDER_FORMAT,
+                ASSET_PATHS_IN_ZIP,
+                _row_fingerprint(self.snapshot.project, PROJECT_RENDER_COLUMNS),
+                hashlib.sha256(self.snapshot.navbar_html.encode('utf-8')).hexdigest(),
+            ]
+            self._base_digest = hashlib.sha256(json.dumps(base, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return self._base_digest
+
+    def _template_digest(self, template_obj):
+        digest = self._template_digests.get(template_obj.id)
+        if digest is None:
+            digest = hashlib.sha256((template_obj.html_content or '').encode('utf-8')).hexdigest()
+            self._template_digests[template_obj.id] = digest
+        return digest
+
+    def _image_fingerprint(self, page):
+        """
+        srcset / width / height of the images this page references (its content values
+        and the favicon), so new derivatives only re-render the pages that show them.
+        """
+        names = set()
+        if page.content_data_json:
+            try:
+                names.update(str(value) for value in json.loads(page.content_data_json).values() if value)
+            except (json.JSONDecodeError, AttributeError):
+                pass # Rendered as-is; render_export_page logs it
+        if self.snapshot.project.favicon_path:
+            names.add(self.snapshot.project.favicon_path)
+        image_variants = self.snapshot.image_variants
+        return sorted((name, image_variants[name].fingerprint()) for name in names if name in image_variants)
+
+    def key_for(self, page, template_obj):
+        parts = [
+            self._project_digest(), self._template_digest(template_obj), _row_fingerprint(page),
+            self._image_fingerprint(page),
+        ]
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.html")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, rendered_bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(rendered_bytes)
+        os.replace(tmp_path, self._path(key)) # Atomic: concurrent exports never see partial files
+
+    def prune(self):
+        """Removes memoized pages not used by the export that just finished."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.html') and filename[:-len('.html')] in self.used_keys:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError as e:
+                current_app.logger.warning(f"Could not prune export render cache file {filename}: {e}")
+
+
+def export_render_cache_root():
+    return current_app.config.get('EXPORT_RENDER_CACHE_DIR') or \
+        os.path.join(current_app.instance_path, 'export_render_cache')
+
+
+def render_export_page_memoized(memo, page):
+    """
+    Returns (page_filename, html_bytes, memo_key) for a page, or None if it has no template.
+    Reuses the memoized HTML when the page's content hash is unchanged.
+    """
+    template_obj = memo.snapshot.template_for(page)
+    if not template_obj:
+        render_export_page(memo.snapshot, page) # Logs the skip
+        return None
+
+    memo_key = None
+    if memo.enabled:
+        memo_key = memo.key_for(page, template_obj)
+        rendered_bytes = memo.load(memo_key)
+        if rendered_bytes is not None:
+            return page_export_filename(page), rendered_bytes, memo_key
+
+    rendered_bytes = render_export_page(memo.snapshot, page).encode('utf-8')
+    if memo_key is not None:
+        try:
+            memo.store(memo_key, rendered_bytes)
+        except OSError as e:
+            current_app.logger.warning(f"Could not store rendered page {page.id} in export render cache: {e}")
+    return page_export_filename(page), rendered_bytes, memo_key
+
+
+def _picklable_config(config):
+    picklable = {}
+    for key, value in config.items():
+        if not key.isupper():
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        picklable[key] = value
+    # Workers have their own instance path; point them at the parent's memo directory.
+    picklable['EXPORT_RENDER_CACHE_DIR'] = export_render_cache_root()
+    return picklable
+
+
+def _init_render_worker(config_values):
+    """Builds a minimal app inside a pool process so pages render exactly as they would in-process."""
+    global _worker_app
+    from . import create_render_worker_app
+
+    _worker_app = create_render_worker_app(type('ExportWorkerConfig', (), config_values))
+    # url_for() in templates needs a request context; keep one pushed for the worker's lifetime.
+    _worker_app.test_request_context().push()
+
+
+def _render_page_batch(memo, page_ids):
+    """Renders a batch of pages. Returns [(page_filename, html_bytes, memo_key) or None, ...] in page_ids order."""
+    pages_by_id = memo.snapshot.pages_by_ids(page_ids)
+    return [
+        render_export_page_memoized(memo, pages_by_id[page_id]) if page_id in pages_by_id else None
+        for page_id in page_ids
+    ]
+
+
+def _render_pages_in_worker(project_id, page_ids):
+    """Pool task run inside a render worker process."""
+    try:
+        snapshot = ProjectSnapshot.load(db.session.get(WebsiteProject, project_id))
+        return _render_page_batch(RenderMemo(snapshot), page_ids)
+    finally:
+        db.session.remove()
+
+
+def _get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=current_app.config['EXPORT_RENDER_WORKERS'],
+                # spawn, not fork: forking a threaded server can copy held locks and open DB connections.
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_render_worker,
+                initargs=(_picklable_config(current_app.config),),
+            )
+            atexit.register(_render_pool.shutdown, wait=False, cancel_futures=True)
+        return _render_pool
+
+
+def _reset_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+
+def _iter_rendered_pages_in_process(memo, batch_size):
+    for page in memo.snapshot.iter_pages(batch_size):
+        result = render_export_page_memoized(memo, page)
+        if result is not None:
+            yield result
+
+
+def _iter_rendered_pages_in_pool(memo, batch_size):
+    project = memo.snapshot.project
+    workers = current_app.config['EXPORT_RENDER_WORKERS']
+    chunk_size = current_app.config.get('EXPORT_RENDER_CHUNK_SIZE', 8)
+    # Only ids are read here; the workers load and render the pages themselves.
+    page_ids = db.session.query(ProjectPage.id).filter_by(website_project_id=project.id)\
+        .order_by(ProjectPage.id).yield_per(batch_size)
+
+    def id_chunks():
+        chunk = []
+        for (page_id,) in page_ids:
+            chunk.append(page_id)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    pool = _get_render_pool()
+
+    def abandon_pool(error, chunk):
+        # A dead worker breaks the whole executor, so the rest of this export renders
+        # in-process; the next export starts a fresh pool.
+        current_app.logger.error(f"Render worker failed for pages {chunk} of project {project.id}, rendering in-process: {error}")
+        _reset_render_pool()
+
+    # A bounded window of in-flight chunks keeps every core busy without holding
+    # the whole export in memory; results are consumed in submission order.
+    # A chunk without a future is rendered in-process when its turn comes.
+    in_flight = deque()
+    chunks = id_chunks()
+    while True:
+        while len(in_flight) < workers * 2:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            future = None
+            if pool is not None:
+                try:
+                    future = pool.submit(_render_pages_in_worker, project.id, chunk)
+                except (BrokenProcessPool, RuntimeError) as e: # RuntimeError: pool already shut down
+                    abandon_pool(e, chunk)
+                    pool = None
+            in_flight.append((chunk, future))
+        if not in_flight:
+            break
+        chunk, future = in_flight.popleft()
+        results = None
+        if future is not None:
+            try:
+                results = future.result()
+            except Exception as e:
+                if pool is not None:
+                    abandon_pool(e, chunk)
+                    pool = None
+        if results is None:
+            results = _render_page_batch(memo, chunk)
+        for result in results:
+            if result is not None:
+                yield result
+
+
+def iter_rendered_pages(memo):
+    """
+    Yields (page_filename, html_bytes) for every page of the project, ordered by page id,
+    recording each page's memo key in memo.used_keys.
+    With EXPORT_RENDER_WORKERS > 0 the renders are fanned out to a process pool.
+    """
+    batch_size = current_app.config.get('EXPORT_QUERY_BATCH_SIZE', 100)
+    if current_app.config.get('EXPORT_RENDER_WORKERS', 0) > 0:
+        results = _iter_rendered_pages_in_pool(memo, batch_size)
+    else:
+        results = _iter_rendered_pages_in_process(memo, batch_size)
+    for page_filename, rendered_bytes, memo_key in results:
+        if memo_key is not None:
+            memo.used_keys.add(memo_key)
+        yield page_filename, rendered_bytes
+
+
+def entry_compress_type(path_in_zip):
+    """
+    ZIP_STORED for already-compressed formats (EXPORT_STORED_EXTENSIONS), where deflate
+    costs CPU for no size gain; ZIP_DEFLATED for text (HTML, CSS, SVG, JSON, ...).
+    """
+    extension = path_in_zip.rsplit('.', 1)[-1].lower() if '.' in path_in_zip else ''
+    stored_extensions = current_app.config.get('EXPORT_STORED_EXTENSIONS', ())
+    return zipfile.ZIP_STORED if extension in stored_extensions else zipfile.ZIP_DEFLATED
+
+
+def _copy_file_into_zip(zf, source_file_path, path_in_zip, chunk_size, digest):
+    """Copies a file into the archive in chunks, updating digest as it goes. Yields after every chunk."""
+    compress_type = entry_compress_type(path_in_zip)
+    if compress_type == zf.compression and not hasattr(zipfile.ZipInfo, 'compress_level'):
+        # Before Python 3.13 a ZipInfo's level cannot be set publicly; an entry opened by
+        # name takes the archive's compression and compresslevel (and the current time).
+        entry = path_in_zip
+    else:
+        entry = zipfile.ZipInfo.from_file(source_file_path, path_in_zip)
+        entry.compress_type = compress_type
+        if compress_type == zf.compression:
+            entry.compress_level = zf.compresslevel
+    with open(source_file_path, 'rb') as source, zf.open(entry, 'w') as dest:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dest.write(chunk)
+            yield
+
+
+def file_sha256(path, chunk_size=64 * 1024):
+    """SHA-256 of a file on disk, cached per (path, size, mtime) so unchanged assets are read once."""
+    stat = os.stat(path)
+    return file_digest_cache.get_or_set(
+        (path, stat.st_size, stat.st_mtime_ns),
+        lambda: _hash_file(path, chunk_size)
+    )
+
+
+def _hash_file(path, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_manifest(raw):
+    """
+    Validates a manifest produced by a previous export (bytes, str or an already decoded dict)
+    and returns its {path: sha256} mapping. Raises ValueError if it is not a usable manifest.
+    """
+    try:
+        manifest = json.loads(raw) if isinstance(raw, (bytes, str)) else raw
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Manifest is not valid JSON: {e}")
+    if not isinstance(manifest, dict) or manifest.get('format') != MANIFEST_FORMAT or not isinstance(manifest.get('files'), dict):
+        raise ValueError(f"Manifest must be a JSON object with \"format\": {MANIFEST_FORMAT} and a \"files\" object.")
+
+    previous_digests = {}
+    for path, entry in manifest['files'].items():
+        if not isinstance(entry, dict) or not isinstance(entry.get('sha256'), str):
+            raise ValueError(f"Manifest entry for '{path}' has no sha256.")
+        previous_digests[path] = entry['sha256']
+    return previous_digests
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _iter_asset_files(snapshot, batch_size):
+    """Yields (path_in_zip, source_file_path, blob or None) for every asset and image derivative on disk."""
+    project_id = snapshot.project.id
+    # Assets that have a stored_filename, as these are expected to be on disk
+    for asset in snapshot.iter_assets(batch_size):
+        zip_folder_for_asset_type = ASSET_PATHS_IN_ZIP.get(asset.asset_type)
+        if not zip_folder_for_asset_type:
+            current_app.logger.warning(f"Asset type '{asset.asset_type}' for asset ID {asset.id} (project {project_id}) has no defined zip path, skipping.")
+            continue
+
+        source_file_path = asset_file_path(asset)
+        if not os.path.exists(source_file_path):
+            current_app.logger.warning(f"Asset file not found on disk: {source_file_path} for asset ID {asset.id} (project {project_id}), skipping.")
+            continue
+        yield f"{zip_folder_for_asset_type}/{asset.stored_filename}", source_file_path, asset.blob
+
+    # Resized variants sit next to their originals, as srcset expects.
+    for derivative in snapshot.iter_image_derivatives(batch_size):
+        source_file_path = blob_path(derivative.blob.sha256)
+        if not os.path.exists(source_file_path):
+            current_app.logger.warning(f"Derivative file not found on disk: {source_file_path} for {derivative.stored_filename} (project {project_id}), skipping.")
+            continue
+        yield f"{ASSET_PATHS_IN_ZIP['image']}/{derivative.stored_filename}", source_file_path, derivative.blob
+
+
+def generate_project_archive(fileobj, project, previous_manifest=None, progress=None, precompress=None):
+    """
+    Writes the project's static-site ZIP to fileobj, yielding after every page and
+    every asset chunk so a streaming caller can flush what has been written so far.
+    Pages and assets are read in batches rather than loaded all at once; page order
+    in the archive is deterministic whether or not a render pool is used.
+
+    The project's theme and global CSS go in one hash-named stylesheet that every page
+    links to (see rendering.build_site_stylesheet) rather than being inlined per page.
+
+    Every archive ends with MANIFEST_FILENAME listing each file's sha256 and size.
+    If previous_manifest ({path: sha256}, see parse_manifest) is given, only files that
+    are new or whose digest changed are written, and the manifest also lists the
+    paths that were in the previous export but no longer exist under "deleted".
+
+    progress, if given, has page_done() and asset_done() called as each page and
+    asset is handled (see export_jobs.ExportJob).
+
+    With precompress (default EXPORT_PRECOMPRESS) every compressible file also gets
+    .gz (and, with brotli installed, .br) siblings, stored as is, for static hosts
+    that serve precompressed files (nginx gzip_static / brotli_static and the like).
+    """
+    batch_size = current_app.config.get('EXPORT_QUERY_BATCH_SIZE', 100)
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 64 * 1024)
+
+    # Project, templates and navbar are loaded once; pages and assets are each one streamed query.
+    snapshot = ProjectSnapshot.load(project)
+    memo = RenderMemo(snapshot)
+    manifest_files = {}
+
+    if precompress is None:
+        precompress = current_app.config.get('EXPORT_PRECOMPRESS', False)
+    max_precompress_size = current_app.config.get('COMPRESS_MAX_SIZE', 8 * 1024 * 1024)
+
+    def is_unchanged(path, sha256):
+        return previous_manifest is not None and previous_manifest.get(path) == sha256
+
+    def add_siblings(zf, path, sha256, size, load_data):
+        # Siblings are listed in the manifest like any file, so delta exports skip unchanged ones.
+        if not precompress or not is_compressible(path) or size > max_precompress_size:
+            return
+        for sibling_path, encoded in precompressed_siblings(path, load_data(), sha256):
+            sibling_sha256 = hashlib.sha256(encoded).hexdigest()
+            manifest_files[sibling_path] = {'sha256': sibling_sha256, 'size': len(encoded)}
+            if not is_unchanged(sibling_path, sibling_sha256):
+                zf.writestr(sibling_path, encoded, compress_type=zipfile.ZIP_STORED)
+
+    # Pages and the manifest are deflated at EXPORT_DEFLATE_LEVEL; assets follow entry_compress_type().
+    deflate_level = current_app.config.get('EXPORT_DEFLATE_LEVEL', 6)
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED, compresslevel=deflate_level) as zf:
+        # --- 0. The shared stylesheet every page links to ---
+        stylesheet_path = site_stylesheet_path(snapshot)
+        if stylesheet_path is not None:
+            css_bytes = snapshot.site_stylesheet[1]
+            sha256 = hashlib.sha256(css_bytes).hexdigest()
+            manifest_files[stylesheet_path] = {'sha256': sha256, 'size': len(css_bytes)}
+            if not is_unchanged(stylesheet_path, sha256):
+                zf.writestr(stylesheet_path, css_bytes)
+            add_siblings(zf, stylesheet_path, sha256, len(css_bytes), lambda: css_bytes)
+
+        # --- 1. Render and add HTML pages ---
+        for page_filename, rendered_bytes in iter_rendered_pages(memo):
+            sha256 = hashlib.sha256(rendered_bytes).hexdigest()
+            manifest_files[page_filename] = {'sha256': sha256, 'size': len(rendered_bytes)}
+            if progress is not None:
+                progress.page_done()
+            add_siblings(zf, page_filename, sha256, len(rendered_bytes), lambda: rendered_bytes)
+            if is_unchanged(page_filename, sha256):
+                continue
+            zf.writestr(page_filename, rendered_bytes)
+            current_app.logger.debug(f"Added HTML page '{page_filename}' to zip for project {project.id}")
+            yield
+
+        # --- 2. Add assets (images, favicons, etc.) and image derivatives ---
+        for path_in_zip, source_file_path, blob in _iter_asset_files(snapshot, batch_size):
+            unchanged = False
+            if previous_manifest is not None:
+                # Delta export: only copy assets the client does not have. Blobs already know
+                # their digest; legacy files are hashed (cached) first.
+                if blob is not None:
+                    sha256, size = blob.sha256, blob.size
+                else:
+                    sha256, size = file_sha256(source_file_path, chunk_size), os.path.getsize(source_file_path)
+                manifest_files[path_in_zip] = {'sha256': sha256, 'size': size}
+                unchanged = is_unchanged(path_in_zip, sha256)
+
+            if not unchanged:
+                # Copy in chunks so large files never sit in memory whole; hash on the way through.
+                digest = hashlib.sha256()
+                yield from _copy_file_into_zip(zf, source_file_path, path_in_zip, chunk_size, digest)
+                manifest_files[path_in_zip] = {'sha256': digest.hexdigest(), 'size': zf.getinfo(path_in_zip).file_size}
+                current_app.logger.debug(f"Added asset {source_file_path} as {path_in_zip} to zip for project {project.id}")
+            entry = manifest_files[path_in_zip]
+            add_siblings(zf, path_in_zip, entry['sha256'], entry['size'], lambda: _read_file(source_file_path))
+            if progress is not None:
+                progress.asset_done()
+
+        # --- 3. Manifest of the full export, for the next delta request ---
+        manifest = {'format': MANIFEST_FORMAT, 'project_id': project.id, 'files': manifest_files}
+        if previous_manifest is not None:
+            manifest['deleted'] = sorted(set(previous_manifest) - set(manifest_files))
+        zf.writestr(MANIFEST_FILENAME, json.dumps(manifest, indent=2, sort_keys=True))
+    # Closing the ZipFile wrote the central directory.
+    memo.prune()
+    yield
+
+
+def build_project_archive(fileobj, project, previous_manifest=None, progress=None, precompress=None):
+    """Writes the whole archive to a (seekable) file object."""
+    for _ in generate_project_archive(fileobj, project, previous_manifest, progress, precompress):
+        pass
+
+
+def stream_project_archive(project, previous_manifest=None, precompress=None):
+    """Yields the archive as byte chunks while pages are rendered and assets are read."""
+    sink = _StreamSink()
+    for _ in generate_project_archive(sink, project, previous_manifest, precompress=precompress):
+        data = sink.drain()
+        if data:
+            yield data
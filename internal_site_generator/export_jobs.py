@@ -0,0 +1,294 @@
+# ISG_Project/internal_site_generator/export_jobs.py
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.utils import secure_filename
+from .models import db, WebsiteProject, ProjectPage, ProjectAsset, AssetDerivative
+from .export import build_project_archive
+
+# Each job lives in <export job root>/<job_id>/ as status.json plus, once finished, the archive.
+JOB_STATUS_FILENAME = 'status.json'
+JOB_ARCHIVE_FILENAME = 'export.zip'
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+JOB_FAILED = 'failed'
+JOB_INTERRUPTED = 'interrupted' # The process running it stopped first (e.g. a restart); served as 410 Gone
+JOB_DONE_STATES = (JOB_FINISHED, JOB_FAILED, JOB_INTERRUPTED)
+
+_job_executor = None
+_job_executor_lock = threading.Lock()
+
+# Jobs submitted by this process, so status reads do not have to touch disk. Only the
+# process that submitted a job runs it: nothing resumes a job after that process exits.
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def export_job_root():
+    return current_app.config.get('EXPORT_JOB_DIR') or os.path.join(current_app.instance_path, 'export_jobs')
+
+
+class ExportJob:
+    """
+    A project export running in the background. State is mirrored to status.json in the
+    job directory, so any server process can report on it or serve the finished archive.
+    The job itself runs in a thread of the submitting process, recorded as owner_host and
+    owner_pid; see get_export_job() for jobs that process left unfinished.
+    Doubles as the progress object handed to generate_project_archive().
+    """
+
+    def __init__(self, job_id, project_id, directory, download_name, state=JOB_QUEUED,
+                 created_at=None, started_at=None, finished_at=None, error=None,
+                 pages_total=0, pages_rendered=0, assets_total=0, assets_packed=0, archive_size=None,
+                 precompress=False, owner_host=None, owner_pid=None):
+        self.id = job_id
+        self.project_id = project_id
+        self.directory = directory
+        self.download_name = download_name
+        self.state = state
+        self.created_at = created_at if created_at is not None else time.time()
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.error = error
+        self.pages_total = pages_total
+        self.pages_rendered = pages_rendered
+        self.assets_total = assets_total
+        self.assets_packed = assets_packed
+        self.archive_size = archive_size
+        self.precompress = precompress
+        self.owner_host = owner_host
+        self.owner_pid = owner_pid
+        self._last_saved = 0.0
+        self._save_interval = 0.5
+
+    @property
+    def archive_path(self):
+        return os.path.join(self.directory, JOB_ARCHIVE_FILENAME)
+
+    @property
+    def is_done(self):
+        return self.state in JOB_DONE_STATES
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'download_name': self.download_name,
+            'state': self.state,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'pages_total': self.pages_total,
+            'pages_rendered': self.pages_rendered,
+            'assets_total': self.assets_total,
+            'assets_packed': self.assets_packed,
+            'archive_size': self.archive_size,
+            'precompress': self.precompress,
+            'owner_host': self.owner_host,
+            'owner_pid': self.owner_pid,
+        }
+
+    @classmethod
+    def from_dict(cls, data, directory):
+        return cls(
+            data['id'], data['project_id'], directory, data['download_name'],
+            **{key: data.get(key) for key in (
+                'state', 'created_at', 'started_at', 'finished_at', 'error', 'archive_size'
+            )},
+            **{key: data.get(key) or 0 for key in (
+                'pages_total', 'pages_rendered', 'assets_total', 'assets_packed'
+            )},
+            precompress=bool(data.get('precompress')),
+            owner_host=data.get('owner_host'), owner_pid=data.get('owner_pid')
+        )
+
+    def save(self):
+        """Writes status.json atomically so readers never see a half-written file."""
+        status_path = os.path.join(self.directory, JOB_STATUS_FILENAME)
+        tmp_path = f"{status_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, status_path)
+        self._last_saved = time.monotonic()
+
+    def _save_throttled(self):
+        if time.monotonic() - self._last_saved >= self._save_interval:
+            self.save()
+
+    # --- progress callbacks from generate_project_archive ---
+    def page_done(self):
+        self.pages_rendered += 1
+        self._save_throttled()
+
+    def asset_done(self):
+        self.assets_packed += 1
+        self._save_throttled()
+
+
+def _get_job_executor():
+    global _job_executor
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('EXPORT_JOB_WORKERS', 2),
+                thread_name_prefix='export-job'
+            )
+        return _job_executor
+
+
+def submit_export_job(project, precompress=None):
+    """
+    Queues a background export of project and returns its ExportJob straight away.
+    precompress defaults to EXPORT_PRECOMPRESS (see generate_project_archive).
+    """
+    cleanup_expired_export_jobs()
+
+    job_id = uuid.uuid4().hex
+    directory = os.path.join(export_job_root(), job_id)
+    os.makedirs(directory)
+    download_name = f"{secure_filename(project.project_name if project.project_name else 'website')}_export.zip"
+    if precompress is None:
+        precompress = current_app.config.get('EXPORT_PRECOMPRESS', False)
+    job = ExportJob(job_id, project.id, directory, download_name, precompress=precompress,
+                    owner_host=socket.gethostname(), owner_pid=os.getpid())
+    job.save()
+    with _jobs_lock:
+        _jobs[job_id] = job
+
+    _get_job_executor().submit(_run_export_job, current_app._get_current_object(), job)
+    current_app.logger.info(f"Queued export job {job_id} for project {project.id}")
+    return job
+
+
+def _run_export_job(app, job):
+    # url_for() in render_final_page_html needs a request context, as in the render pool workers.
+    with app.test_request_context():
+        job.state = JOB_RUNNING
+        job.started_at = time.time()
+        tmp_path = f"{job.archive_path}.tmp"
+        try:
+            project = db.session.get(WebsiteProject, job.project_id)
+            if project is None:
+                raise LookupError(f"Project {job.project_id} no longer exists.")
+            job.pages_total = ProjectPage.query.filter_by(website_project_id=project.id).count()
+            job.assets_total = ProjectAsset.query.filter(
+                ProjectAsset.website_project_id == project.id,
+                ProjectAsset.stored_filename.isnot(None)
+            ).count() + AssetDerivative.query.join(
+                ProjectAsset, AssetDerivative.project_asset_id == ProjectAsset.id
+            ).filter(ProjectAsset.website_project_id == project.id).count()
+            job.save()
+
+            with open(tmp_path, 'wb') as f:
+                build_project_archive(f, project, progress=job, precompress=job.precompress)
+            os.replace(tmp_path, job.archive_path)
+            job.archive_size = os.path.getsize(job.archive_path)
+            job.state = JOB_FINISHED
+            app.logger.info(f"Export job {job.id} for project {job.project_id} finished ({job.archive_size} bytes)")
+        except Exception as e:
+            app.logger.error(f"Export job {job.id} for project {job.project_id} failed: {e}", exc_info=True)
+            job.state = JOB_FAILED
+            job.error = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            job.finished_at = time.time()
+            db.session.remove()
+            try:
+                job.save()
+            except OSError as e:
+                app.logger.error(f"Could not write status for export job {job.id}: {e}")
+
+
+def get_export_job(job_id):
+    """
+    The job with this id, from memory or from its status.json. None if unknown or expired.
+    An unfinished job whose process has stopped is marked JOB_INTERRUPTED (and saved) rather
+    than reported as queued or running forever. Jobs owned by another host cannot be
+    checked, so their status.json is returned as it stands.
+    """
+    if not JOB_ID_RE.match(job_id or ''):
+        return None
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job if os.path.isdir(job.directory) else None
+
+    directory = os.path.join(export_job_root(), job_id)
+    try:
+        with open(os.path.join(directory, JOB_STATUS_FILENAME)) as f:
+            job = ExportJob.from_dict(json.load(f), directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    if not job.is_done and _owner_has_stopped(job):
+        job.state = JOB_INTERRUPTED
+        job.error = "The server process running this export stopped before it finished."
+        job.finished_at = time.time()
+        try:
+            job.save()
+        except OSError as e:
+            current_app.logger.error(f"Could not write status for export job {job.id}: {e}")
+    return job
+
+
+def _owner_has_stopped(job):
+    """True if the process that submitted job is known to be gone (same host only)."""
+    if not job.owner_pid or job.owner_host != socket.gethostname():
+        return False
+    if job.owner_pid == os.getpid():
+        # Not in _jobs, so it was submitted by an earlier process with our pid (e.g. a container restart).
+        return True
+    try:
+        os.kill(job.owner_pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass # Running under another user
+    return False
+
+
+def cleanup_expired_export_jobs(now=None):
+    """
+    Deletes job directories older than EXPORT_JOB_TTL seconds: finished or failed jobs
+    by their finish time, and anything else (e.g. jobs orphaned by a restart) by the
+    last status update. Returns the number of jobs removed.
+    """
+    root = export_job_root()
+    if not os.path.isdir(root):
+        return 0
+    now = now if now is not None else time.time()
+    ttl = current_app.config.get('EXPORT_JOB_TTL', 24 * 60 * 60)
+
+    removed = 0
+    for job_id in os.listdir(root):
+        directory = os.path.join(root, job_id)
+        if not JOB_ID_RE.match(job_id) or not os.path.isdir(directory):
+            continue
+        status_path = os.path.join(directory, JOB_STATUS_FILENAME)
+        try:
+            with open(status_path) as f:
+                status = json.load(f)
+            expires_from = status.get('finished_at') or os.path.getmtime(status_path)
+        except (OSError, ValueError):
+            expires_from = os.path.getmtime(directory)
+        if now - expires_from < ttl:
+            continue
+
+        shutil.rmtree(directory, ignore_errors=True)
+        with _jobs_lock:
+            _jobs.pop(job_id, None)
+        removed += 1
+    if removed:
+        current_app.logger.info(f"Removed {removed} expired export job(s) from {root}")
+    return removed
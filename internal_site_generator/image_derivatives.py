@@ -0,0 +1,215 @@
+# ISG_Project/internal_site_generator/image_derivatives.py
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import update
+from markupsafe import Markup, escape
+from .models import db, ProjectAsset, AssetDerivative, AssetBlob, WebsiteProject
+from .asset_storage import store_blob, blob_path
+
+# Pillow is optional: without it images are served and exported as uploaded.
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+# Raster formats worth resizing; GIF (animation), SVG and ICO are left alone.
+DERIVABLE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp'}
+
+_derivative_executor = None
+_derivative_executor_lock = threading.Lock()
+
+
+# Attributes of ImageRef that templates read. `{{ x.attrs }}` and the like look like
+# placeholders, so extract_placeholders skips these under image keys.
+IMAGE_REF_ATTRIBUTES = ('attrs', 'srcset', 'width', 'height')
+
+
+class ImageRef(str):
+    """
+    An image URL in the template context. Renders as the URL, as before, and also
+    carries .width, .height and .srcset (empty when unknown), plus .attrs: ready-made
+    ` srcset="..." width=".." height=".."` for use as <img src="{{ x }}"{{ x|img_attrs }}>
+    (or `{{ x.attrs }}`).
+    """
+
+    def __new__(cls, url, width=None, height=None, srcset=''):
+        ref = super().__new__(cls, url)
+        ref.width = width
+        ref.height = height
+        ref.srcset = srcset
+        return ref
+
+    @property
+    def attrs(self):
+        parts = []
+        if self.srcset:
+            parts.append(f' srcset="{escape(self.srcset)}"')
+        if self.width and self.height:
+            parts.append(f' width="{self.width}" height="{self.height}"')
+        return Markup(''.join(parts))
+
+
+def img_attrs(value):
+    """Jinja filter: the srcset/width/height attributes of an ImageRef; empty for plain URLs."""
+    return value.attrs if isinstance(value, ImageRef) else Markup('')
+
+
+class ImageVariants:
+    """Intrinsic size of an image asset and its derivatives as (stored_filename, width), narrowest first."""
+
+    def __init__(self, width, height, sources=None):
+        self.width = width
+        self.height = height
+        self.sources = sources or []
+
+    def fingerprint(self):
+        return [self.width, self.height, self.sources]
+
+    def image_ref(self, url, url_for_name):
+        """ImageRef for the original at `url`; url_for_name maps a derivative's name to its URL."""
+        candidates = [f"{url_for_name(name)} {width}w" for name, width in self.sources]
+        if candidates and all(width != self.width for _name, width in self.sources):
+            candidates.append(f"{url} {self.width}w")
+        return ImageRef(url, self.width, self.height, ', '.join(candidates))
+
+
+def load_image_variants(project_id, filenames=None):
+    """
+    {stored_filename: ImageVariants} for a project's measured images (all of them, or only
+    those in filenames), in a single query.
+    """
+    query = db.session.query(
+        ProjectAsset.stored_filename, ProjectAsset.width, ProjectAsset.height,
+        AssetDerivative.stored_filename, AssetDerivative.width
+    ).outerjoin(AssetDerivative, AssetDerivative.project_asset_id == ProjectAsset.id)\
+        .filter(ProjectAsset.website_project_id == project_id, ProjectAsset.width.isnot(None))
+    if filenames is not None:
+        if not filenames:
+            return {}
+        query = query.filter(ProjectAsset.stored_filename.in_(list(filenames)))
+
+    variants = {}
+    for name, width, height, derivative_name, derivative_width in query.order_by(ProjectAsset.id, AssetDerivative.width):
+        entry = variants.get(name)
+        if entry is None:
+            entry = variants[name] = ImageVariants(width, height)
+        if derivative_name is not None:
+            entry.sources.append((derivative_name, derivative_width))
+    return variants
+
+
+def derivatives_enabled():
+    return Image is not None and current_app.config.get('IMAGE_DERIVATIVES', True)
+
+
+def _wants_derivatives(asset):
+    extension = asset.stored_filename.rsplit('.', 1)[-1].lower()
+    return asset.asset_type == 'image' and asset.blob_id is not None and extension in DERIVABLE_EXTENSIONS
+
+
+def _get_derivative_executor():
+    global _derivative_executor
+    with _derivative_executor_lock:
+        if _derivative_executor is None:
+            _derivative_executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('IMAGE_DERIVATIVE_WORKERS', 2),
+                thread_name_prefix='image-derivatives'
+            )
+        return _derivative_executor
+
+
+def schedule_image_derivatives(assets):
+    """
+    Generates derivatives for newly committed image assets off the request thread.
+    With IMAGE_DERIVATIVE_WORKERS = 0 they are generated inline instead.
+    """
+    if not derivatives_enabled():
+        return
+    asset_ids = [asset.id for asset in assets if _wants_derivatives(asset) and asset.width is None]
+    if not asset_ids:
+        return
+    app = current_app._get_current_object()
+    if current_app.config.get('IMAGE_DERIVATIVE_WORKERS', 2) <= 0:
+        for asset_id in asset_ids:
+            _generate_safely(app, asset_id)
+        return
+    executor = _get_derivative_executor()
+    for asset_id in asset_ids:
+        executor.submit(_generate_in_worker, app, asset_id)
+
+
+def _generate_safely(app, asset_id):
+    """A file Pillow cannot read just gets no derivatives; it is still served as uploaded."""
+    try:
+        asset = db.session.get(ProjectAsset, asset_id)
+        if asset is not None:
+            generate_image_derivatives(asset)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Could not generate derivatives for asset {asset_id}: {e}")
+
+
+def _generate_in_worker(app, asset_id):
+    with app.app_context():
+        try:
+            _generate_safely(app, asset_id)
+        finally:
+            db.session.remove()
+
+
+def generate_image_derivatives(asset):
+    """
+    Records the image's size and stores a re-encoded copy (IMAGE_DERIVATIVE_FORMAT) at every
+    IMAGE_DERIVATIVE_WIDTHS width narrower than the original, plus one at full width
+    unless the original is already in that format.
+    Derivatives are blobs like any upload. Commits. Returns the number of derivatives made.
+    """
+    from .rendering import invalidate_rendered_pages
+
+    if not derivatives_enabled() or not _wants_derivatives(asset) or asset.width is not None:
+        return 0
+
+    derivative_format = current_app.config.get('IMAGE_DERIVATIVE_FORMAT', 'webp').lower()
+    quality = current_app.config.get('IMAGE_DERIVATIVE_QUALITY', 80)
+    stem = asset.stored_filename.rsplit('.', 1)[0]
+
+    with Image.open(blob_path(asset.blob.sha256)) as original:
+        image = ImageOps.exif_transpose(original) # Camera photos: apply EXIF rotation
+        width, height = image.size
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+        target_widths = [w for w in current_app.config.get('IMAGE_DERIVATIVE_WIDTHS', ()) if w < width]
+        if asset.stored_filename.rsplit('.', 1)[-1].lower() != derivative_format:
+            target_widths.append(width) # Full size in the modern format
+
+        created = 0
+        for target_width in sorted(set(target_widths)):
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            encoded = io.BytesIO()
+            resized.save(encoded, format=derivative_format.upper(), quality=quality)
+            encoded.seek(0)
+
+            blob = store_blob(encoded)
+            blob.ref_count = AssetBlob.ref_count + 1
+            db.session.add(AssetDerivative(
+                asset=asset, blob=blob,
+                stored_filename=f"{stem}-{target_width}w.{derivative_format}",
+                width=target_width, height=target_height, format=derivative_format
+            ))
+            created += 1
+
+    asset.width, asset.height = width, height
+    # Other processes drop their cached previews when they see the new version; this one drops them now.
+    # Core update so the project's updated_at (its settings) stays as it is.
+    db.session.execute(
+        update(WebsiteProject).where(WebsiteProject.id == asset.website_project_id)
+        .values(image_version=WebsiteProject.image_version + 1, updated_at=WebsiteProject.updated_at)
+    )
+    db.session.commit()
+    invalidate_rendered_pages(project_id=asset.website_project_id)
+    current_app.logger.info(f"Generated {created} derivatives for asset {asset.id} ({width}x{height})")
+    return created
@@ -1,165 +1,155 @@
-import re
 import json
 import os
 import uuid
+import mimetypes
+import hashlib
+import re
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 import shutil
 from flask import (
     Blueprint, render_template, redirect, url_for, flash, request,
-    make_response, current_app, send_from_directory
+    make_response, current_app, send_file, Response, stream_with_context, abort, jsonify
 )
 from markupsafe import Markup
-from jinja2 import Environment, select_autoescape,  exceptions as jinja_exceptions # For rendering string templates
+from jinja2 import exceptions as jinja_exceptions
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, load_only, defer
 from .models import (
-    db, User, PageTemplate, WebsiteProject, ProjectPage, ProjectAsset, NavbarItem
+    db, User, PageTemplate, WebsiteProject, ProjectPage, ProjectAsset, NavbarItem, AssetDerivative
 )
 from .forms import (
     PageTemplateForm, WebsiteProjectForm, ProjectPageForm
 )
+from .rendering import (
+    NAV_MARKER, NAVBAR_SLOT_VAR, HEAD_SLOT_VAR, get_compiled_template, instrument_template_source,
+    rendered_page_cache, rendered_page_cache_key, compute_etag, invalidate_rendered_pages,
+    get_navbar_html, invalidate_navbar, apply_injection_plan,
+    apply_placeholder_schema, get_placeholder_schema,
+    ContextPlan, get_context_plan, resolve_preview_image_urls, theme_css
+)
+from .export import (
+    build_project_archive, stream_project_archive, export_render_cache_root,
+    parse_manifest, MANIFEST_FILENAME
+)
+from . import csrf
+from .snapshots import ProjectSnapshot, load_page_for_render
+from .dashboard_stats import load_dashboard_stats, counted_total
+from .pagination import paginate_keyset
+from .image_derivatives import load_image_variants, schedule_image_derivatives
+from .compression import is_compressible, negotiate_compressed_body, set_encoded_body
+from .export_jobs import submit_export_job, get_export_job, JOB_FINISHED, JOB_INTERRUPTED
+from .chunked_uploads import (
+    create_upload_session, get_upload_session, append_upload_chunk, finalize_upload_session,
+    discard_upload_session, UploadOffsetMismatch
+)
+from .asset_storage import (
+    add_project_asset, release_project_asset, release_project_assets, purge_unreferenced_blobs,
+    blob_path, ASSET_TYPE_DISK_FOLDERS
+)
 import io
-import zipfile
 
 
 bp = Blueprint('main', __name__)
 
 # --- Helper Functions ---
 
-def extract_placeholders(html_content):
-    """
-    Extracts custom {{ placeholder.key }} style placeholders for form generation.
-    This does NOT process Jinja2 logic.
-    """
-    if not html_content:
-        return []
-    # Regex to find {{ placeholder.key }} or {{ placeholder.key | filter }}
-    # It captures the part inside {{ }} before any | filter or closing }}
-    placeholders = set(re.findall(r"\{\{\s*([^}|]+?)\s*(?:\|.*?)?\}\}", html_content))
-    
-    valid_form_placeholders = set()
-    for p_raw in placeholders:
-        p = p_raw.strip()
-        # Basic validation: must contain a dot (for nesting like hero.title) OR be a simple identifier.
-        # Avoids complex Jinja like {% for item in items %} or {{ config.value }}.
-        # This logic can be refined if template syntax for placeholders becomes more complex.
-        if '.' in p or not any(c in p for c in ' %(){}\'"[]'): # Exclude common Jinja constructs
-            valid_form_placeholders.add(p)
-            
-    return sorted(list(valid_form_placeholders))
-
 # MODIFIED _build_context_from_flat_dict
-def _build_context_from_flat_dict(flat_dict, project_id=None, export_mode=False, relative_image_path_prefix="assets/images"):
+def _build_context_from_flat_dict(flat_dict, project_id=None, export_mode=False, relative_image_path_prefix="assets/images",
+                                  context_plan=None, image_variants=None):
     """
     Converts a flat dictionary with dot-notation keys (e.g., "hero.title")
     into a nested dictionary suitable for Jinja2 context.
     If export_mode is True, generates relative paths for images.
     Otherwise, converts image filenames to full URLs for live preview.
+    context_plan (see rendering.get_context_plan) supplies precomputed key paths and
+    image flags; without one every key is split and classified on the fly.
+    image_variants, if given, maps a list of image filenames to {filename: ImageVariants};
+    those images become ImageRefs carrying srcset, width and height.
     """
     context = {}
     if not flat_dict:
         return context
 
-    for key, value in flat_dict.items():
-        parts = key.split('.')
+    if context_plan is None:
+        context_plan = ContextPlan([])
+
+    entries = [(context_plan.lookup(key), str(value) if value is not None else '') for key, value in flat_dict.items()]
+
+    local_image_filenames = [
+        value_str for (_parents, _leaf, is_image_key), value_str in entries
+        if is_image_key and value_str and not value_str.startswith('/') and
+           not value_str.startswith(('http://', 'https://'))
+    ]
+    variants_by_filename = image_variants(local_image_filenames) if image_variants and local_image_filenames else {}
+
+    preview_image_urls = {}
+    if not export_mode and project_id:
+        # Resolve every preview image URL for the page (derivatives included) in one pass.
+        preview_image_urls = resolve_preview_image_urls(project_id, local_image_filenames + [
+            name for variants in variants_by_filename.values() for name, _width in variants.sources
+        ])
+    export_image_prefix = relative_image_path_prefix.strip('/')
+
+    def image_url(filename):
+        if export_mode:
+            return f"{export_image_prefix}/{filename}"
+        return preview_image_urls.get(filename, filename)
+
+    for (parent_path, leaf, is_image_key), current_value_str in entries:
         current_level = context
-        for i, part_name in enumerate(parts):
-            part_name = part_name.strip()
-            if i == len(parts) - 1: # Last part, assign the value
-                is_image_key = 'image' in key.lower() or \
-                               key.lower().endswith('_src') or \
-                               key.lower().endswith('_url')
-                
-                current_value_str = str(value) if value is not None else ''
-
-                if is_image_key and current_value_str: # Process if it's an image key and has a value
-                    if export_mode:
-                        # For export, use relative paths
-                        current_level[part_name] = f"{relative_image_path_prefix.strip('/')}/{current_value_str}"
-                    elif project_id and not current_value_str.startswith('/') and \
-                         not current_value_str.startswith(('http://', 'https://')):
-                        # For live preview, generate full URLs
-                        try:
-                            if request: 
-                                 current_level[part_name] = url_for('main.serve_asset', project_id=project_id, asset_type='images', filename=current_value_str)
-                            else: 
-                                with current_app.app_context():
-                                    current_level[part_name] = url_for('main.serve_asset', project_id=project_id, asset_type='images', filename=current_value_str)
-                        except Exception as e:
-                            current_app.logger.error(f"Error building URL for asset '{current_value_str}' in context (key: {key}): {e}")
-                            current_level[part_name] = f"/uploads/{project_id}/images/{current_value_str}" # Fallback path for live preview
-                    else:
-                        # If it's already a full URL or no project_id for url_for, use as is
-                        current_level[part_name] = current_value_str
-                else:
-                    # Not an image key, or no value, or already a full path/URL
-                    current_level[part_name] = current_value_str
-            else:
-                current_level = current_level.setdefault(part_name, {})
+        for part_name in parent_path:
+            current_level = current_level.setdefault(part_name, {})
+            if not isinstance(current_level, dict):
+                break
+        if not isinstance(current_level, dict):
+            # e.g. "hero.image.attrs" saved by an older editor under the image value itself
+            current_app.logger.debug(f"Skipping content key under a non-dict value: {'.'.join(parent_path + (leaf,))}")
+            continue
+
+        if is_image_key and current_value_str: # Process if it's an image key and has a value
+            # Export: relative paths. Preview: the resolved URL; full URLs/paths (or no project) are used as is
+            url = image_url(current_value_str)
+            variants = variants_by_filename.get(current_value_str)
+            current_level[leaf] = variants.image_ref(url, image_url) if variants else url
+        else:
+            # Not an image key, or no value
+            current_level[leaf] = current_value_str
     return context
 
 
 # MODIFIED render_final_page_html
 def render_final_page_html(raw_template_html, content_data_dict, global_css="", project=None, page_obj=None, 
-                           export_mode=False, asset_path_config=None):
+                           export_mode=False, asset_path_config=None, template_obj=None, snapshot=None,
+                           stylesheet_href=None):
     """
     Renders the final HTML for a page.
     - Injects navbar, theme CSS, favicon, global CSS.
     - If export_mode is True, asset paths (images, favicon) are made relative based on asset_path_config.
+    - Pass template_obj (the PageTemplate) so the compiled template is reused across renders.
+    - Pass snapshot (a snapshots.ProjectSnapshot) to take the navbar from it instead of looking it up.
+    - Pass stylesheet_href to link a shared stylesheet (rendering.build_site_stylesheet) instead of
+      inlining the theme and global CSS.
     """
     current_app.logger.debug(
         f"Starting render_final_page_html (export_mode: {export_mode}) for page_id: {page_obj.id if page_obj else 'N/A'}, "
         f"project_id: {project.id if project and project.id else 'N/A'}"
     )
 
-    processed_html_string = str(raw_template_html) if raw_template_html is not None else ""
-
-    # --- Stage 1: Pre-processing and Injection ---
-    nav_marker = 'CUSTOM MARKER' 
-    navbar_html_content = ""
-
-    if project:
-        navbar_items_query = NavbarItem.query.filter_by(website_project_id=project.id)\
-            .join(ProjectPage, NavbarItem.project_page_id == ProjectPage.id)\
-            .order_by(NavbarItem.order).all()
-
-        if navbar_items_query:
-            navbar_html_list = []
-            for item in navbar_items_query:
-                # Navbar links are relative to HTML file location, good for static export too.
-                page_url = f"{item.page.slug}.html" if item.page and item.page.slug else "#"
-                navbar_html_list.append(f'<li><a href="{page_url}">{Markup.escape(item.link_text)}</a></li>')
-            if navbar_html_list:
-                navbar_html_content = f"<nav class=\"site-navbar\"><ul>{''.join(navbar_html_list)}</ul></nav>"
-        
-        if navbar_html_content:
-            if nav_marker in processed_html_string:
-                processed_html_string = processed_html_string.replace(nav_marker, Markup(navbar_html_content))
-            else:
-                body_match = re.search(r'(<body[^>]*>)', processed_html_string, flags=re.IGNORECASE)
-                if body_match:
-                    insert_pos = body_match.end()
-                    part1 = processed_html_string[:insert_pos]
-                    part2 = processed_html_string[insert_pos:]
-                    processed_html_string = str(part1) + str(Markup(navbar_html_content)) + str(part2)
-                else:
-                    processed_html_string = str(Markup(navbar_html_content)) + processed_html_string
+    # --- Stage 1: Build the navbar and head fragments ---
+    # These are handed to the template as render-time variables (see rendering.instrument_template_source),
+    # so the compiled template does not depend on them.
+    if snapshot is not None:
+        navbar_html_content = snapshot.navbar_html
+    else:
+        navbar_html_content = get_navbar_html(project) if project else ""
 
     head_injections = []
     if project:
-        theme_colors_css_vars = []
-        if project.primary_color:
-            theme_colors_css_vars.append(f"  --theme-primary-color: {Markup.escape(project.primary_color)};")
-        if project.secondary_color:
-            theme_colors_css_vars.append(f"  --theme-secondary-color: {Markup.escape(project.secondary_color)};")
-        if project.accent_color:
-            theme_colors_css_vars.append(f"  --theme-accent-color: {Markup.escape(project.accent_color)};")
-        
-        if theme_colors_css_vars:
-            head_injections.append(
-                "<style id=\"theme-colors-vars\">\n:root {\n" +
-                "\n".join(theme_colors_css_vars) +
-                "\n}\n</style>"
-            )
+        theme_colors_css = theme_css(project) if not stylesheet_href else ""
+        if theme_colors_css:
+            head_injections.append(f"<style id=\"theme-colors-vars\">\n{theme_colors_css}\n</style>")
 
         if project.favicon_path:
             favicon_url = ""
@@ -178,34 +168,33 @@ def render_final_page_html(raw_template_html, content_data_dict, global_css="",
                 mime_type = mime_type_map.get(ext, "image/vnd.microsoft.icon")
                 head_injections.append(f'<link rel="icon" type="{mime_type}" href="{favicon_url}">')
 
-    if global_css:
+    if stylesheet_href:
+        head_injections.append(f'<link rel="stylesheet" id="global-project-css" href="{Markup.escape(stylesheet_href)}">')
+    elif global_css:
         head_injections.append(f"<style id=\"global-project-css\">\n{global_css}\n</style>")
 
-    if head_injections:
-        combined_head_html = Markup("\n".join(head_injections) + "\n")
-        head_close_match = re.search(r'(</head>)', processed_html_string, flags=re.IGNORECASE)
-        if head_close_match:
-            insert_pos = head_close_match.start()
-            part1 = processed_html_string[:insert_pos]
-            part2 = processed_html_string[insert_pos:]
-            processed_html_string = str(part1) + str(combined_head_html) + str(part2)
-        else:
-            if isinstance(processed_html_string, Markup):
-                 processed_html_string = combined_head_html + processed_html_string
-            else:
-                 processed_html_string = str(combined_head_html) + processed_html_string
+    combined_head_html = Markup("\n".join(head_injections) + "\n") if head_injections else Markup("")
+    # With no navbar a nav marker in the template is left in place, as before; a slot
+    # that was only inserted after <body> stays empty.
+    if navbar_html_content:
+        navbar_slot_html = Markup(navbar_html_content)
+    elif raw_template_html and NAV_MARKER in str(raw_template_html):
+        navbar_slot_html = Markup(NAV_MARKER)
+    else:
+        navbar_slot_html = Markup("")
+
+    if snapshot is not None:
+        image_variants = snapshot.image_variants_for
+    elif project and project.id:
+        image_variants = lambda filenames: load_image_variants(project.id, filenames)
+    else:
+        image_variants = None
 
-    # --- Stage 2: Render the processed string as a Jinja2 template ---
+    # --- Stage 2: Render the (cached) compiled template ---
     final_rendered_html = ""
     template_context = {} 
 
     try:
-        jinja_env = Environment(
-            loader=None, 
-            autoescape=select_autoescape(['html', 'xml']),
-        )
-        jinja_env.globals['url_for'] = url_for
-        
         project_id_for_context = project.id if project and project.id else None
         image_relative_path_prefix = ""
         if export_mode and asset_path_config:
@@ -215,28 +204,31 @@ def render_final_page_html(raw_template_html, content_data_dict, global_css="",
             content_data_dict, 
             project_id_for_context,
             export_mode=export_mode,
-            relative_image_path_prefix=image_relative_path_prefix
+            relative_image_path_prefix=image_relative_path_prefix,
+            context_plan=get_context_plan(template_obj) if template_obj is not None else None,
+            image_variants=image_variants
         )
         
         if project:
             template_context['project'] = project 
         if page_obj:
             template_context['page'] = page_obj
+        template_context[NAVBAR_SLOT_VAR] = navbar_slot_html
+        template_context[HEAD_SLOT_VAR] = combined_head_html
         
         current_app.logger.debug(f"Rendering Jinja template for export_mode={export_mode} with context keys: {list(template_context.keys())}")
         
-        final_template = jinja_env.from_string(str(processed_html_string))
+        final_template = get_compiled_template(raw_template_html, template_obj=template_obj)
         final_rendered_html = final_template.render(template_context)
         current_app.logger.debug("Jinja template rendered successfully.")
 
     except jinja_exceptions.TemplateSyntaxError as e:
-        # ... (existing error handling for TemplateSyntaxError, ensure Markup.escape(str(processed_html_string))) ...
         error_type_name = type(e).__name__
         error_message_from_exception = str(e)
         line_info = f" (This error occurred near line {e.lineno} of the processed template string shown below)" if hasattr(e, 'lineno') and e.lineno is not None else " (Line number not available)"
         current_app.logger.error(f"Jinja2 TemplateSyntaxError: {error_message_from_exception}{line_info}", exc_info=True)
         error_detail_for_user_str = Markup.escape(f"{error_message_from_exception}{line_info}")
-        # ... (rest of the f-string for error display, ensure it uses Markup.escape for dynamic parts)
+        processed_html_string = instrument_template_source(raw_template_html)
         final_rendered_html = f"""<div style='border: 3px solid red; padding: 15px;'><h2>Template Error</h2><p>Type: {Markup.escape(error_type_name)}</p><p>Message: {error_detail_for_user_str}</p><pre>{Markup.escape(str(processed_html_string))}</pre></div>"""
 
 
@@ -263,24 +255,25 @@ def allowed_file(filename):
 @bp.route('/index')
 @login_required
 def index():
-    page_templates_sample = PageTemplate.query.order_by(PageTemplate.name).limit(5).all()
-    page_templates_count = PageTemplate.query.count()
-    website_projects_sample = WebsiteProject.query.order_by(WebsiteProject.project_name).limit(5).all()
-    website_projects_count = WebsiteProject.query.count()
-    
+    stats = load_dashboard_stats()
     return render_template('main/dashboard.html', title='Dashboard', current_user=current_user,
-                             page_templates_sample=page_templates_sample,
-                             page_templates_count=page_templates_count,
-                             website_projects_sample=website_projects_sample,
-                             website_projects_count=website_projects_count)
+                             page_templates_sample=stats.templates,
+                             page_templates_count=stats.template_count,
+                             website_projects_sample=stats.projects,
+                             website_projects_count=stats.project_count,
+                             project_pages_count=stats.page_count,
+                             project_assets_count=stats.asset_count)
 
 # --- Page Template Routes ---
 @bp.route('/templates')
 @login_required
 def list_templates():
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    templates_pagination = PageTemplate.query.order_by(PageTemplate.name).paginate(page=page, per_page=per_page, error_out=False)
+    templates_pagination = paginate_keyset(
+        PageTemplate.query.options(load_only(PageTemplate.id, PageTemplate.name, PageTemplate.description, PageTemplate.created_at)),
+        (PageTemplate.name, PageTemplate.id), current_app.config.get('LIST_PAGE_SIZE', 10),
+        after=request.args.get('after'), before=request.args.get('before'),
+        total=counted_total(PageTemplate) if current_app.config.get('LIST_APPROXIMATE_TOTALS', True) else None
+    )
     templates = templates_pagination.items
     return render_template('main/list_templates.html', title='Page Templates', templates=templates, pagination=templates_pagination, current_user=current_user)
 
@@ -298,6 +291,8 @@ def new_template():
                 description=form.description.data,
                 html_content=form.html_content.data
             )
+            apply_injection_plan(new_template_obj)
+            apply_placeholder_schema(new_template_obj)
             db.session.add(new_template_obj)
             db.session.commit()
             flash(f'Template "{new_template_obj.name}" created successfully!', 'success')
@@ -319,7 +314,10 @@ def edit_template(template_id):
         template_to_edit.name = form.name.data
         template_to_edit.description = form.description.data
         template_to_edit.html_content = form.html_content.data
+        apply_injection_plan(template_to_edit)
+        apply_placeholder_schema(template_to_edit)
         db.session.commit()
+        invalidate_rendered_pages(template_id=template_to_edit.id)
         flash(f'Template "{template_to_edit.name}" updated successfully!', 'success')
         return redirect(url_for('main.list_templates'))
     return render_template('main/template_form.html', title='Edit Page Template', form=form, legend=f'Edit Template: {template_to_edit.name}', current_user=current_user)
@@ -335,6 +333,7 @@ def delete_template(template_id):
     template_name = template_to_delete.name
     db.session.delete(template_to_delete)
     db.session.commit()
+    invalidate_rendered_pages(template_id=template_id)
     flash(f'Template "{template_name}" deleted successfully.', 'success')
     return redirect(url_for('main.list_templates'))
 
@@ -342,9 +341,11 @@ def delete_template(template_id):
 @bp.route('/projects')
 @login_required
 def list_projects():
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    projects_pagination = WebsiteProject.query.order_by(WebsiteProject.project_name).paginate(page=page, per_page=per_page, error_out=False)
+    projects_pagination = paginate_keyset(
+        WebsiteProject.query, (WebsiteProject.project_name, WebsiteProject.id), current_app.config.get('LIST_PAGE_SIZE', 10),
+        after=request.args.get('after'), before=request.args.get('before'),
+        total=counted_total(WebsiteProject) if current_app.config.get('LIST_APPROXIMATE_TOTALS', True) else None
+    )
     projects = projects_pagination.items
     return render_template('main/list_projects.html', title='Website Projects', projects=projects, pagination=projects_pagination, current_user=current_user)
 
@@ -367,15 +368,10 @@ def new_project():
             )
             
             favicon_file_to_save = None
-            favicon_original_filename = None
             
             if form.favicon.data:
                 file = form.favicon.data
                 if file.filename and allowed_file(file.filename):
-                    favicon_original_filename = secure_filename(file.filename)
-                    extension = favicon_original_filename.rsplit('.', 1)[1].lower()
-                    stored_filename_stem = f"favicon_{uuid.uuid4().hex[:8]}"
-                    new_project_obj.favicon_path = f"{stored_filename_stem}.{extension}" 
                     favicon_file_to_save = file 
                 elif file.filename: 
                     flash('Invalid favicon file type for new project. Favicon not saved.', 'warning')
@@ -384,19 +380,10 @@ def new_project():
             try:
                 db.session.commit() 
 
-                if favicon_file_to_save and new_project_obj.favicon_path:
-                    favicon_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(new_project_obj.id), 'favicons')
-                    os.makedirs(favicon_folder, exist_ok=True)
-                    file_path = os.path.join(favicon_folder, new_project_obj.favicon_path)
-                    favicon_file_to_save.save(file_path)
-
-                    asset = ProjectAsset(
-                        website_project_id=new_project_obj.id,
-                        asset_type='favicon',
-                        original_filename=favicon_original_filename, 
-                        stored_filename=new_project_obj.favicon_path
-                    )
-                    db.session.add(asset)
+                if favicon_file_to_save:
+                    asset = add_project_asset(new_project_obj.id, 'favicon', favicon_file_to_save,
+                                              stored_filename_stem=f"favicon_{uuid.uuid4().hex[:8]}")
+                    new_project_obj.favicon_path = asset.stored_filename
                     db.session.commit()
 
                 flash(f'Project "{new_project_obj.project_name}" created successfully!', 'success')
@@ -429,50 +416,31 @@ def edit_project(project_id):
         project_to_edit.secondary_color = form.secondary_color.data if form.secondary_color.data else None
         project_to_edit.accent_color = form.accent_color.data if form.accent_color.data else None
 
+        released_blob_ids = []
         if form.favicon.data: 
             file = form.favicon.data
             if file.filename and allowed_file(file.filename):
-                original_filename = secure_filename(file.filename)
-                extension = original_filename.rsplit('.', 1)[1].lower()
-                stored_filename_stem = f"favicon_{uuid.uuid4().hex[:8]}"
-                stored_filename = f"{stored_filename_stem}.{extension}"
-                
-                favicon_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(project_to_edit.id), 'favicons')
-                os.makedirs(favicon_folder, exist_ok=True)
-                file_path = os.path.join(favicon_folder, stored_filename)
+                # Re-uploading the current favicon's bytes returns the existing asset.
+                asset = add_project_asset(project_to_edit.id, 'favicon', file,
+                                          stored_filename_stem=f"favicon_{uuid.uuid4().hex[:8]}")
 
-                if project_to_edit.favicon_path and project_to_edit.favicon_path != stored_filename:
+                if project_to_edit.favicon_path and project_to_edit.favicon_path != asset.stored_filename:
                     old_asset = ProjectAsset.query.filter_by(
                         website_project_id=project_to_edit.id,
                         asset_type='favicon',
                         stored_filename=project_to_edit.favicon_path
                     ).first()
                     if old_asset:
-                        old_file_path_on_disk = os.path.join(current_app.config['UPLOAD_FOLDER'], str(project_to_edit.id), 'favicons', old_asset.stored_filename)
-                        if os.path.exists(old_file_path_on_disk):
-                            try:
-                                os.remove(old_file_path_on_disk)
-                            except OSError as e:
-                                current_app.logger.error(f"Error deleting old favicon file {old_file_path_on_disk}: {e}")
-                        db.session.delete(old_asset)
-                
-                file.save(file_path)
-                
-                asset = ProjectAsset.query.filter_by(website_project_id=project_to_edit.id, asset_type='favicon', stored_filename=stored_filename).first()
-                if not asset:
-                    asset = ProjectAsset(
-                        website_project_id=project_to_edit.id,
-                        asset_type='favicon',
-                        original_filename=original_filename,
-                        stored_filename=stored_filename
-                    )
-                    db.session.add(asset)
-                project_to_edit.favicon_path = stored_filename
+                        released_blob_ids.extend(release_project_asset(old_asset))
+
+                project_to_edit.favicon_path = asset.stored_filename
             elif file.filename: 
                 flash('Invalid favicon file type. Favicon not updated.', 'warning')
         
         try:
             db.session.commit()
+            purge_unreferenced_blobs(released_blob_ids)
+            invalidate_rendered_pages(project_id=project_to_edit.id)
             flash(f'Project "{project_to_edit.project_name}" updated successfully!', 'success')
             return redirect(url_for('main.list_projects'))
         except Exception as e:
@@ -498,8 +466,15 @@ def delete_project(project_id):
             current_app.logger.error(f"Error deleting asset folder {project_upload_root}: {e}")
             flash(f"Error deleting project assets for {project_name}. Please check server logs.", "danger")
 
+    project_render_cache = os.path.join(export_render_cache_root(), str(project_to_delete.id))
+    shutil.rmtree(project_render_cache, ignore_errors=True)
+
+    released_blob_ids = release_project_assets(project_to_delete.id)
     db.session.delete(project_to_delete)
     db.session.commit()
+    purge_unreferenced_blobs(released_blob_ids)
+    invalidate_navbar(project_id)
+    invalidate_rendered_pages(project_id=project_id)
     flash(f'Project "{project_name}" and its associated items/assets have been deleted.', 'success')
     return redirect(url_for('main.list_projects'))
 
@@ -508,11 +483,21 @@ def delete_project(project_id):
 @login_required
 def list_project_pages(project_id):
     project = WebsiteProject.query.get_or_404(project_id)
-    project_pages_list = ProjectPage.query.filter_by(website_project_id=project.id).order_by(ProjectPage.title).all()
+    # The list only shows the template's name; joining it in avoids a lazy load per row.
+    pages_query = ProjectPage.query.filter_by(website_project_id=project.id).options(
+        defer(ProjectPage.content_data_json),
+        joinedload(ProjectPage.template).load_only(PageTemplate.id, PageTemplate.name)
+    )
+    pages_pagination = paginate_keyset(
+        pages_query, (ProjectPage.title, ProjectPage.id), current_app.config.get('PROJECT_PAGES_PAGE_SIZE', 50),
+        after=request.args.get('after'), before=request.args.get('before'),
+        total=project.page_count if current_app.config.get('LIST_APPROXIMATE_TOTALS', True) else None
+    )
     return render_template('main/list_project_pages.html',
                              title=f'Pages for "{project.project_name}"',
                              project=project,
-                             pages=project_pages_list,
+                             pages=pages_pagination.items,
+                             pagination=pages_pagination,
                              current_user=current_user
                            ) # Corrected SyntaxError here
 
@@ -604,11 +589,17 @@ def edit_project_page_settings(project_id, page_id):
                                            form=form, project=project, legend='Edit Page Settings',
                                            current_user=current_user)
             
+            slug_changed = form.slug.data != page_to_edit.slug
             page_to_edit.title = form.title.data
             page_to_edit.slug = form.slug.data
             page_to_edit.page_template_id = selected_template_id
+            if slug_changed:
+                project.bump_navbar_version() # Navbar links are built from slugs
             
             db.session.commit()
+            if slug_changed:
+                invalidate_navbar(project.id)
+            invalidate_rendered_pages(project_id=project.id if slug_changed else None, page_id=page_to_edit.id)
             flash(f'Page settings for "{page_to_edit.title}" updated successfully!', 'success')
             return redirect(url_for('main.list_project_pages', project_id=project.id))
     
@@ -624,7 +615,10 @@ def delete_project_page(project_id, page_id):
     page_to_delete = ProjectPage.query.filter_by(id=page_id, website_project_id=project.id).first_or_404()
     page_title = page_to_delete.title
     db.session.delete(page_to_delete) 
+    project.bump_navbar_version() # Its navbar entries are deleted with it
     db.session.commit()
+    invalidate_navbar(project.id)
+    invalidate_rendered_pages(project_id=project.id)
     flash(f'Page "{page_title}" has been deleted from project "{project.project_name}".', 'success')
     return redirect(url_for('main.list_project_pages', project_id=project.id))
 
@@ -638,7 +632,7 @@ def edit_page_content(project_id, page_id):
         flash('This page does not have an associated template. Cannot edit content.', 'danger')
         return redirect(url_for('main.list_project_pages', project_id=project.id))
 
-    placeholders = extract_placeholders(page.template.html_content)
+    placeholders = get_placeholder_schema(page.template)
     current_content = {}
     if page.content_data_json:
         try:
@@ -651,31 +645,20 @@ def edit_page_content(project_id, page_id):
     if request.method == 'POST':
         new_content_data = {}
         form_had_errors = False
+        uploaded_assets = []
 
-        for placeholder_key_raw in placeholders:
-            placeholder_key = placeholder_key_raw.strip()
-            is_image_key = 'image' in placeholder_key.lower() or \
-                           placeholder_key.lower().endswith('_src') or \
-                           placeholder_key.lower().endswith('_url')
+        for placeholder_field in placeholders:
+            placeholder_key = placeholder_field['key']
+            is_image_key = placeholder_field['kind'] == 'image'
             file_input_name = f"{placeholder_key}_file"
 
             if is_image_key and file_input_name in request.files:
                 file = request.files[file_input_name]
                 if file and file.filename and allowed_file(file.filename):
-                    original_filename = secure_filename(file.filename)
-                    extension = original_filename.rsplit('.', 1)[1].lower()
-                    stored_filename_stem = uuid.uuid4().hex
-                    stored_filename = f"{stored_filename_stem}.{extension}"
-                    project_asset_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(project.id), 'images')
-                    os.makedirs(project_asset_folder, exist_ok=True)
-                    file_path = os.path.join(project_asset_folder, stored_filename)
-                    file.save(file_path)
-                    asset = ProjectAsset(
-                        website_project_id=project.id, asset_type='image',
-                        original_filename=original_filename, stored_filename=stored_filename
-                    )
-                    db.session.add(asset)
-                    new_content_data[placeholder_key] = stored_filename
+                    # Stored once per content digest; the same image uploaded again reuses its asset.
+                    asset = add_project_asset(project.id, 'image', file)
+                    uploaded_assets.append(asset)
+                    new_content_data[placeholder_key] = asset.stored_filename
                 elif file and file.filename:
                     flash(f"File type for '{placeholder_key}' not allowed. Allowed: {', '.join(current_app.config['ALLOWED_EXTENSIONS'])}. Previous image kept.", 'warning')
                     new_content_data[placeholder_key] = current_content.get(placeholder_key, '')
@@ -688,6 +671,9 @@ def edit_page_content(project_id, page_id):
         page.content_data_json = json.dumps(new_content_data)
         try:
             db.session.commit()
+            invalidate_rendered_pages(page_id=page.id)
+            # Resized / modern-format variants are made in the background; pages pick them up when ready.
+            schedule_image_derivatives(uploaded_assets)
             if not form_had_errors:
                  flash(f'Content for page "{page.title}" updated successfully!', 'success')
         except Exception as e:
@@ -733,9 +719,12 @@ def manage_navbar(project_id):
         
         if new_navbar_items_to_add:
             db.session.add_all(new_navbar_items_to_add)
+        project.bump_navbar_version()
         
         try:
             db.session.commit()
+            invalidate_navbar(project.id)
+            invalidate_rendered_pages(project_id=project.id)
             flash('Navbar updated successfully!', 'success')
         except Exception as e:
             db.session.rollback()
@@ -758,6 +747,9 @@ def manage_navbar(project_id):
 
 
 # ---- Route to Serve Uploaded Assets ----
+# Names generated at upload (uuid4 hex, favicon_<8 hex>) are never reused for other bytes.
+IMMUTABLE_ASSET_NAME_RE = re.compile(r'^(?:[0-9a-f]{32}|favicon_[0-9a-f]{8})\.[A-Za-z0-9]+$')
+
 @bp.route('/uploads/<int:project_id>/<path:asset_type>/<path:filename>')
 @login_required
 def serve_asset(project_id, asset_type, filename):
@@ -774,15 +766,212 @@ def serve_asset(project_id, asset_type, filename):
     if not abs_path_to_file.startswith(abs_directory_path):
         current_app.logger.warning(f"Path traversal attempt: {filename} from {directory}")
         return "Forbidden", 403 
-        
-    return send_from_directory(directory, filename)
+
+    asset = ProjectAsset.query.options(joinedload(ProjectAsset.blob)).filter_by(
+        website_project_id=project_id, stored_filename=filename
+    ).first()
+    if asset is None and asset_type == ASSET_TYPE_DISK_FOLDERS['image']:
+        # Resized image variants are served from the images folder too.
+        asset = AssetDerivative.query.options(joinedload(AssetDerivative.blob))\
+            .join(ProjectAsset, AssetDerivative.project_asset_id == ProjectAsset.id)\
+            .filter(ProjectAsset.website_project_id == project_id, AssetDerivative.stored_filename == filename)\
+            .first()
+    if asset is not None and asset.blob is not None and \
+            (isinstance(asset, AssetDerivative) or ASSET_TYPE_DISK_FOLDERS.get(asset.asset_type) == asset_type):
+        # Blob files have no extension; the type comes from the asset's name.
+        file_path, etag, immutable = blob_path(asset.blob.sha256), asset.blob.sha256, True
+    else:
+        # safe_join, as send_from_directory did, rejects names escaping the folder.
+        file_path, etag, immutable = safe_join(directory, filename), True, bool(IMMUTABLE_ASSET_NAME_RE.match(filename))
+        if file_path is None or not os.path.isfile(file_path):
+            abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    accel_prefix = current_app.config.get('ASSET_X_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        response = _x_accel_redirect_response(file_path, accel_prefix, mimetype)
+    elif is_compressible(filename) and request.range is None:
+        response = _compressible_asset_response(file_path, mimetype, etag)
+    else:
+        # send_file answers If-None-Match / If-Modified-Since with 304 and Range with 206,
+        # and hands the path to the server (X-Sendfile when USE_X_SENDFILE is set).
+        response = send_file(file_path, mimetype=mimetype, etag=etag, conditional=True)
+    return _apply_asset_cache_headers(response, immutable)
+
+
+def _compressible_asset_response(file_path, mimetype, etag):
+    """SVG/CSS/JS, compressed per Accept-Encoding. Range requests get the plain file via send_file."""
+    stat = os.stat(file_path)
+    # Blobs are identified by their sha256; legacy files by path, size and mtime.
+    digest = etag if isinstance(etag, str) else \
+        hashlib.sha256(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+
+    def read_file():
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    encoded = negotiate_compressed_body(digest, read_file, stat.st_size)
+    if encoded is None:
+        response = send_file(file_path, mimetype=mimetype, etag=etag, conditional=True)
+    else:
+        response = set_encoded_body(make_response(b''), *encoded, digest)
+        response.mimetype = mimetype
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _x_accel_redirect_response(file_path, accel_prefix, mimetype):
+    """Lets nginx send the file from an `internal` location mapped onto UPLOAD_FOLDER."""
+    relative_path = os.path.relpath(file_path, current_app.config['UPLOAD_FOLDER'])
+    if relative_path.startswith(os.pardir):
+        current_app.logger.error(f"Cannot X-Accel-Redirect {file_path}: it is outside UPLOAD_FOLDER")
+        abort(500)
+    response = make_response('')
+    response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative_path.replace(os.sep, '/'))}"
+    response.mimetype = mimetype
+    return response
+
+
+def _apply_asset_cache_headers(response, immutable):
+    # Assets sit behind login, so caching is private to the browser.
+    response.cache_control.private = True
+    if immutable:
+        # The bytes behind a uuid/blob-backed name never change; skip revalidation entirely.
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = current_app.config.get('ASSET_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+# --- Chunked Upload Routes ---
+# Large images are sent in pieces, so no request holds the whole file and a dropped
+# connection resumes from the last acknowledged offset:
+#   POST   /project/<id>/uploads                      {"filename", "size", "sha256"?} -> 201 + session
+#   GET    /project/<id>/uploads/<upload_id>          session, with the current "offset"
+#   PATCH  /project/<id>/uploads/<upload_id>          raw bytes + Upload-Offset header -> new offset (409 if stale)
+#   POST   /project/<id>/uploads/<upload_id>/complete {"page_id"?, "field"?} -> 201 + asset, optionally set on a page
+#   DELETE /project/<id>/uploads/<upload_id>
+# Like the forms, these need the CSRF token (X-CSRFToken header).
+def _upload_session_payload(session, offset=None):
+    payload = session.to_dict()
+    payload['offset'] = session.offset if offset is None else offset
+    payload['chunk_size'] = current_app.config.get('UPLOAD_SESSION_CHUNK_MAX', 8 * 1024 * 1024)
+    payload['upload_url'] = url_for('main.upload_session', project_id=session.project_id, upload_id=session.id)
+    return payload
+
+def _upload_offset_response(payload, status=200):
+    response = jsonify(payload)
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(payload['offset'])
+    return response
+
+@bp.route('/project/<int:project_id>/uploads', methods=['POST'])
+@login_required
+def start_chunked_upload(project_id):
+    project = WebsiteProject.query.get_or_404(project_id)
+    payload = request.get_json(silent=True) or {}
+    filename = payload.get('filename') or ''
+    if not allowed_file(filename):
+        abort(400, description=f"File type not allowed. Allowed: {', '.join(current_app.config['ALLOWED_EXTENSIONS'])}.")
+    try:
+        session = create_upload_session(project.id, filename, payload.get('size'), payload.get('sha256'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    session_payload = _upload_session_payload(session, offset=0)
+    response = _upload_offset_response(session_payload, 201)
+    response.headers['Location'] = session_payload['upload_url']
+    return response
+
+@bp.route('/project/<int:project_id>/uploads/<upload_id>', methods=['GET', 'PATCH', 'DELETE'])
+@login_required
+def upload_session(project_id, upload_id):
+    session = get_upload_session(upload_id, project_id)
+    if session is None:
+        abort(404)
+
+    if request.method == 'DELETE':
+        discard_upload_session(session)
+        return '', 204
+    if request.method == 'GET':
+        return _upload_offset_response(_upload_session_payload(session))
+
+    try:
+        offset = int(request.headers['Upload-Offset'])
+    except (KeyError, ValueError):
+        abort(400, description='An integer Upload-Offset header is required.')
+    # Each chunk is its own request, so only a chunk (not the file) has to fit the body limit.
+    request.max_content_length = current_app.config.get('UPLOAD_SESSION_CHUNK_MAX', 8 * 1024 * 1024)
+    try:
+        new_offset = append_upload_chunk(session, offset, request.stream)
+    except UploadOffsetMismatch as e:
+        return _upload_offset_response({'error': str(e), 'offset': e.expected_offset}, 409)
+    except ValueError as e:
+        abort(400, description=str(e))
+    return _upload_offset_response(_upload_session_payload(session, offset=new_offset))
+
+@bp.route('/project/<int:project_id>/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(project_id, upload_id):
+    project = WebsiteProject.query.get_or_404(project_id)
+    session = get_upload_session(upload_id, project.id)
+    if session is None:
+        abort(404)
+    payload = request.get_json(silent=True) or {}
+
+    page = None
+    field = payload.get('field')
+    if payload.get('page_id') is not None:
+        page = ProjectPage.query.filter_by(id=payload['page_id'], website_project_id=project.id).first()
+        if page is None or not page.template:
+            abort(400, description='Unknown page, or the page has no template.')
+        image_keys = {f['key'] for f in get_placeholder_schema(page.template) if f['kind'] == 'image'}
+        if field not in image_keys:
+            abort(400, description=f"'{field}' is not an image field of this page.")
+
+    try:
+        asset = finalize_upload_session(session)
+    except ValueError as e:
+        abort(400, description=str(e))
+    if page is not None:
+        try:
+            content = json.loads(page.content_data_json) if page.content_data_json else {}
+        except json.JSONDecodeError:
+            current_app.logger.error(f"JSONDecodeError for page ID {page.id} content: {page.content_data_json}")
+            content = {}
+        content[field] = asset.stored_filename
+        page.content_data_json = json.dumps(content)
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error finalizing upload {session.id} for project {project.id}: {e}")
+        abort(500)
+
+    discard_upload_session(session)
+    if page is not None:
+        invalidate_rendered_pages(page_id=page.id)
+    schedule_image_derivatives([asset])
+    return jsonify({
+        'asset_id': asset.id,
+        'stored_filename': asset.stored_filename,
+        'original_filename': asset.original_filename,
+        'url': url_for('main.serve_asset', project_id=project.id,
+                       asset_type=ASSET_TYPE_DISK_FOLDERS['image'], filename=asset.stored_filename),
+    }), 201
 
 
 # Ensure your preview_page route calls render_final_page_html WITHOUT export flags:
 @bp.route('/preview/page/<int:page_id>')
 @login_required
 def preview_page(page_id):
-    page = ProjectPage.query.get_or_404(page_id)
+    # Page, template and project in one query; the navbar comes from its per-project cache.
+    page = load_page_for_render(page_id)
+    if page is None:
+        abort(404)
 
     if not page.template:
         return "Error: This page has no template assigned.", 404
@@ -790,128 +979,161 @@ def preview_page(page_id):
         current_app.logger.error(f"Consistency error: Page ID {page.id} has no website_project associated.")
         return "Error: This page is not associated with a project.", 404
 
-    template_html = page.template.html_content
-    current_app.logger.debug(f"RAW HTML FROM DB for template ID {page.template.id}: >>>{template_html[:200]}<<<") # Keep this helpful log
-    
-    content_data_from_db = {}
-    if page.content_data_json:
-        try:
-            content_data_from_db = json.loads(page.content_data_json)
-        except json.JSONDecodeError:
-            current_app.logger.error(f"JSONDecodeError for page ID {page.id} content: {page.content_data_json}")
-            pass # content_data_from_db remains empty
-
-    global_css = page.website_project.global_css if page.website_project.global_css else ""
-
-    rendered_html = render_final_page_html(
-        raw_template_html=template_html,
-        content_data_dict=content_data_from_db, 
-        global_css=global_css,
-        project=page.website_project, 
-        page_obj=page,
-        export_mode=False, # Explicitly False for preview
-        asset_path_config=None # Not needed for preview
-    )
+    # Serve from the rendered-page cache when nothing the page depends on has changed.
+    cache_key = rendered_page_cache_key(page, page.template, page.website_project)
+    cached = rendered_page_cache.get(cache_key)
+    if cached is None:
+        template_html = page.template.html_content
+        current_app.logger.debug(f"RAW HTML FROM DB for template ID {page.template.id}: >>>{template_html[:200]}<<<") # Keep this helpful log
+        
+        content_data_from_db = {}
+        if page.content_data_json:
+            try:
+                content_data_from_db = json.loads(page.content_data_json)
+            except json.JSONDecodeError:
+                current_app.logger.error(f"JSONDecodeError for page ID {page.id} content: {page.content_data_json}")
+                pass # content_data_from_db remains empty
+
+        global_css = page.website_project.global_css if page.website_project.global_css else ""
+
+        rendered_html = render_final_page_html(
+            raw_template_html=template_html,
+            content_data_dict=content_data_from_db, 
+            global_css=global_css,
+            project=page.website_project, 
+            page_obj=page,
+            export_mode=False, # Explicitly False for preview
+            asset_path_config=None, # Not needed for preview
+            template_obj=page.template,
+            snapshot=ProjectSnapshot.for_page(page)
+        )
+        # Encoded once here: compression thresholds and Content-Length work in bytes, not characters.
+        cached = (rendered_html.encode('utf-8'), compute_etag(rendered_html))
+        rendered_page_cache.set(cache_key, cached)
 
-    response = make_response(rendered_html)
+    body, etag = cached
+    response = make_response(body)
     response.headers['Content-Type'] = 'text/html'
-    return response
+    # Editors reload previews constantly: let the browser keep a copy but revalidate every time.
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
+    encoded = negotiate_compressed_body(etag, lambda: body, len(body))
+    if encoded is not None:
+        set_encoded_body(response, *encoded, etag)
+    else:
+        response.set_etag(etag)
+    return response.make_conditional(request)
+
+def _wants_precompressed_export():
+    """?precompress=1 (or a form field) adds .gz/.br siblings; absent means EXPORT_PRECOMPRESS."""
+    value = request.values.get('precompress')
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+def _project_archive_response(project, zip_download_name, previous_manifest=None):
+    precompress = _wants_precompressed_export()
+    if current_app.config.get('EXPORT_STREAMING', True):
+        # Entries go out to the client as they are written; memory stays flat regardless of project size.
+        response = Response(stream_with_context(stream_project_archive(project, previous_manifest, precompress)), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename="{zip_download_name}"'
+        return response
+
+    memory_file = io.BytesIO()
+    build_project_archive(memory_file, project, previous_manifest, precompress=precompress)
+    memory_file.seek(0)
+    return send_file(
+        memory_file,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=zip_download_name
+    )
 
 # NEW/REVISED export_project_zip route
 @bp.route('/project/<int:project_id>/export_zip')
 @login_required
 def export_project_zip(project_id):
     project = WebsiteProject.query.get_or_404(project_id)
-    pages = ProjectPage.query.filter_by(website_project_id=project.id).all()
-    # Fetch assets that have a stored_filename, as these are expected to be on disk
-    assets = ProjectAsset.query.filter(
-        ProjectAsset.website_project_id == project.id,
-        ProjectAsset.stored_filename.isnot(None)
-    ).all()
+    zip_download_name = f"{secure_filename(project.project_name if project.project_name else 'website')}_export.zip"
+    return _project_archive_response(project, zip_download_name)
 
-    memory_file = io.BytesIO()
+# Read-only for the caller (nothing is changed server-side), so deploy scripts may POST without a CSRF token.
+@bp.route('/project/<int:project_id>/export_zip/delta', methods=['POST'])
+@csrf.exempt
+@login_required
+def export_project_zip_delta(project_id):
+    """
+    Takes the manifest.json of a previous export, either as a JSON request body or as
+    an uploaded file named "manifest", and returns a ZIP holding only the files that are
+    new or changed since then. Its manifest.json lists every current file plus the
+    paths to delete under "deleted".
+    """
+    project = WebsiteProject.query.get_or_404(project_id)
+    if request.is_json:
+        raw_manifest = request.get_json(silent=True)
+    elif 'manifest' in request.files:
+        raw_manifest = request.files['manifest'].read()
+    else:
+        abort(400, description=f"Send the previous export's {MANIFEST_FILENAME} as a JSON body or as a 'manifest' file upload.")
 
-    asset_paths_in_zip_config = {
-        'image': 'assets/images',  # Where images from content_data_json will be linked from (relative to HTML files)
-        'favicon': 'assets/favicons' # Where favicon will be linked from (relative to HTML files)
-        # Note: This config tells render_final_page_html how to construct relative URLs.
-        # The actual placement in the zip is handled below.
-    }
-    
-    # Define where asset types from ProjectAsset are stored on disk relative to UPLOAD_FOLDER/<project_id>/
-    # This should match your `serve_asset` route's subfolder logic.
-    asset_type_disk_folders = {
-        'image': 'images',
-        'favicon': 'favicons',
-        # Add other types if your ProjectAsset.asset_type can be other things like 'css', 'js'
-    }
+    try:
+        previous_manifest = parse_manifest(raw_manifest)
+    except ValueError as e:
+        abort(400, description=str(e))
 
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # --- 1. Render and add HTML pages ---
-        for page in pages:
-            if not page.template:
-                current_app.logger.warning(f"Page '{page.title}' (ID: {page.id}) in project {project_id} has no template, skipping for export.")
-                continue
-
-            template_html = page.template.html_content
-            content_data = json.loads(page.content_data_json) if page.content_data_json else {}
-            global_css_content = project.global_css if project.global_css else ""
-
-            rendered_html = render_final_page_html(
-                raw_template_html=template_html,
-                content_data_dict=content_data,
-                global_css=global_css_content,
-                project=project,
-                page_obj=page,
-                export_mode=True, 
-                asset_path_config=asset_paths_in_zip_config 
-            )
-            
-            page_filename = f"{page.slug}.html" if page.slug else f"page_{page.id}.html"
-            if page_filename == ".html" or page_filename == "None.html": # Handle empty or None slug
-                 page_filename = f"page_{page.id}.html"
-            if page.slug == 'index': # Common convention for homepage
-                page_filename = 'index.html'
-
-            zf.writestr(page_filename, rendered_html)
-            current_app.logger.debug(f"Added HTML page '{page_filename}' to zip for project {project_id}")
-
-        # --- 2. Add assets (images, favicons, etc.) ---
-        for asset in assets:
-            # Determine the folder for this asset type within the zip, from asset_paths_in_zip_config
-            zip_folder_for_asset_type = asset_paths_in_zip_config.get(asset.asset_type)
-            
-            # Determine the subfolder on disk where this asset type is stored
-            disk_subfolder_for_asset_type = asset_type_disk_folders.get(asset.asset_type)
-
-            if not zip_folder_for_asset_type or not disk_subfolder_for_asset_type:
-                current_app.logger.warning(f"Asset type '{asset.asset_type}' for asset ID {asset.id} (project {project_id}) has no defined zip path or disk folder mapping, skipping.")
-                continue
-
-            source_file_path = os.path.join(
-                current_app.config['UPLOAD_FOLDER'],
-                str(project.id),
-                disk_subfolder_for_asset_type, 
-                asset.stored_filename
-            )
+    zip_download_name = f"{secure_filename(project.project_name if project.project_name else 'website')}_delta.zip"
+    return _project_archive_response(project, zip_download_name, previous_manifest)
 
-            path_in_zip = os.path.join(zip_folder_for_asset_type, asset.stored_filename)
-            
-            if os.path.exists(source_file_path):
-                zf.write(source_file_path, path_in_zip)
-                current_app.logger.debug(f"Added asset {source_file_path} as {path_in_zip} to zip for project {project_id}")
-            else:
-                current_app.logger.warning(f"Asset file not found on disk: {source_file_path} for asset ID {asset.id} (project {project_id}), skipping.")
+# --- Background Export Job Routes ---
+def _wants_json():
+    return request.is_json or \
+        request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
 
-    memory_file.seek(0)
-    
-    zip_download_name = f"{secure_filename(project.project_name if project.project_name else 'website')}_export.zip"
+def _export_job_payload(job):
+    payload = job.to_dict()
+    payload['status_url'] = url_for('main.export_job_status', job_id=job.id)
+    payload['download_url'] = url_for('main.download_export_job', job_id=job.id) if job.state == JOB_FINISHED else None
+    return payload
+
+@bp.route('/project/<int:project_id>/export_jobs', methods=['POST'])
+@login_required
+def submit_export(project_id):
+    """Starts a background export and returns at once (202 + job JSON, or a redirect to the status page)."""
+    project = WebsiteProject.query.get_or_404(project_id)
+    job = submit_export_job(project, precompress=_wants_precompressed_export())
+    if _wants_json():
+        return jsonify(_export_job_payload(job)), 202
+    return redirect(url_for('main.export_job_status', job_id=job.id))
 
-    # Ensure flask.send_file is imported
-    from flask import send_file
+@bp.route('/export_jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    job = get_export_job(job_id)
+    if job is None:
+        abort(404)
+    # Interrupted jobs are never resumed (status is kept per submitting process): 410 tells clients to start over.
+    status_code = 410 if job.state == JOB_INTERRUPTED else 200
+    if _wants_json():
+        return jsonify(_export_job_payload(job)), status_code
+    project = db.session.get(WebsiteProject, job.project_id)
+    return render_template('main/export_job.html',
+                           title='Export Job',
+                           job=job,
+                           project=project,
+                           current_user=current_user), status_code
+
+@bp.route('/export_jobs/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    job = get_export_job(job_id)
+    if job is not None and job.state == JOB_INTERRUPTED:
+        abort(410)
+    if job is None or job.state != JOB_FINISHED or not os.path.exists(job.archive_path):
+        abort(404)
+    # A path (not a file object) lets the WSGI server use sendfile / X-Sendfile.
     return send_file(
-        memory_file,
+        job.archive_path,
         mimetype='application/zip',
         as_attachment=True,
-        download_name=zip_download_name
+        download_name=job.download_name
     )
@@ -24,6 +24,10 @@ class PageTemplate(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     description = db.Column(db.String(250))
     html_content = db.Column(db.Text, nullable=False) # Should contain ""
+    # Navbar/head injection offsets, computed on save (see rendering.compute_injection_plan)
+    injection_plan_json = db.Column(db.Text, nullable=True)
+    # Editable placeholders with their nesting path and kind, computed on save (see rendering.build_placeholder_schema)
+    placeholder_schema_json = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -46,6 +50,14 @@ class WebsiteProject(db.Model):
     secondary_color = db.Column(db.String(7), nullable=True)
     accent_color = db.Column(db.String(7), nullable=True)
 
+    # Bumped whenever the rendered navbar can change (navbar edits, page slug changes, page deletes).
+    navbar_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped when image derivatives are generated, so every process's preview cache sees the new srcset.
+    image_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Kept current by dashboard_stats on page/asset insert and delete, so totals need no COUNT
+    page_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    asset_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     pages = db.relationship('ProjectPage', backref='website_project', lazy='dynamic', cascade="all, delete-orphan")
     assets = db.relationship('ProjectAsset', backref='website_project', lazy='dynamic', cascade="all, delete-orphan")
     navbar_items = db.relationship('NavbarItem',
@@ -54,6 +66,9 @@ class WebsiteProject(db.Model):
                                    order_by='NavbarItem.order',
                                    cascade="all, delete-orphan")
 
+    def bump_navbar_version(self):
+        self.navbar_version = (self.navbar_version or 0) + 1
+
     def __repr__(self):
         return f'<WebsiteProject {self.project_name}>'
 
@@ -63,7 +78,7 @@ class ProjectPage(db.Model):
     slug = db.Column(db.String(150), nullable=False, index=True)
     
     website_project_id = db.Column(db.Integer, db.ForeignKey('website_project.id'), nullable=False)
-    page_template_id = db.Column(db.Integer, db.ForeignKey('page_template.id'), nullable=False)
+    page_template_id = db.Column(db.Integer, db.ForeignKey('page_template.id'), nullable=False, index=True)
 
     content_data_json = db.Column(db.Text)
     
@@ -81,7 +96,11 @@ class ProjectPage(db.Model):
 
     template = db.relationship('PageTemplate', backref=db.backref('used_by_pages', lazy='dynamic'))
 
-    __table_args__ = (db.UniqueConstraint('website_project_id', 'slug', name='_website_project_slug_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('website_project_id', 'slug', name='_website_project_slug_uc'),
+        # Page lists are per project, ordered by title
+        db.Index('ix_project_page_website_project_id_title', 'website_project_id', 'title'),
+    )
 
     def __repr__(self):
         return f'<ProjectPage {self.title} (Project ID: {self.website_project_id})>'
@@ -91,22 +110,77 @@ class ProjectAsset(db.Model):
     website_project_id = db.Column(db.Integer, db.ForeignKey('website_project.id'), nullable=False)
     asset_type = db.Column(db.String(50), nullable=False)  # 'image', 'css', 'js', 'favicon'
     original_filename = db.Column(db.String(255), nullable=False)
-    stored_filename = db.Column(db.String(255), nullable=False, unique=True) # Unique filename on disk
+    stored_filename = db.Column(db.String(255), nullable=False, unique=True) # Unique name used in URLs, content JSON and exports
+    # Content-addressed file backing this asset; NULL for legacy assets stored under UPLOAD_FOLDER/<project_id>/<type>/
+    blob_id = db.Column(db.Integer, db.ForeignKey('asset_blob.id'), nullable=True, index=True)
+    # Intrinsic size of images, recorded when derivatives are generated
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when an upload is deduplicated onto this row; asset GC's minimum age counts from here too
+    last_referenced_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_project_asset_website_project_id_asset_type', 'website_project_id', 'asset_type'),
+    )
+
+    blob = db.relationship('AssetBlob', backref=db.backref('assets', lazy='dynamic'))
+    derivatives = db.relationship('AssetDerivative', backref='asset', lazy='dynamic',
+                                  order_by='AssetDerivative.width', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<ProjectAsset {self.original_filename} (Type: {self.asset_type})>'
 
+class AssetDerivative(db.Model):
+    """A resized / re-encoded variant of an image asset, used in srcset."""
+    id = db.Column(db.Integer, primary_key=True)
+    project_asset_id = db.Column(db.Integer, db.ForeignKey('project_asset.id'), nullable=False, index=True)
+    blob_id = db.Column(db.Integer, db.ForeignKey('asset_blob.id'), nullable=False, index=True)
+    stored_filename = db.Column(db.String(255), nullable=False, unique=True) # <asset stem>-<width>w.<format>
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    format = db.Column(db.String(10), nullable=False) # e.g. 'webp'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    blob = db.relationship('AssetBlob')
+
+    def __repr__(self):
+        return f'<AssetDerivative {self.stored_filename}>'
+
+class AssetBlob(db.Model):
+    """An uploaded file stored once per SHA-256 digest, shared by every ProjectAsset with the same bytes."""
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0') # ProjectAsset rows pointing here
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AssetBlob {self.sha256[:12]} ({self.ref_count} refs)>'
+
+class StatCounter(db.Model):
+    """A site-wide row total (e.g. 'website_project'), adjusted on insert/delete by dashboard_stats."""
+    name = db.Column(db.String(50), primary_key=True) # Table name of the counted model
+    value = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
+
 class NavbarItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     website_project_id = db.Column(db.Integer, db.ForeignKey('website_project.id'), nullable=False)
-    project_page_id = db.Column(db.Integer, db.ForeignKey('project_page.id'), nullable=False) # For MVP, must link to a page
+    project_page_id = db.Column(db.Integer, db.ForeignKey('project_page.id'), nullable=False, index=True) # For MVP, must link to a page
     link_text = db.Column(db.String(100), nullable=False)
     order = db.Column(db.Integer, nullable=False, default=0)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # The navbar is read per project in display order
+        db.Index('ix_navbar_item_website_project_id_order', 'website_project_id', 'order'),
+    )
+
     page = db.relationship('ProjectPage', backref=db.backref('navbar_entries', lazy='dynamic', cascade="all, delete-orphan"))
     # Note: Cascade on backref from ProjectPage to NavbarItem means if a page is deleted, its navbar entries are deleted.
 
@@ -0,0 +1,69 @@
+# ISG_Project/internal_site_generator/pagination.py
+import json
+import base64
+import binascii
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for a row's sort key."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """The sort key in a cursor, or None if it is missing or malformed (the list starts over)."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated list. Links carry the sort key of the last row shown
+    (`after`) or the first (`before`), so each page is an index range read: no OFFSET
+    rows to skip and no COUNT. `total` is whatever the caller passed, typically a
+    maintained counter, and may be None.
+    """
+
+    def __init__(self, items, has_next, has_prev, key, total=None):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+        self.next_cursor = encode_cursor(key(items[-1])) if items and has_next else None
+        self.prev_cursor = encode_cursor(key(items[0])) if items and has_prev else None
+
+
+def paginate_keyset(query, order_columns, per_page, after=None, before=None, total=None):
+    """
+    A KeysetPage of `query` ordered by order_columns, the last of which must be unique
+    (the primary key) so that rows with equal names keep a stable order. `after` and
+    `before` are cursors from a previous page's next_cursor/prev_cursor; `after` wins
+    if both are given. Items are returned in ascending order either way.
+    """
+    key_columns = tuple_(*order_columns)
+
+    def key(item):
+        return [getattr(item, column.key) for column in order_columns]
+
+    after_key = decode_cursor(after, len(order_columns))
+    before_key = decode_cursor(before, len(order_columns)) if after_key is None else None
+
+    if before_key is not None:
+        items = query.filter(key_columns < tuple_(*before_key))\
+            .order_by(*(column.desc() for column in order_columns)).limit(per_page + 1).all()
+        has_prev = len(items) > per_page
+        items = items[:per_page][::-1]
+        return KeysetPage(items, has_next=True, has_prev=has_prev, key=key, total=total)
+
+    if after_key is not None:
+        query = query.filter(key_columns > tuple_(*after_key))
+    items = query.order_by(*order_columns).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    return KeysetPage(items[:per_page], has_next=has_next, has_prev=after_key is not None, key=key, total=total)
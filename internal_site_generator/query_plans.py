@@ -0,0 +1,82 @@
+# ISG_Project/internal_site_generator/query_plans.py
+from sqlalchemy import select, text, tuple_
+from .models import (
+    db, PageTemplate, WebsiteProject, ProjectPage, ProjectAsset, NavbarItem, AssetDerivative
+)
+
+# Stand-in ids for the plans; SQLite picks the same plan whatever the literal values.
+_PROJECT_ID = 1
+_PAGE_ID = 1
+_TEMPLATE_ID = 1
+
+
+def hot_queries():
+    """
+    (name, SELECT statement) for the lookups routes, rendering and export run on every
+    request. Each one filters on an indexed column, so none may plan a full table scan.
+    """
+    return [
+        ('pages of a project by title (list_project_pages, navbar form)',
+         select(ProjectPage).where(ProjectPage.website_project_id == _PROJECT_ID).order_by(ProjectPage.title)),
+        ("next page of a project's pages (list_project_pages keyset)",
+         select(ProjectPage).where(ProjectPage.website_project_id == _PROJECT_ID,
+                                   tuple_(ProjectPage.title, ProjectPage.id) > tuple_('m', 1))
+         .order_by(ProjectPage.title, ProjectPage.id).limit(51)),
+        ('next page of projects by name (list_projects keyset)',
+         select(WebsiteProject).where(tuple_(WebsiteProject.project_name, WebsiteProject.id) > tuple_('m', 1))
+         .order_by(WebsiteProject.project_name, WebsiteProject.id).limit(11)),
+        ('previous page of templates by name (list_templates keyset)',
+         select(PageTemplate.id, PageTemplate.name).where(tuple_(PageTemplate.name, PageTemplate.id) < tuple_('m', 1))
+         .order_by(PageTemplate.name.desc(), PageTemplate.id.desc()).limit(11)),
+        ('pages of a project by id (export)',
+         select(ProjectPage).where(ProjectPage.website_project_id == _PROJECT_ID).order_by(ProjectPage.id)),
+        ('page slug in a project (new / edit page settings)',
+         select(ProjectPage).where(ProjectPage.website_project_id == _PROJECT_ID, ProjectPage.slug == 'index')),
+        ('pages using a template (delete_template)',
+         select(ProjectPage.id).where(ProjectPage.page_template_id == _TEMPLATE_ID)),
+        ('templates used by a project (ProjectSnapshot.load)',
+         select(PageTemplate).where(PageTemplate.id.in_(
+             select(ProjectPage.page_template_id).where(ProjectPage.website_project_id == _PROJECT_ID)
+         ))),
+        ('navbar links of a project (rendering._build_navbar_html)',
+         select(NavbarItem.link_text, ProjectPage.slug)
+         .join(ProjectPage, NavbarItem.project_page_id == ProjectPage.id)
+         .where(NavbarItem.website_project_id == _PROJECT_ID).order_by(NavbarItem.order)),
+        ('navbar items of a page (page delete cascade)',
+         select(NavbarItem).where(NavbarItem.project_page_id == _PAGE_ID)),
+        ('assets of a project (export, delete_project)',
+         select(ProjectAsset).where(ProjectAsset.website_project_id == _PROJECT_ID,
+                                    ProjectAsset.stored_filename.isnot(None)).order_by(ProjectAsset.id)),
+        ('favicon asset of a project (edit_project)',
+         select(ProjectAsset).where(ProjectAsset.website_project_id == _PROJECT_ID,
+                                    ProjectAsset.asset_type == 'favicon', ProjectAsset.stored_filename == 'favicon.png')),
+        ('asset by name (serve_asset)',
+         select(ProjectAsset).where(ProjectAsset.website_project_id == _PROJECT_ID,
+                                    ProjectAsset.stored_filename == 'a.png')),
+        ('image variants of a project (image_derivatives.load_image_variants)',
+         select(ProjectAsset.stored_filename, AssetDerivative.stored_filename)
+         .outerjoin(AssetDerivative, AssetDerivative.project_asset_id == ProjectAsset.id)
+         .where(ProjectAsset.website_project_id == _PROJECT_ID, ProjectAsset.width.isnot(None))),
+    ]
+
+
+def explain_query_plan(statement):
+    """SQLite's EXPLAIN QUERY PLAN for a statement, as a list of detail strings."""
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def full_scans(plan):
+    """
+    Plan steps that read a whole table. "SCAN x USING INDEX" walks the entire index
+    as well, so it counts; "USE TEMP B-TREE" (a sort of rows already found) does not.
+    """
+    return [detail for detail in plan if detail.startswith('SCAN ')]
+
+
+def check_query_plans():
+    """[(name, plan, scans)] for every hot query. Needs SQLite."""
+    return [
+        (name, plan, full_scans(plan))
+        for name, plan in ((name, explain_query_plan(statement)) for name, statement in hot_queries())
+    ]
@@ -0,0 +1,517 @@
+# ISG_Project/internal_site_generator/rendering.py
+import os
+import re
+import json
+import hashlib
+from urllib.parse import quote
+from flask import url_for, current_app
+from jinja2 import (
+    Environment, BaseLoader, FileSystemBytecodeCache, TemplateNotFound, select_autoescape
+)
+from markupsafe import Markup
+from .cache import LRUCache
+from .models import db, PageTemplate, ProjectPage, NavbarItem
+from .image_derivatives import IMAGE_REF_ATTRIBUTES, img_attrs
+
+NAV_MARKER = 'CUSTOM MARKER'
+
+# Render-time variables that stand in for the navbar and <head> injections.
+# Keeping the injected fragments out of the template source means one compiled
+# template serves every project and every page that uses it.
+NAVBAR_SLOT_VAR = '_isg_navbar_html'
+HEAD_SLOT_VAR = '_isg_head_html'
+NAVBAR_SLOT = '{{ ' + NAVBAR_SLOT_VAR + ' }}'
+HEAD_SLOT = '{{ ' + HEAD_SLOT_VAR + ' }}'
+
+BODY_OPEN_RE = re.compile(r'(<body[^>]*>)', flags=re.IGNORECASE)
+HEAD_CLOSE_RE = re.compile(r'(</head>)', flags=re.IGNORECASE)
+
+PAGE_TEMPLATE_NAME_PREFIX = 'page_templates'
+
+# Strings and comments first, so whitespace or punctuation inside a string is never touched.
+# "/*!" comments are kept (license banners).
+CSS_TOKEN_RE = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*!.*?\*/)|(/\*.*?\*/)|(\s+)',
+    flags=re.DOTALL
+)
+# Whitespace next to these never matters. ':' is only safe to strip after it
+# (`a :hover` and `a:hover` differ), and '+', '-', '>' are left alone for calc().
+CSS_TIGHT_BEFORE = set('{};,')
+CSS_TIGHT_AFTER = set('{};,:')
+
+# Stored with each placeholder schema; bump when extract_placeholders changes what it returns.
+# 2: ImageRef attributes under image keys (hero.image.attrs) are no longer fields.
+PLACEHOLDER_SCHEMA_VERSION = 2
+
+# Only for ad-hoc HTML that is not backed by a PageTemplate row;
+# stored templates are cached by the app-level environment below.
+compiled_template_cache = LRUCache()
+
+# Rendered preview HTML, keyed by rendered_page_cache_key(); values are (UTF-8 bytes, etag).
+rendered_page_cache = LRUCache()
+
+# Navbar HTML per (project id, navbar_version); identical for every page of a project.
+navbar_fragment_cache = LRUCache()
+
+# ContextPlan per (template id, updated_at).
+context_plan_cache = LRUCache()
+
+
+def init_app(app):
+    compiled_template_cache.maxsize = app.config.get('COMPILED_TEMPLATE_CACHE_SIZE', 128)
+    rendered_page_cache.maxsize = app.config.get('RENDERED_PAGE_CACHE_SIZE', 256)
+    navbar_fragment_cache.maxsize = app.config.get('NAVBAR_FRAGMENT_CACHE_SIZE', 256)
+    context_plan_cache.maxsize = app.config.get('COMPILED_TEMPLATE_CACHE_SIZE', 128)
+    app.extensions['page_template_env'] = create_page_environment(app)
+
+
+def compute_injection_plan(raw_template_html):
+    """
+    Works out where the navbar and head slots go in a template, once, at save time.
+    Returns a JSON-serialisable dict whose "cuts" are [start, end, slot] triples in
+    document order: source[start:end] is replaced by the slot (start == end inserts).
+    Placement matches the original splicing: the nav marker wins, then right
+    after <body>, then the very top; head content goes before </head> or on top.
+    """
+    source = str(raw_template_html) if raw_template_html is not None else ""
+    # (start, end, rank, slot); rank orders cuts that share an offset.
+    cuts = []
+
+    marker_positions = [m.start() for m in re.finditer(re.escape(NAV_MARKER), source)]
+    if marker_positions:
+        cuts.extend((pos, pos + len(NAV_MARKER), 1, 'navbar') for pos in marker_positions)
+    else:
+        body_match = BODY_OPEN_RE.search(source)
+        insert_pos = body_match.end() if body_match else 0
+        cuts.append((insert_pos, insert_pos, 1, 'navbar'))
+
+    head_close_match = HEAD_CLOSE_RE.search(source)
+    if head_close_match:
+        insert_pos = head_close_match.start()
+        cuts.append((insert_pos, insert_pos, 2, 'head'))
+    else:
+        cuts.append((0, 0, 0, 'head'))
+
+    cuts.sort(key=lambda cut: (cut[0], cut[2]))
+    return {
+        'digest': _source_digest(source),
+        'cuts': [[start, end, slot] for start, end, _rank, slot in cuts],
+    }
+
+
+def _source_digest(source):
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+_SLOT_SOURCES = {'navbar': NAVBAR_SLOT, 'head': HEAD_SLOT}
+
+
+def stitch_template_source(raw_template_html, plan):
+    """Applies an injection plan with plain slicing and a single join (no regex scans)."""
+    source = str(raw_template_html) if raw_template_html is not None else ""
+    segments = []
+    position = 0
+    for start, end, slot in plan['cuts']:
+        segments.append(source[position:start])
+        segments.append(_SLOT_SOURCES[slot])
+        position = end
+    segments.append(source[position:])
+    return ''.join(segments)
+
+
+def instrument_template_source(raw_template_html, plan_json=None):
+    """
+    Returns the template source with the navbar and head injection points
+    replaced by render-time slot variables.
+    Uses the persisted plan when it still matches the HTML, otherwise computes one.
+    """
+    source = str(raw_template_html) if raw_template_html is not None else ""
+    plan = None
+    if plan_json:
+        try:
+            plan = json.loads(plan_json)
+        except (ValueError, TypeError):
+            plan = None
+        if plan and plan.get('digest') != _source_digest(source):
+            plan = None
+    if plan is None:
+        plan = compute_injection_plan(source)
+    return stitch_template_source(source, plan)
+
+
+def apply_injection_plan(template_obj):
+    """Recomputes and stores template_obj.injection_plan_json from its current html_content."""
+    template_obj.injection_plan_json = json.dumps(compute_injection_plan(template_obj.html_content))
+
+
+def extract_placeholders(html_content):
+    """
+    Extracts custom {{ placeholder.key }} style placeholders for form generation.
+    This does NOT process Jinja2 logic.
+    """
+    if not html_content:
+        return []
+    # Regex to find {{ placeholder.key }} or {{ placeholder.key | filter }}
+    # It captures the part inside {{ }} before any | filter or closing }}
+    placeholders = set(re.findall(r"\{\{\s*([^}|]+?)\s*(?:\|.*?)?\}\}", html_content))
+    
+    valid_form_placeholders = set()
+    for p_raw in placeholders:
+        p = p_raw.strip()
+        # Basic validation: must contain a dot (for nesting like hero.title) OR be a simple identifier.
+        # Avoids complex Jinja like {% for item in items %} or {{ config.value }}.
+        # This logic can be refined if template syntax for placeholders becomes more complex.
+        if '.' in p or not any(c in p for c in ' %(){}\'"[]'): # Exclude common Jinja constructs
+            valid_form_placeholders.add(p)
+
+    # `{{ hero.image.attrs }}` reads an ImageRef attribute; it is not a field of its own.
+    valid_form_placeholders = {
+        p for p in valid_form_placeholders
+        if not ('.' in p and p.rsplit('.', 1)[1].strip() in IMAGE_REF_ATTRIBUTES
+                and is_image_placeholder(p.rsplit('.', 1)[0]))
+    }
+    return sorted(list(valid_form_placeholders))
+
+
+def is_image_placeholder(key):
+    key_lower = key.lower()
+    return 'image' in key_lower or key_lower.endswith('_src') or key_lower.endswith('_url')
+
+
+def placeholder_kind(key):
+    """
+    Classifies a placeholder for the content editor and the context builder:
+    'image' (upload field), 'url', 'long_text' (textarea) or 'text'.
+    """
+    if is_image_placeholder(key):
+        return 'image'
+    if any(word in key for word in ('url', 'href', 'src', 'link')):
+        return 'url'
+    if any(word in key for word in ('paragraph', 'text', 'content', 'description', 'html', 'body')):
+        return 'long_text'
+    return 'text'
+
+
+def build_placeholder_schema(html_content):
+    """Returns [{'key', 'path', 'kind'}, ...] for every editable placeholder, sorted by key."""
+    return [
+        {'key': key, 'path': [part.strip() for part in key.split('.')], 'kind': placeholder_kind(key)}
+        for key in extract_placeholders(html_content)
+    ]
+
+
+def apply_placeholder_schema(template_obj):
+    """Recomputes and stores template_obj.placeholder_schema_json from its current html_content."""
+    template_obj.placeholder_schema_json = json.dumps({
+        'version': PLACEHOLDER_SCHEMA_VERSION,
+        'digest': _source_digest(str(template_obj.html_content or "")),
+        'fields': build_placeholder_schema(template_obj.html_content),
+    })
+
+
+def get_placeholder_schema(template_obj):
+    """
+    Returns the template's stored placeholder schema without re-parsing the HTML.
+    Templates saved before schemas existed, or under an older PLACEHOLDER_SCHEMA_VERSION,
+    are parsed on the fly (`flask precompile-templates` stores fresh schemas).
+    """
+    if template_obj.placeholder_schema_json:
+        try:
+            schema = json.loads(template_obj.placeholder_schema_json)
+            if schema.get('version') == PLACEHOLDER_SCHEMA_VERSION:
+                return schema['fields']
+        except (ValueError, TypeError, KeyError, AttributeError):
+            current_app.logger.warning(f"Invalid placeholder schema stored for template {template_obj.id}; re-parsing.")
+    return build_placeholder_schema(template_obj.html_content)
+
+
+class ContextPlan:
+    """
+    Precomputed shape of a template's render context: for each placeholder key,
+    the parent path, the leaf name and whether it holds an image.
+    Keys outside the schema (e.g. content left over from an older template
+    version) are classified once and remembered.
+    """
+
+    def __init__(self, placeholder_schema):
+        self._entries = {}
+        for field in placeholder_schema:
+            path = tuple(field['path'])
+            self._entries[field['key']] = (path[:-1], path[-1], field['kind'] == 'image')
+
+    def lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            path = tuple(part.strip() for part in key.split('.'))
+            entry = (path[:-1], path[-1], is_image_placeholder(key))
+            self._entries[key] = entry
+        return entry
+
+
+def get_context_plan(template_obj):
+    return context_plan_cache.get_or_set(
+        (template_obj.id, template_obj.updated_at),
+        lambda: ContextPlan(get_placeholder_schema(template_obj))
+    )
+
+
+# Mirrors werkzeug's PathConverter quoting, so results match url_for().
+_PATH_SAFE_CHARS = "!$&'()*+,/:;=@"
+_FILENAME_SENTINEL = '__isg_filename__'
+
+
+def resolve_preview_image_urls(project_id, filenames):
+    """
+    Returns {filename: preview URL} for a project's images, building the route
+    once and filling in each (quoted) filename instead of calling url_for per image.
+    """
+    if not filenames:
+        return {}
+    try:
+        url_template = url_for('main.serve_asset', project_id=project_id, asset_type='images', filename=_FILENAME_SENTINEL)
+        prefix, suffix = url_template.split(_FILENAME_SENTINEL, 1)
+    except Exception as e:
+        current_app.logger.error(f"Error building image URL prefix for project {project_id}: {e}")
+        prefix, suffix = f"/uploads/{project_id}/images/", "" # Fallback path for live preview
+    return {filename: f"{prefix}{quote(filename, safe=_PATH_SAFE_CHARS)}{suffix}" for filename in filenames}
+
+
+def placeholder_schema_is_current(template_obj):
+    if not template_obj.placeholder_schema_json:
+        return False
+    try:
+        schema = json.loads(template_obj.placeholder_schema_json)
+    except (ValueError, TypeError):
+        return False
+    return schema.get('version') == PLACEHOLDER_SCHEMA_VERSION and \
+        schema.get('digest') == _source_digest(str(template_obj.html_content or ""))
+
+
+def injection_plan_is_current(template_obj):
+    if not template_obj.injection_plan_json:
+        return False
+    try:
+        plan = json.loads(template_obj.injection_plan_json)
+    except (ValueError, TypeError):
+        return False
+    return plan.get('digest') == _source_digest(str(template_obj.html_content or ""))
+
+
+class PageTemplateLoader(BaseLoader):
+    """
+    Loads PageTemplate.html_content from the database.
+    Names look like "page_templates/<id>/<version>.html"; the version comes from
+    updated_at, so an edited template gets a new name and stale compiled copies
+    simply age out of the environment's cache.
+    """
+
+    def get_source(self, environment, template):
+        template_id = parse_page_template_name(template)
+        if template_id is None:
+            raise TemplateNotFound(template)
+        template_obj = db.session.get(PageTemplate, template_id)
+        if template_obj is None:
+            raise TemplateNotFound(template)
+        source = instrument_template_source(template_obj.html_content, template_obj.injection_plan_json)
+        # The version is part of the name, so a loaded source never goes stale.
+        return source, None, lambda: True
+
+
+def page_template_name(template_obj):
+    version = template_obj.updated_at.strftime('%Y%m%d%H%M%S%f') if template_obj.updated_at else '0'
+    return f"{PAGE_TEMPLATE_NAME_PREFIX}/{template_obj.id}/{version}.html"
+
+
+def parse_page_template_name(name):
+    parts = name.split('/')
+    if len(parts) != 3 or parts[0] != PAGE_TEMPLATE_NAME_PREFIX or not parts[1].isdigit():
+        return None
+    return int(parts[1])
+
+
+def create_page_environment(app):
+    """
+    Builds the shared Jinja2 environment used to render user page templates.
+    Compiled bytecode is written under the instance folder so restarted workers,
+    and other workers on the same host, can skip compilation.
+    """
+    bytecode_cache = None
+    if app.config.get('PAGE_TEMPLATE_BYTECODE_CACHE', True):
+        cache_dir = app.config.get('PAGE_TEMPLATE_BYTECODE_CACHE_DIR') or \
+            os.path.join(app.instance_path, 'jinja_bytecode')
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(directory=cache_dir)
+
+    env = Environment(
+        loader=PageTemplateLoader(),
+        autoescape=select_autoescape(['html', 'xml']),
+        bytecode_cache=bytecode_cache,
+        cache_size=app.config.get('COMPILED_TEMPLATE_CACHE_SIZE', 128),
+        auto_reload=False,
+    )
+    env.globals['url_for'] = url_for
+    env.filters['img_attrs'] = img_attrs
+    return env
+
+
+def get_page_environment():
+    return current_app.extensions['page_template_env']
+
+
+def template_cache_key(raw_template_html):
+    source = str(raw_template_html) if raw_template_html is not None else ""
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def get_compiled_template(raw_template_html, template_obj=None):
+    """
+    Returns a compiled Jinja2 template for the page template.
+    Stored templates go through the shared environment (memory + bytecode cache);
+    raw HTML without a PageTemplate row is cached by content hash.
+    """
+    env = get_page_environment()
+    if template_obj is not None and template_obj.id is not None:
+        return env.get_template(page_template_name(template_obj))
+    return compiled_template_cache.get_or_set(
+        template_cache_key(raw_template_html),
+        lambda: env.from_string(instrument_template_source(raw_template_html))
+    )
+
+
+def precompile_page_templates(templates):
+    """
+    Compiles each PageTemplate through the shared environment's loader, which
+    writes its bytecode to disk. Returns a list of (template, error) for failures.
+    """
+    env = get_page_environment()
+    failures = []
+    for template_obj in templates:
+        try:
+            # Go through the loader rather than get_template() so the in-memory
+            # cache cannot short-circuit writing the bytecode.
+            env.loader.load(env, page_template_name(template_obj), env.globals)
+        except Exception as e:
+            failures.append((template_obj, e))
+    return failures
+
+
+def rendered_page_cache_key(page, template_obj, project):
+    """
+    Everything a preview render depends on: the page, its template, the project
+    settings, the project's navbar and its image derivatives. The ids come first so
+    invalidation can match them.
+    """
+    return (
+        page.id, template_obj.id, project.id,
+        page.updated_at, template_obj.updated_at, project.updated_at, project.navbar_version,
+        project.image_version,
+    )
+
+
+def compute_etag(rendered_html):
+    return hashlib.sha256(rendered_html.encode('utf-8')).hexdigest()
+
+
+def invalidate_rendered_pages(page_id=None, template_id=None, project_id=None):
+    """Drops cached preview HTML for a page, every page using a template, or a whole project."""
+    def is_stale(key):
+        return (page_id is not None and key[0] == page_id) or \
+               (template_id is not None and key[1] == template_id) or \
+               (project_id is not None and key[2] == project_id)
+    return rendered_page_cache.discard_where(is_stale)
+
+
+def _build_navbar_html(project_id):
+    # One query for link text and target slug; no per-item lazy load of NavbarItem.page.
+    navbar_rows = db.session.query(NavbarItem.link_text, ProjectPage.slug)\
+        .join(ProjectPage, NavbarItem.project_page_id == ProjectPage.id)\
+        .filter(NavbarItem.website_project_id == project_id)\
+        .order_by(NavbarItem.order).all()
+    if not navbar_rows:
+        return ""
+
+    navbar_html_list = []
+    for link_text, slug in navbar_rows:
+        # Navbar links are relative to HTML file location, good for static export too.
+        page_url = f"{slug}.html" if slug else "#"
+        navbar_html_list.append(f'<li><a href="{page_url}">{Markup.escape(link_text)}</a></li>')
+    return f"<nav class=\"site-navbar\"><ul>{''.join(navbar_html_list)}</ul></nav>"
+
+
+def get_navbar_html(project):
+    """
+    Returns the project's navbar HTML ("" when it has no items), built once per
+    navbar_version and shared by every page render and export.
+    """
+    return navbar_fragment_cache.get_or_set(
+        (project.id, project.navbar_version),
+        lambda: _build_navbar_html(project.id)
+    )
+
+
+def invalidate_navbar(project_id):
+    return navbar_fragment_cache.discard_where(lambda key: key[0] == project_id)
+
+
+def theme_css(project):
+    """The project's theme colours as a `:root { --theme-*-color }` block, or "" when none are set."""
+    theme_colors_css_vars = []
+    if project.primary_color:
+        theme_colors_css_vars.append(f"  --theme-primary-color: {Markup.escape(project.primary_color)};")
+    if project.secondary_color:
+        theme_colors_css_vars.append(f"  --theme-secondary-color: {Markup.escape(project.secondary_color)};")
+    if project.accent_color:
+        theme_colors_css_vars.append(f"  --theme-accent-color: {Markup.escape(project.accent_color)};")
+    if not theme_colors_css_vars:
+        return ""
+    return ":root {\n" + "\n".join(theme_colors_css_vars) + "\n}"
+
+
+def minify_css(css):
+    """
+    Drops comments and redundant whitespace (and the last ';' of each block).
+    Conservative: strings are kept verbatim, and nothing is restructured.
+    """
+    # (is_text, value) runs: code, strings and kept comments, or (False, '') for whitespace.
+    pieces = []
+    position = 0
+    for match in CSS_TOKEN_RE.finditer(css):
+        # Code between tokens holds no strings, so ';}' there is safe to tighten.
+        pieces.append((True, css[position:match.start()].replace(';}', '}')))
+        string, kept_comment, _comment, space = match.groups()
+        if string or kept_comment:
+            pieces.append((True, string or kept_comment))
+        elif space:
+            pieces.append((False, ''))
+        # Other comments vanish without a trace: `.a/**/.b` means `.a.b`.
+        position = match.end()
+    pieces.append((True, css[position:].replace(';}', '}')))
+
+    out = []
+    pending_separator = False
+    for is_text, value in pieces:
+        if not is_text:
+            pending_separator = True
+            continue
+        if not value:
+            continue
+        if pending_separator and out and out[-1][-1] not in CSS_TIGHT_AFTER and value[0] not in CSS_TIGHT_BEFORE:
+            out.append(' ')
+        pending_separator = False
+        if value[0] == '}' and out and out[-1].endswith(';'):
+            out[-1] = out[-1][:-1]
+        out.append(value)
+    return ''.join(out)
+
+
+def build_site_stylesheet(project):
+    """
+    The project's theme colours and global CSS as one minified stylesheet, named by
+    its content hash so it can be cached forever. Returns (filename, bytes), or None
+    when the project has no CSS at all.
+    """
+    css = "\n".join(part for part in (theme_css(project), project.global_css or "") if part)
+    if not css.strip():
+        return None
+    data = minify_css(css).encode('utf-8')
+    return f"site.{hashlib.sha256(data).hexdigest()[:12]}.css", data
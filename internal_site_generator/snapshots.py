@@ -0,0 +1,100 @@
+# ISG_Project/internal_site_generator/snapshots.py
+from sqlalchemy.orm import joinedload
+from .models import db, PageTemplate, ProjectPage, ProjectAsset, AssetDerivative
+from .rendering import get_navbar_html, build_site_stylesheet
+from .image_derivatives import load_image_variants
+
+
+class ProjectSnapshot:
+    """
+    Everything needed to render a project's pages, loaded in a fixed number of queries
+    however many pages the project has: the project itself, the templates its pages
+    use and the navbar HTML. Pages and assets are each streamed by a single query.
+    Handed to render_final_page_html in place of per-page lookups.
+    """
+
+    def __init__(self, project, templates_by_id, preload_image_variants=False):
+        self.project = project
+        # Holding the templates keeps them in the session's identity map, so
+        # page.template resolves without SQL while the snapshot is alive.
+        self.templates_by_id = templates_by_id
+        self._navbar_html = None
+        self._preload_image_variants = preload_image_variants
+        self._image_variants = None
+        self._site_stylesheet = False # None is a valid value: the project has no CSS
+
+    @classmethod
+    def load(cls, project):
+        used_template_ids = db.session.query(ProjectPage.page_template_id)\
+            .filter(ProjectPage.website_project_id == project.id)
+        templates = PageTemplate.query.filter(PageTemplate.id.in_(used_template_ids)).all()
+        return cls(project, {template.id: template for template in templates}, preload_image_variants=True)
+
+    @classmethod
+    def for_page(cls, page):
+        """Snapshot for a single page loaded with load_page_for_render()."""
+        templates_by_id = {page.template.id: page.template} if page.template else {}
+        return cls(page.website_project, templates_by_id)
+
+    @property
+    def navbar_html(self):
+        if self._navbar_html is None:
+            self._navbar_html = get_navbar_html(self.project)
+        return self._navbar_html
+
+    @property
+    def site_stylesheet(self):
+        """(filename, bytes) of the project's shared export stylesheet, or None; built once."""
+        if self._site_stylesheet is False:
+            self._site_stylesheet = build_site_stylesheet(self.project)
+        return self._site_stylesheet
+
+    @property
+    def image_variants(self):
+        """{stored_filename: ImageVariants} for every measured image in the project, loaded once."""
+        if self._image_variants is None:
+            self._image_variants = load_image_variants(self.project.id)
+        return self._image_variants
+
+    def image_variants_for(self, filenames):
+        # Whole-project snapshots load every image's variants in one query; a single
+        # page snapshot looks up only the images that page uses.
+        if self._preload_image_variants or self._image_variants is not None:
+            return {name: self.image_variants[name] for name in filenames if name in self.image_variants}
+        return load_image_variants(self.project.id, filenames)
+
+    def template_for(self, page):
+        return self.templates_by_id.get(page.page_template_id)
+
+    def iter_pages(self, batch_size=100):
+        """All pages, ordered by id, fetched in batches from one query."""
+        return ProjectPage.query.filter_by(website_project_id=self.project.id)\
+            .order_by(ProjectPage.id).yield_per(batch_size)
+
+    def pages_by_ids(self, page_ids):
+        return {
+            page.id: page
+            for page in ProjectPage.query.filter(ProjectPage.id.in_(page_ids)).all()
+        }
+
+    def iter_assets(self, batch_size=100):
+        """Assets with a stored file (and their blobs), ordered by id, fetched in batches from one query."""
+        return ProjectAsset.query.options(joinedload(ProjectAsset.blob)).filter(
+            ProjectAsset.website_project_id == self.project.id,
+            ProjectAsset.stored_filename.isnot(None)
+        ).order_by(ProjectAsset.id).yield_per(batch_size)
+
+    def iter_image_derivatives(self, batch_size=100):
+        """Derivatives of the project's images (and their blobs), fetched in batches from one query."""
+        return AssetDerivative.query.options(joinedload(AssetDerivative.blob))\
+            .join(ProjectAsset, AssetDerivative.project_asset_id == ProjectAsset.id)\
+            .filter(ProjectAsset.website_project_id == self.project.id)\
+            .order_by(AssetDerivative.id).yield_per(batch_size)
+
+
+def load_page_for_render(page_id):
+    """Loads a page together with its template and project in a single query."""
+    return ProjectPage.query.options(
+        joinedload(ProjectPage.template),
+        joinedload(ProjectPage.website_project)
+    ).filter(ProjectPage.id == page_id).first()
@@ -0,0 +1,44 @@
+# ISG_Project/internal_site_generator/sqlite_tuning.py
+import re
+from sqlalchemy import event
+
+# Pragma names and values are interpolated into SQL, so only plain words and integers are accepted.
+PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE_RE = re.compile(r'^(?:-?\d+|[A-Za-z_]+)$')
+
+
+def pragma_statements(pragmas):
+    """`PRAGMA name = value` statements for a {name: value} mapping; None values are skipped."""
+    statements = []
+    for name, value in (pragmas or {}).items():
+        if value is None:
+            continue
+        value = str(value)
+        if not PRAGMA_NAME_RE.match(name) or not PRAGMA_VALUE_RE.match(value):
+            raise ValueError(f"Unsupported SQLite pragma setting {name!r} = {value!r}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def init_app(app, db):
+    """
+    Applies SQLITE_PRAGMAS to every new connection of the app's SQLite engine:
+    WAL lets readers run alongside a writer, busy_timeout makes a blocked writer
+    wait instead of failing with "database is locked". No-op for other databases.
+    """
+    statements = pragma_statements(app.config.get('SQLITE_PRAGMAS'))
+    if not statements:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
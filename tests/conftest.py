@@ -0,0 +1,144 @@
+# ISG_Project/tests/conftest.py
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+from internal_site_generator import create_app, db
+from internal_site_generator.config import Config
+from internal_site_generator.models import User, PageTemplate, WebsiteProject, ProjectPage
+from internal_site_generator.rendering import (
+    apply_injection_plan, apply_placeholder_schema,
+    compiled_template_cache, rendered_page_cache, navbar_fragment_cache, context_plan_cache
+)
+from internal_site_generator.compression import compressed_variant_cache
+from internal_site_generator.export import build_project_archive, file_digest_cache
+from internal_site_generator.dashboard_stats import invalidate_dashboard_stats
+
+PAGE_TEMPLATE_HTML = '''<!DOCTYPE html>
+<html><head><title>{{ hero.title }}</title></head>
+<body>
+<!-- CUSTOM MARKER -->
+<h1>{{ hero.title }}</h1>
+<p>{{ body.text }}</p>
+</body></html>'''
+
+# Process-wide caches are keyed by row ids, which every test's fresh database reuses.
+PROCESS_CACHES = (
+    compiled_template_cache, rendered_page_cache, navbar_fragment_cache, context_plan_cache,
+    compressed_variant_cache, file_digest_cache,
+)
+
+
+def clear_process_caches():
+    for cache in PROCESS_CACHES:
+        cache.clear()
+    invalidate_dashboard_stats()
+
+
+
+def export_pages(app, project_id):
+    """{filename: bytes} of the HTML pages in a fresh export of the project."""
+    with app.test_request_context():
+        out = io.BytesIO()
+        build_project_archive(out, db.session.get(WebsiteProject, project_id))
+    zf = zipfile.ZipFile(out)
+    return {name: zf.read(name) for name in zf.namelist() if name.endswith('.html')}
+
+@contextmanager
+def count_statements(engine):
+    """Collects the SQL statements run on engine inside the block."""
+    statements = []
+
+    def record(_conn, _cursor, statement, _parameters, _context, _executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def make_config(tmp_path, **overrides):
+    class TestConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'app.db')
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        PAGE_TEMPLATE_BYTECODE_CACHE_DIR = str(tmp_path / 'jinja_bytecode')
+        EXPORT_RENDER_CACHE_DIR = str(tmp_path / 'export_render_cache')
+        EXPORT_JOB_DIR = str(tmp_path / 'export_jobs')
+        UPLOAD_SESSION_DIR = str(tmp_path / 'upload_sessions')
+        IMAGE_DERIVATIVE_WORKERS = 0
+        DASHBOARD_STATS_TTL = 0
+
+    for key, value in overrides.items():
+        setattr(TestConfig, key, value)
+    return TestConfig
+
+
+@pytest.fixture
+def config_overrides():
+    """Override in a test module (or parametrize) to change the app's Config."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, config_overrides):
+    clear_process_caches()
+    app = create_app(make_config(tmp_path, **config_overrides))
+    with app.app_context():
+        db.create_all()
+        user = User(username='tester', email='tester@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': 'tester', 'password': 'secret'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def make_site(app):
+    """
+    make_site(pages=3, html=PAGE_TEMPLATE_HTML, name='Site') -> (project_id, template_id, [page ids]).
+    Rows are created directly, as the routes would store them.
+    """
+    counter = {'n': 0}
+
+    def make(pages=3, html=PAGE_TEMPLATE_HTML, name=None, content=None):
+        counter['n'] += 1
+        with app.app_context():
+            template = PageTemplate(name=f"Template {counter['n']}", html_content=html)
+            apply_injection_plan(template)
+            apply_placeholder_schema(template)
+            project = WebsiteProject(project_name=name or f"Site {counter['n']}", global_css='body { margin: 0; }',
+                                     primary_color='#112233')
+            db.session.add_all([template, project])
+            db.session.flush()
+            page_objs = [
+                ProjectPage(
+                    title=f'Page {i}', slug=f'page-{i}' if i else 'index',
+                    website_project_id=project.id, page_template_id=template.id,
+                    content_data_json=json.dumps(content if content is not None else
+                                                 {'hero.title': f'Page {i}', 'body.text': 'Hello'})
+                )
+                for i in range(pages)
+            ]
+            db.session.add_all(page_objs)
+            db.session.commit()
+            return project.id, template.id, [page.id for page in page_objs]
+
+    return make
@@ -0,0 +1,152 @@
+# ISG_Project/tests/test_asset_gc.py
+import io
+import os
+import json
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, update
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject, ProjectPage, ProjectAsset, AssetBlob, AssetDerivative
+from internal_site_generator.asset_storage import store_blob, add_project_asset_for_blob, blob_path
+from internal_site_generator.asset_gc import collect_garbage
+
+STRAY_SHA256 = 'ab' + '0' * 62
+
+
+def add_asset(project_id, data, filename='photo.png'):
+    return add_project_asset_for_blob(project_id, 'image', store_blob(io.BytesIO(data)), filename)
+
+
+def build_site(app, make_site):
+    """
+    Two projects' assets and the references to them, returning {label: stored filename}.
+    Project one's page uses `used` and a derivative of `variant_used`; its favicon is
+    `favicon`; `unused` and `shared` (same bytes as project two's page image) are
+    referenced by nothing in project one.
+    """
+    project_id, _template_id, page_ids = make_site(pages=1)
+    other_id, _other_template_id, other_page_ids = make_site(pages=1)
+    with app.app_context():
+        assets = {
+            'used': add_asset(project_id, b'used'),
+            'unused': add_asset(project_id, b'unused'),
+            'favicon': add_asset(project_id, b'favicon', 'favicon.ico'),
+            'variant_used': add_asset(project_id, b'original'),
+            'shared': add_asset(project_id, b'shared'),
+            'other': add_asset(other_id, b'shared'),
+        }
+        db.session.flush()
+        derivative_blob = store_blob(io.BytesIO(b'variant'))
+        derivative_blob.ref_count = AssetBlob.ref_count + 1
+        db.session.add(AssetDerivative(asset=assets['variant_used'], blob=derivative_blob,
+                                       stored_filename='variant-320w.webp', width=320, height=200, format='webp'))
+        db.session.get(WebsiteProject, project_id).favicon_path = assets['favicon'].stored_filename
+        db.session.get(ProjectPage, page_ids[0]).content_data_json = json.dumps(
+            {'hero.title': 'Hi', 'hero.image': assets['used'].stored_filename, 'gallery.image': 'variant-320w.webp'}
+        )
+        db.session.get(ProjectPage, other_page_ids[0]).content_data_json = json.dumps(
+            {'hero.image': assets['other'].stored_filename}
+        )
+        db.session.commit()
+
+        stray_path = blob_path(STRAY_SHA256)
+        os.makedirs(os.path.dirname(stray_path), exist_ok=True)
+        with open(stray_path, 'wb') as f:
+            f.write(b'no row')
+        old = time.time() - 10
+        os.utime(stray_path, (old, old))
+        return {label: asset.stored_filename for label, asset in assets.items()}
+
+
+def remaining_assets():
+    return {name for (name,) in db.session.query(ProjectAsset.stored_filename)}
+
+
+def test_collects_only_unreachable_assets_blobs_and_files(app, make_site):
+    names = build_site(app, make_site)
+    with app.app_context():
+        report = collect_garbage(min_age=0)
+
+        assert sorted(name for _project, name, _size in report.assets) == sorted([names['unused'], names['shared']])
+        assert remaining_assets() == {names['used'], names['favicon'], names['variant_used'], names['other']}
+        # `shared` still backs project two's asset, so only the bytes of `unused` go.
+        assert [size for _sha, size in report.blobs] == [len(b'unused')]
+        shared_blob = db.session.query(AssetBlob).filter_by(size=len(b'shared')).one()
+        assert shared_blob.ref_count == 1 and os.path.exists(blob_path(shared_blob.sha256))
+        assert [path for path, _size in report.files] == [blob_path(STRAY_SHA256)]
+        assert not os.path.exists(blob_path(STRAY_SHA256))
+
+        assert collect_garbage(min_age=0).bytes_reclaimed == 0 # Nothing left to collect
+
+
+def test_dry_run_reports_without_changing_anything(app, make_site):
+    names = build_site(app, make_site)
+    with app.app_context():
+        before = remaining_assets()
+        report = collect_garbage(dry_run=True, min_age=0)
+        assert sorted(name for _project, name, _size in report.assets) == sorted([names['unused'], names['shared']])
+        assert len(report.blobs) == 1 and len(report.files) == 1
+        assert remaining_assets() == before
+        assert os.path.exists(blob_path(STRAY_SHA256))
+        assert collect_garbage(min_age=0).bytes_reclaimed == report.bytes_reclaimed
+
+
+def test_young_assets_and_unreadable_projects_are_kept(app, make_site):
+    names = build_site(app, make_site)
+    with app.app_context():
+        assert collect_garbage(min_age=3600).assets == []
+
+        page = db.session.query(ProjectPage).filter(ProjectPage.content_data_json.contains(names['used'])).one()
+        page.content_data_json = '{not json'
+        project_id = page.website_project_id
+        db.session.commit()
+        report = collect_garbage(min_age=0)
+        assert report.assets == []
+        assert report.skipped_projects == {project_id}
+        assert names['unused'] in remaining_assets()
+
+
+def backdate_assets(stored_filenames, seconds):
+    db.session.execute(update(ProjectAsset).where(ProjectAsset.stored_filename.in_(stored_filenames))
+                       .values(created_at=datetime.utcnow() - timedelta(seconds=seconds)))
+    db.session.commit()
+
+
+def test_reused_asset_gets_a_fresh_min_age(app, make_site):
+    names = build_site(app, make_site)
+    with app.app_context():
+        backdate_assets([names['unused'], names['shared']], 7200)
+        project_id = db.session.query(ProjectAsset.website_project_id).filter_by(stored_filename=names['unused']).scalar()
+        # Uploading the same bytes again (the page referencing it not saved yet) reuses the old row.
+        assert add_asset(project_id, b'unused').stored_filename == names['unused']
+        db.session.commit()
+
+        report = collect_garbage(min_age=3600)
+        assert [name for _project, name, _size in report.assets] == [names['shared']]
+        assert names['unused'] in remaining_assets()
+
+
+def test_asset_reused_after_the_batch_was_read_is_kept(app, make_site):
+    names = build_site(app, make_site)
+    with app.app_context():
+        backdate_assets([names['unused'], names['shared']], 7200)
+        engine = db.engine
+        fired = []
+
+        def reuse_unused(_conn, _cursor, statement, _parameters, _context, _executemany):
+            # An upload in another process reuses `unused` between the GC's read and its delete.
+            if not fired and statement.lstrip().upper().startswith('SELECT') and 'FROM project_asset' in statement:
+                fired.append(True)
+                with engine.begin() as other:
+                    other.execute(update(ProjectAsset).where(ProjectAsset.stored_filename == names['unused'])
+                                  .values(last_referenced_at=datetime.utcnow()))
+
+        event.listen(engine, 'after_cursor_execute', reuse_unused)
+        try:
+            report = collect_garbage(min_age=3600)
+        finally:
+            event.remove(engine, 'after_cursor_execute', reuse_unused)
+        assert fired
+        assert [name for _project, name, _size in report.assets] == [names['shared']]
+        assert names['unused'] in remaining_assets()
@@ -0,0 +1,85 @@
+# ISG_Project/tests/test_asset_storage.py
+import io
+import os
+import hashlib
+from contextlib import contextmanager
+from sqlalchemy import event, text
+
+from internal_site_generator import db
+from internal_site_generator.models import AssetBlob
+from internal_site_generator.asset_storage import store_blob, store_blob_file, blob_path, purge_unreferenced_blobs
+
+DATA = b'shared bytes' * 100
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+@contextmanager
+def after_blob_lookup(run):
+    """Calls run(other connection) once, right after the next SELECT on asset_blob."""
+    engine = db.engine
+    fired = []
+
+    def listener(_conn, _cursor, statement, _parameters, _context, _executemany):
+        if not fired and statement.lstrip().upper().startswith('SELECT') and 'FROM asset_blob' in statement:
+            fired.append(True)
+            with engine.begin() as other:
+                run(other)
+
+    event.listen(engine, 'after_cursor_execute', listener)
+    try:
+        yield fired
+    finally:
+        event.remove(engine, 'after_cursor_execute', listener)
+
+
+def store_unreferenced_blob():
+    blob = store_blob(io.BytesIO(DATA))
+    db.session.commit()
+    return blob.id
+
+
+def test_purge_keeps_blob_referenced_after_it_was_read(app):
+    with app.app_context():
+        blob_id = store_unreferenced_blob()
+
+        def take_reference(other):
+            other.execute(text('UPDATE asset_blob SET ref_count = ref_count + 1 WHERE id = :id'), {'id': blob_id})
+
+        with after_blob_lookup(take_reference) as fired:
+            assert purge_unreferenced_blobs([blob_id]) == 0
+        assert fired
+        assert db.session.get(AssetBlob, blob_id).ref_count == 1
+        assert os.path.exists(blob_path(SHA256))
+
+
+def test_store_recreates_blob_purged_after_lookup(app, tmp_path):
+    source = tmp_path / 'upload.bin'
+    source.write_bytes(DATA)
+    with app.app_context():
+        blob_id = store_unreferenced_blob()
+
+        def purge(other):
+            other.execute(text('DELETE FROM asset_blob WHERE id = :id'), {'id': blob_id})
+            os.remove(blob_path(SHA256))
+
+        with after_blob_lookup(purge) as fired:
+            blob = store_blob_file(str(source), SHA256, len(DATA))
+            blob.ref_count = AssetBlob.ref_count + 1
+            db.session.commit()
+        assert fired
+        assert db.session.get(AssetBlob, blob.id).ref_count == 1
+        with open(blob_path(SHA256), 'rb') as f:
+            assert f.read() == DATA
+
+
+def test_purge_removes_only_unreferenced_blobs(app):
+    with app.app_context():
+        unreferenced_id = store_unreferenced_blob()
+        kept = store_blob(io.BytesIO(b'kept'))
+        kept.ref_count = AssetBlob.ref_count + 1
+        db.session.commit()
+
+        assert purge_unreferenced_blobs() == 1
+        assert db.session.get(AssetBlob, unreferenced_id) is None
+        assert not os.path.exists(blob_path(SHA256))
+        assert os.path.exists(blob_path(kept.sha256))
@@ -0,0 +1,42 @@
+# ISG_Project/tests/test_bytecode_cache.py
+import os
+
+from internal_site_generator import create_app, db
+from internal_site_generator.models import PageTemplate
+from internal_site_generator.rendering import get_page_environment, page_template_name
+
+from .conftest import make_config
+
+
+def test_precompiled_bytecode_is_reused_by_a_new_process(app, make_site, tmp_path):
+    _project_id, template_id, _page_ids = make_site(pages=1)
+    result = app.test_cli_runner().invoke(args=['precompile-templates'])
+    assert result.exit_code == 0, result.output
+    assert 'Precompiled 1 of 1 page templates.' in result.output
+    bytecode_dir = app.config['PAGE_TEMPLATE_BYTECODE_CACHE_DIR']
+    assert len(os.listdir(bytecode_dir)) == 1
+
+    # A second app on the same instance stands in for a restarted or sibling worker.
+    other_app = create_app(make_config(tmp_path))
+    with other_app.app_context():
+        env = get_page_environment()
+        env.compile = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError('template was recompiled'))
+        template = db.session.get(PageTemplate, template_id)
+        env.get_template(page_template_name(template))
+        db.session.remove()
+
+
+def test_precompile_backfills_plans_without_changing_the_version(app, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1)
+    with app.app_context():
+        db.session.execute(PageTemplate.__table__.update().values(injection_plan_json=None, placeholder_schema_json=None))
+        db.session.commit()
+        name = page_template_name(db.session.get(PageTemplate, template_id))
+
+    result = app.test_cli_runner().invoke(args=['precompile-templates', '--clear'])
+    assert result.exit_code == 0, result.output
+    assert 'Stored injection plans / placeholder schemas for 1 page templates.' in result.output
+    with app.app_context():
+        template = db.session.get(PageTemplate, template_id)
+        assert template.injection_plan_json and template.placeholder_schema_json
+        assert page_template_name(template) == name
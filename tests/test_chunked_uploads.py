@@ -0,0 +1,76 @@
+# ISG_Project/tests/test_chunked_uploads.py
+import hashlib
+import multiprocessing
+import os
+import time
+import pytest
+
+from internal_site_generator.models import ProjectAsset
+from internal_site_generator.chunked_uploads import (
+    create_upload_session, get_upload_session, append_upload_chunk, UploadOffsetMismatch, fcntl
+)
+
+CHUNK = 4096
+
+
+class SlowStream:
+    """A request body that trickles in, so two appends overlap."""
+
+    def __init__(self, data, pieces=8, delay=0.03):
+        self._pieces = [data[i::pieces] for i in range(pieces)] # Sizes only matter here
+        self._delay = delay
+
+    def read(self, _size=-1):
+        if not self._pieces:
+            return b''
+        time.sleep(self._delay)
+        return self._pieces.pop(0)
+
+
+def _append_in_child(app, upload_id, results):
+    with app.app_context():
+        session = get_upload_session(upload_id)
+        try:
+            results.put(('ok', append_upload_chunk(session, 0, SlowStream(b'x' * CHUNK))))
+        except UploadOffsetMismatch as e:
+            results.put(('mismatch', e.expected_offset))
+
+
+@pytest.mark.skipif(fcntl is None, reason='cross-process locking needs fcntl')
+def test_concurrent_appends_from_two_processes_do_not_both_land(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    with app.app_context():
+        session = create_upload_session(project_id, 'photo.png', CHUNK * 2)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_append_in_child, args=(app, session.id, results)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    outcomes = sorted(results.get(timeout=5) for _ in workers)
+    assert outcomes == [('mismatch', CHUNK), ('ok', CHUNK)]
+    assert os.path.getsize(session.data_path) == CHUNK
+
+
+def test_upload_resumes_and_completes_over_http(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    data = os.urandom(3 * CHUNK)
+    response = client.post(f'/project/{project_id}/uploads', json={
+        'filename': 'photo.png', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest(),
+    })
+    assert response.status_code == 201
+    url = response.headers['Location']
+
+    assert client.patch(url, data=data[:CHUNK], headers={'Upload-Offset': '0'}).headers['Upload-Offset'] == str(CHUNK)
+    # A retried chunk for an old offset is refused with the offset to resume from.
+    stale = client.patch(url, data=data[:CHUNK], headers={'Upload-Offset': '0'})
+    assert stale.status_code == 409 and stale.headers['Upload-Offset'] == str(CHUNK)
+    assert client.get(url).headers['Upload-Offset'] == str(CHUNK)
+    assert client.patch(url, data=data[CHUNK:], headers={'Upload-Offset': str(CHUNK)}).status_code == 200
+
+    response = client.post(f'{url}/complete', json={})
+    assert response.status_code in (200, 201), response.data
+    with app.app_context():
+        asset = ProjectAsset.query.filter_by(website_project_id=project_id).one()
+        assert asset.blob.sha256 == hashlib.sha256(data).hexdigest()
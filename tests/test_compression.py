@@ -0,0 +1,104 @@
+# ISG_Project/tests/test_compression.py
+import io
+import gzip
+import json
+import zipfile
+import pytest
+
+from internal_site_generator import compression, db
+from internal_site_generator.models import ProjectPage
+
+# 600 characters but 1,200 bytes: under COMPRESS_MIN_SIZE by characters, over it in UTF-8.
+NON_ASCII_TEXT = 'ü' * 600
+
+
+@pytest.fixture
+def config_overrides():
+    return {'COMPRESS_MIN_SIZE': 1024}
+
+
+def test_preview_size_threshold_counts_bytes(client, make_site):
+    _project_id, _template_id, page_ids = make_site(pages=1, content={'hero.title': 'Umlauts', 'body.text': NON_ASCII_TEXT})
+
+    plain = client.get(f'/preview/page/{page_ids[0]}')
+    assert plain.status_code == 200
+    assert len(plain.get_data(as_text=True)) < 1024 <= len(plain.data)
+    assert plain.content_length == len(plain.data)
+
+    response = client.get(f'/preview/page/{page_ids[0]}', headers={'Accept-Encoding': 'gzip'})
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_preview_etag_revalidation(app, client, make_site):
+    _project_id, _template_id, page_ids = make_site(pages=1, content={'hero.title': 'Umlauts', 'body.text': NON_ASCII_TEXT})
+    url = f'/preview/page/{page_ids[0]}'
+
+    plain = client.get(url)
+    encoded = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    # Each representation has its own strong ETag.
+    assert plain.headers['ETag'] != encoded.headers['ETag']
+
+    assert client.get(url, headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+    not_modified = client.get(url, headers={'If-None-Match': encoded.headers['ETag'], 'Accept-Encoding': 'gzip'})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    with app.app_context():
+        page = db.session.get(ProjectPage, page_ids[0])
+        page.content_data_json = json.dumps({'hero.title': 'Changed', 'body.text': NON_ASCII_TEXT})
+        db.session.commit()
+
+    changed = client.get(url, headers={'If-None-Match': plain.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != plain.headers['ETag']
+    assert 'Changed' in changed.get_data(as_text=True)
+
+
+def test_precompressed_export_siblings(client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1, content={'hero.title': 'Umlauts', 'body.text': NON_ASCII_TEXT})
+
+    plain = zipfile.ZipFile(io.BytesIO(client.get(f'/project/{project_id}/export_zip').data))
+    assert not [name for name in plain.namelist() if name.endswith(('.gz', '.br'))]
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(f'/project/{project_id}/export_zip?precompress=1').data))
+    names = set(archive.namelist())
+    assert 'index.html.gz' in names
+    assert gzip.decompress(archive.read('index.html.gz')) == archive.read('index.html')
+    assert archive.getinfo('index.html.gz').compress_type == zipfile.ZIP_STORED
+    # Siblings are listed in the manifest so delta exports can skip unchanged ones.
+    assert 'index.html.gz' in json.loads(archive.read('manifest.json'))['files']
+    # The stylesheet is too small to gain anything, so it has no sibling.
+    stylesheet = next(name for name in names if name.endswith('.css'))
+    assert f'{stylesheet}.gz' not in names
+
+
+def test_brotli_preferred_when_installed(client, make_site):
+    brotli = pytest.importorskip('brotli')
+    project_id, _template_id, page_ids = make_site(pages=1, content={'hero.title': 'Umlauts', 'body.text': NON_ASCII_TEXT})
+
+    plain = client.get(f'/preview/page/{page_ids[0]}')
+    response = client.get(f'/preview/page/{page_ids[0]}', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.content_encoding == 'br'
+    assert brotli.decompress(response.data) == plain.data
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(f'/project/{project_id}/export_zip?precompress=1').data))
+    assert brotli.decompress(archive.read('index.html.br')) == archive.read('index.html')
+
+
+def test_gzip_only_without_brotli(client, make_site, monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    project_id, _template_id, page_ids = make_site(pages=1, content={'hero.title': 'Umlauts', 'body.text': NON_ASCII_TEXT})
+
+    assert compression.available_encodings() == ['gzip']
+    response = client.get(f'/preview/page/{page_ids[0]}', headers={'Accept-Encoding': 'br'})
+    assert response.status_code == 200
+    assert response.content_encoding is None
+    response = client.get(f'/preview/page/{page_ids[0]}', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.content_encoding == 'gzip'
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(f'/project/{project_id}/export_zip?precompress=1').data))
+    names = archive.namelist()
+    assert 'index.html.gz' in names
+    assert not [name for name in names if name.endswith('.br')]
@@ -0,0 +1,40 @@
+# ISG_Project/tests/test_context_plan.py
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import PageTemplate
+from internal_site_generator.main import _build_context_from_flat_dict
+from internal_site_generator.rendering import ContextPlan, get_context_plan, build_placeholder_schema
+
+PLAN_TEMPLATE_HTML = '<h1>{{ hero.title }}</h1><img src="{{ hero.image }}"><p>{{ a.b.c }}</p><i>{{ plain }}</i>'
+CONTENT = {'hero.title': 'Hi', 'hero.image': 'pic.png', 'a.b.c': 3, 'plain': None, 'left.over': 'x'}
+
+
+@pytest.mark.parametrize('with_plan', [True, False])
+def test_context_is_the_same_with_or_without_a_plan(app, with_plan):
+    plan = ContextPlan(build_placeholder_schema(PLAN_TEMPLATE_HTML)) if with_plan else None
+    with app.test_request_context():
+        preview = _build_context_from_flat_dict(CONTENT, project_id=7, context_plan=plan)
+        export = _build_context_from_flat_dict(CONTENT, project_id=7, export_mode=True,
+                                               relative_image_path_prefix='/assets/images/', context_plan=plan)
+    assert preview == {
+        'hero': {'title': 'Hi', 'image': '/uploads/7/images/pic.png'},
+        'a': {'b': {'c': '3'}}, 'plain': '', 'left': {'over': 'x'},
+    }
+    assert export['hero']['image'] == 'assets/images/pic.png'
+    assert export['a'] == preview['a']
+
+
+def test_plan_is_built_once_per_template_version(app, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1, html=PLAN_TEMPLATE_HTML)
+    with app.app_context():
+        template = db.session.get(PageTemplate, template_id)
+        plan = get_context_plan(template)
+        assert get_context_plan(template) is plan
+        assert plan.lookup('hero.image') == (('hero',), 'image', True)
+        # Keys outside the schema are classified once and remembered.
+        assert plan.lookup('gallery.image_url') is plan.lookup('gallery.image_url')
+
+        template.html_content = '<p>{{ other.key }}</p>'
+        db.session.commit()
+        assert get_context_plan(template) is not plan
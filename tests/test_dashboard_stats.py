@@ -0,0 +1,99 @@
+# ISG_Project/tests/test_dashboard_stats.py
+import pytest
+from sqlalchemy import func, select, text
+
+from internal_site_generator import db
+from internal_site_generator.models import PageTemplate, WebsiteProject, ProjectPage, ProjectAsset
+from internal_site_generator.dashboard_stats import (
+    COUNTED_MODELS, counted_total, load_dashboard_stats, invalidate_dashboard_stats
+)
+
+from .conftest import count_statements
+
+
+def assert_counters_match_rows():
+    for model in COUNTED_MODELS:
+        assert (counted_total(model) or 0) == db.session.scalar(select(func.count()).select_from(model)), model.__tablename__
+    for project_id, page_count, asset_count in db.session.query(
+            WebsiteProject.id, WebsiteProject.page_count, WebsiteProject.asset_count):
+        assert page_count == ProjectPage.query.filter_by(website_project_id=project_id).count()
+        assert asset_count == ProjectAsset.query.filter_by(website_project_id=project_id).count()
+
+
+def test_counters_follow_orm_inserts_deletes_and_rollbacks(app, client, make_site):
+    project_id, _template_id, page_ids = make_site(pages=3)
+    make_site(pages=2)
+    with app.app_context():
+        assert_counters_match_rows()
+        assert counted_total(ProjectPage) == 5
+
+        db.session.add(ProjectPage(title='Extra', slug='extra', website_project_id=project_id))
+        db.session.rollback()
+        assert counted_total(ProjectPage) == 5
+
+    assert client.post(f'/project/{project_id}/pages/delete/{page_ids[0]}').status_code == 302
+    assert client.post(f'/projects/delete/{project_id}').status_code == 302
+    with app.app_context():
+        assert_counters_match_rows()
+        assert counted_total(WebsiteProject) == 1 and counted_total(ProjectPage) == 2
+
+
+def test_recount_repairs_drift_from_raw_sql(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=4)
+    with app.app_context():
+        db.session.execute(text('DELETE FROM project_page WHERE id IN (SELECT id FROM project_page LIMIT 3)'))
+        db.session.commit()
+        assert counted_total(ProjectPage) == 4 # Raw SQL bypasses the listeners
+
+    result = app.test_cli_runner().invoke(args=['recount-stats'])
+    assert result.exit_code == 0, result.output
+    assert 'project_page: 1' in result.output
+    with app.app_context():
+        assert_counters_match_rows()
+        assert db.session.get(WebsiteProject, project_id).page_count == 1
+
+
+@pytest.mark.parametrize('config_overrides', [{'DASHBOARD_STATS_TTL': 60}])
+def test_cached_stats_are_invalidated_by_commits(app, make_site):
+    make_site(pages=1, name='Beta')
+    with app.app_context():
+        assert load_dashboard_stats().project_count == 1
+
+        db.session.add(WebsiteProject(project_name='Alpha'))
+        db.session.commit()
+        stats = load_dashboard_stats()
+        assert stats.project_count == 2
+        assert [row.project_name for row in stats.projects] == ['Alpha', 'Beta']
+
+        with count_statements(db.engine) as statements:
+            assert load_dashboard_stats() is stats
+        assert statements == []
+
+        db.session.get(PageTemplate, 1).name = 'Renamed'
+        db.session.commit()
+        assert [row.name for row in load_dashboard_stats().templates] == ['Renamed']
+
+        # Writes that skip the ORM are only seen once the cached copy goes.
+        db.session.execute(text("UPDATE website_project SET project_name = 'Zeta' WHERE project_name = 'Alpha'"))
+        db.session.commit()
+        assert [row.project_name for row in load_dashboard_stats().projects] == ['Alpha', 'Beta']
+        invalidate_dashboard_stats()
+        assert [row.project_name for row in load_dashboard_stats().projects] == ['Beta', 'Zeta']
+
+
+def test_dashboard_query_count_does_not_grow_with_rows(app, client, make_site):
+    def dashboard_statements():
+        with app.app_context():
+            engine = db.engine
+        with count_statements(engine) as statements:
+            response = client.get('/index')
+        assert response.status_code == 200
+        return len(statements), response.get_data(as_text=True)
+
+    make_site(pages=2)
+    few, _html = dashboard_statements()
+    for _ in range(8):
+        make_site(pages=3)
+    many, html = dashboard_statements()
+    assert many == few
+    assert '9 websites, 26 pages, 0 assets, 9 templates' in html
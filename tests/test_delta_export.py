@@ -0,0 +1,49 @@
+# ISG_Project/tests/test_delta_export.py
+import io
+import json
+import zipfile
+
+from internal_site_generator import db
+from internal_site_generator.models import ProjectPage
+from internal_site_generator.export import MANIFEST_FILENAME
+
+
+def archive(response):
+    assert response.status_code == 200, response.data
+    zf = zipfile.ZipFile(io.BytesIO(response.data))
+    return zf, json.loads(zf.read(MANIFEST_FILENAME))
+
+
+def test_delta_holds_only_new_and_changed_files(app, client, make_site):
+    project_id, _template_id, page_ids = make_site(pages=3)
+    full, manifest = archive(client.get(f'/project/{project_id}/export_zip'))
+    assert {'index.html', 'page-1.html', 'page-2.html'} <= set(manifest['files'])
+
+    unchanged, delta_manifest = archive(client.post(f'/project/{project_id}/export_zip/delta', json=manifest))
+    assert unchanged.namelist() == [MANIFEST_FILENAME]
+    assert delta_manifest['files'] == manifest['files'] and delta_manifest['deleted'] == []
+
+    with app.app_context():
+        db.session.get(ProjectPage, page_ids[1]).content_data_json = json.dumps({'hero.title': 'Changed', 'body.text': ''})
+        db.session.delete(db.session.get(ProjectPage, page_ids[2]))
+        db.session.commit()
+    # The manifest may also be uploaded as a file, as deploy scripts do.
+    delta, delta_manifest = archive(client.post(
+        f'/project/{project_id}/export_zip/delta',
+        data={'manifest': (io.BytesIO(full.read(MANIFEST_FILENAME)), MANIFEST_FILENAME)},
+        content_type='multipart/form-data'
+    ))
+    assert sorted(delta.namelist()) == sorted(['page-1.html', MANIFEST_FILENAME])
+    assert b'Changed' in delta.read('page-1.html')
+    assert delta_manifest['deleted'] == ['page-2.html']
+    assert 'index.html' in delta_manifest['files']
+
+
+def test_delta_rejects_missing_or_bad_manifests(client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    url = f'/project/{project_id}/export_zip/delta'
+    assert client.post(url).status_code == 400
+    assert client.post(url, json={'format': 99, 'files': {}}).status_code == 400
+    assert client.post(url, json={'format': 1, 'files': {'index.html': {'size': 1}}}).status_code == 400
+    assert client.post(url, data={'manifest': (io.BytesIO(b'{not json'), 'manifest.json')},
+                       content_type='multipart/form-data').status_code == 400
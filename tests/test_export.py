@@ -0,0 +1,81 @@
+# ISG_Project/tests/test_export.py
+import io
+import os
+import signal
+import zipfile
+import pytest
+
+from internal_site_generator import db, export, create_render_worker_app
+from internal_site_generator.models import WebsiteProject
+from internal_site_generator.export import stream_project_archive, MANIFEST_FILENAME
+
+from .conftest import make_config
+
+PAGES = 12
+
+
+@pytest.fixture
+def config_overrides():
+    return {'EXPORT_RENDER_WORKERS': 2, 'EXPORT_RENDER_CHUNK_SIZE': 1, 'EXPORT_RENDER_CACHE': False}
+
+
+@pytest.fixture(autouse=True)
+def fresh_render_pool():
+    export._reset_render_pool()
+    yield
+    export._reset_render_pool()
+
+
+def page_entries(archive_bytes):
+    zf = zipfile.ZipFile(io.BytesIO(archive_bytes))
+    assert zf.testzip() is None
+    return zf, sorted(name for name in zf.namelist() if name.endswith('.html'))
+
+
+def test_pool_export_survives_a_killed_worker(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=PAGES)
+    with app.test_request_context():
+        stream = stream_project_archive(db.session.get(WebsiteProject, project_id))
+        chunks = []
+        # Read until the pool has started rendering, then kill one of its workers.
+        while export._render_pool is None or not export._render_pool._processes:
+            chunks.append(next(stream))
+        victim = next(iter(export._render_pool._processes))
+        os.kill(victim, signal.SIGKILL)
+        chunks.extend(stream)
+
+    zf, pages = page_entries(b''.join(chunks))
+    assert len(pages) == PAGES and 'index.html' in pages
+    assert MANIFEST_FILENAME in zf.namelist()
+    for name in pages:
+        assert b'<h1>Page ' in zf.read(name)
+
+
+def test_pool_export_after_pool_broke_between_exports(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=PAGES)
+    response = client.get(f'/project/{project_id}/export_zip')
+    assert len(page_entries(response.get_data())[1]) == PAGES
+    for pid in list(export._render_pool._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    response = client.get(f'/project/{project_id}/export_zip')
+    assert response.status_code == 200
+    assert len(page_entries(response.get_data())[1]) == PAGES
+
+
+def test_pool_pages_match_in_process_pages(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=PAGES)
+    pooled, pages = page_entries(client.get(f'/project/{project_id}/export_zip').data)
+    app.config['EXPORT_RENDER_WORKERS'] = 0
+    in_process, in_process_pages = page_entries(client.get(f'/project/{project_id}/export_zip').data)
+    assert pages == in_process_pages
+    for name in pages:
+        assert pooled.read(name) == in_process.read(name), name
+
+
+def test_render_worker_app_is_minimal(tmp_path):
+    worker_app = create_render_worker_app(make_config(tmp_path))
+    assert 'page_template_env' in worker_app.extensions
+    assert list(worker_app.blueprints) == ['main']
+    assert not worker_app.before_request_funcs # No periodic asset GC
+    assert not worker_app.cli.commands
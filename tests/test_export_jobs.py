@@ -0,0 +1,73 @@
+# ISG_Project/tests/test_export_jobs.py
+import io
+import os
+import time
+import uuid
+import socket
+import zipfile
+
+from internal_site_generator.export_jobs import (
+    ExportJob, export_job_root, get_export_job, JOB_INTERRUPTED, JOB_QUEUED, JOB_FINISHED, JOB_DONE_STATES
+)
+
+
+def write_orphaned_job(app, project_id, owner_pid):
+    """A status.json as left behind by a process that queued a job and then stopped."""
+    with app.app_context():
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(export_job_root(), job_id)
+        os.makedirs(directory)
+        ExportJob(job_id, project_id, directory, 'site_export.zip',
+                  owner_host=socket.gethostname(), owner_pid=owner_pid).save()
+        return job_id
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get(f'/export_jobs/{uuid.uuid4().hex}').status_code == 404
+    assert client.get('/export_jobs/not-a-job-id').status_code == 404
+    assert client.get(f'/export_jobs/{uuid.uuid4().hex}/download').status_code == 404
+
+
+def test_job_left_by_a_previous_process_is_gone(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    # Not in this process's job table, yet owned by our pid: an earlier process (a restart) submitted it.
+    job_id = write_orphaned_job(app, project_id, os.getpid())
+
+    response = client.get(f'/export_jobs/{job_id}', headers={'Accept': 'application/json'})
+    assert response.status_code == 410
+    assert response.get_json()['state'] == JOB_INTERRUPTED
+    assert client.get(f'/export_jobs/{job_id}').status_code == 410
+    assert client.get(f'/export_jobs/{job_id}/download').status_code == 410
+    with app.app_context():
+        assert get_export_job(job_id).state == JOB_INTERRUPTED # Saved, not just reported
+
+
+def test_job_of_a_running_process_is_reported_as_is(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    job_id = write_orphaned_job(app, project_id, os.getppid())
+
+    response = client.get(f'/export_jobs/{job_id}', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert response.get_json()['state'] == JOB_QUEUED
+
+
+def test_submitted_job_finishes_and_downloads(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=2)
+    response = client.post(f'/project/{project_id}/export_jobs', headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    deadline = time.monotonic() + 30
+    while True:
+        status = client.get(status_url, headers={'Accept': 'application/json'})
+        assert status.status_code == 200
+        payload = status.get_json()
+        if payload['state'] in JOB_DONE_STATES or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert payload['state'] == JOB_FINISHED, payload['error']
+
+    download = client.get(payload['download_url'])
+    assert download.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(download.data)).namelist()
+    assert 'index.html' in names
@@ -0,0 +1,55 @@
+# ISG_Project/tests/test_export_streaming.py
+import io
+import os
+import json
+import zipfile
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject, ProjectPage
+from internal_site_generator.asset_storage import store_blob, add_project_asset_for_blob
+from internal_site_generator.export import stream_project_archive, MANIFEST_FILENAME
+
+LARGE_ASSET_SIZE = 2 * 1024 * 1024
+
+
+def add_large_image(app, project_id, page_id):
+    with app.app_context():
+        asset = add_project_asset_for_blob(project_id, 'image', store_blob(io.BytesIO(os.urandom(LARGE_ASSET_SIZE))), 'big.png')
+        db.session.flush()
+        db.session.get(ProjectPage, page_id).content_data_json = json.dumps(
+            {'hero.title': 'Big', 'body.image': asset.stored_filename}
+        )
+        db.session.commit()
+        return asset.stored_filename
+
+
+def test_archive_is_streamed_in_bounded_chunks(app, make_site):
+    project_id, _template_id, page_ids = make_site(pages=5)
+    image_name = add_large_image(app, project_id, page_ids[0])
+
+    with app.test_request_context():
+        chunks = list(stream_project_archive(db.session.get(WebsiteProject, project_id)))
+    # Pages and asset chunks are handed out as they are written, never the whole archive at once.
+    assert len(chunks) > 5
+    assert max(len(chunk) for chunk in chunks) < LARGE_ASSET_SIZE / 4
+
+    zf = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert zf.testzip() is None
+    names = zf.namelist()
+    assert {'index.html', 'page-1.html', 'page-4.html', f'assets/images/{image_name}'} <= set(names)
+    assert names[-1] == MANIFEST_FILENAME
+    assert zf.getinfo(f'assets/images/{image_name}').file_size == LARGE_ASSET_SIZE
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_export_route_returns_the_same_archive_either_way(app, client, make_site, streaming):
+    project_id, _template_id, _page_ids = make_site(pages=3, name='My Site')
+    app.config['EXPORT_STREAMING'] = streaming
+
+    response = client.get(f'/project/{project_id}/export_zip')
+    assert response.status_code == 200
+    assert 'My_Site_export.zip' in response.headers['Content-Disposition']
+    zf = zipfile.ZipFile(io.BytesIO(response.data))
+    assert sorted(name for name in zf.namelist() if name.endswith('.html')) == ['index.html', 'page-1.html', 'page-2.html']
+    assert 'Page 2' in zf.read('page-2.html').decode()
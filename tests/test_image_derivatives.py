@@ -0,0 +1,122 @@
+# ISG_Project/tests/test_image_derivatives.py
+import io
+import json
+import pytest
+
+from internal_site_generator import db, export, rendering
+from internal_site_generator.models import ProjectPage, ProjectAsset, AssetDerivative, WebsiteProject
+from internal_site_generator.rendering import extract_placeholders, build_placeholder_schema
+from internal_site_generator.main import _build_context_from_flat_dict
+from internal_site_generator.image_derivatives import generate_image_derivatives
+
+from .conftest import export_pages
+
+IMG_TEMPLATE_HTML = '''<html><head><title>{{ hero.title }}</title></head><body>
+<!-- CUSTOM MARKER -->
+<img src="{{ hero.image }}"{{ hero.image.attrs }}>
+<img src="{{ hero.image }}"{{ hero.image|img_attrs }} data-w="{{ hero.image.width }}">
+<p style="width: {{ box.width }}">{{ hero.title }}</p>
+</body></html>'''
+
+
+def png_bytes(width, height):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(out, 'PNG')
+    return out.getvalue()
+
+
+def test_image_ref_attributes_are_not_placeholders():
+    keys = extract_placeholders(IMG_TEMPLATE_HTML)
+    assert keys == ['box.width', 'hero.image', 'hero.title']
+    kinds = {field['key']: field['kind'] for field in build_placeholder_schema(IMG_TEMPLATE_HTML)}
+    assert kinds['hero.image'] == 'image'
+
+
+@pytest.mark.parametrize('content', [
+    {'hero.image': 'a.png', 'hero.image.attrs': ''},
+    {'hero.image.attrs': '', 'hero.image': 'a.png'},
+    {'hero.image': '', 'hero.image.srcset': ''},
+])
+def test_context_builder_skips_keys_under_non_dict_values(app, content):
+    with app.test_request_context():
+        context = _build_context_from_flat_dict(content, project_id=1)
+    assert context['hero']['image'] in ('', '/uploads/1/images/a.png') or context['hero']['image'].endswith('a.png')
+
+
+def test_page_using_image_attrs_renders_after_editor_save(app, client, make_site):
+    project_id, _template_id, page_ids = make_site(pages=1, html=IMG_TEMPLATE_HTML,
+                                                   content={'hero.title': 'Hi', 'hero.image.attrs': ''})
+    page_id = page_ids[0]
+    response = client.post(f'/project/{project_id}/page/{page_id}/edit_content', data={
+        'hero.title': 'Hello', 'box.width': '10px',
+        'hero.image_file': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'0' * 64), 'x.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        saved = json.loads(db.session.get(ProjectPage, page_id).content_data_json)
+    assert set(saved) == {'hero.title', 'hero.image', 'box.width'}
+
+    html = client.get(f'/preview/page/{page_id}').get_data(as_text=True)
+    assert 'does not support item assignment' not in html
+    assert f'<img src="/uploads/{project_id}/' in html and '<p style="width: 10px">Hello</p>' in html
+
+
+def test_uploaded_image_gets_srcset(app, client, make_site):
+    pytest.importorskip('PIL')
+    project_id, _template_id, page_ids = make_site(pages=1, html=IMG_TEMPLATE_HTML)
+    response = client.post(f'/project/{project_id}/page/{page_ids[0]}/edit_content', data={
+        'hero.title': 'Hello', 'hero.image_file': (io.BytesIO(png_bytes(800, 400)), 'big.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        widths = sorted(d.width for d in AssetDerivative.query.all())
+    assert widths == [320, 640, 800] # Narrower widths plus one in the derivative format at full width
+
+    html = client.get(f'/preview/page/{page_ids[0]}').get_data(as_text=True)
+    assert html.count('srcset="') == 2 and 'width="800" height="400"' in html
+    assert '320w' in html and '640w' in html and '800w' in html
+
+
+def upload_without_derivatives(app, client, project_id, page_id):
+    """Uploads big.png to the page with derivatives off; returns the asset id."""
+    app.config['IMAGE_DERIVATIVES'] = False
+    client.post(f'/project/{project_id}/page/{page_id}/edit_content', data={
+        'hero.title': 'Hello', 'hero.image_file': (io.BytesIO(png_bytes(800, 400)), 'big.png'),
+    }, content_type='multipart/form-data')
+    app.config['IMAGE_DERIVATIVES'] = True
+    with app.app_context():
+        return ProjectAsset.query.filter_by(website_project_id=project_id).one().id
+
+
+def test_new_derivatives_re_render_only_pages_showing_the_image(app, client, make_site, monkeypatch):
+    pytest.importorskip('PIL')
+    project_id, _template_id, page_ids = make_site(pages=3, html=IMG_TEMPLATE_HTML)
+    asset_id = upload_without_derivatives(app, client, project_id, page_ids[1])
+
+    rendered = []
+    render = export.render_export_page
+    monkeypatch.setattr(export, 'render_export_page', lambda snapshot, page: rendered.append(page.id) or render(snapshot, page))
+    export_pages(app, project_id)
+    with app.app_context():
+        generate_image_derivatives(db.session.get(ProjectAsset, asset_id))
+
+    rendered.clear()
+    pages = export_pages(app, project_id)
+    assert rendered == [page_ids[1]]
+    assert b'srcset="' in pages['page-1.html']
+
+
+def test_preview_cache_follows_derivatives_from_another_process(app, client, make_site, monkeypatch):
+    pytest.importorskip('PIL')
+    project_id, _template_id, page_ids = make_site(pages=1, html=IMG_TEMPLATE_HTML)
+    asset_id = upload_without_derivatives(app, client, project_id, page_ids[0])
+    url = f'/preview/page/{page_ids[0]}'
+    assert 'srcset="' not in client.get(url).get_data(as_text=True)
+
+    # Generated by a worker in another process: nothing drops this process's cached preview.
+    monkeypatch.setattr(rendering, 'invalidate_rendered_pages', lambda **kwargs: 0)
+    with app.app_context():
+        generate_image_derivatives(db.session.get(ProjectAsset, asset_id))
+        assert db.session.get(WebsiteProject, project_id).image_version == 1
+    assert 'srcset="' in client.get(url).get_data(as_text=True)
@@ -0,0 +1,65 @@
+# ISG_Project/tests/test_injection_plan.py
+import io
+import json
+import zipfile
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import PageTemplate
+from internal_site_generator.rendering import (
+    NAVBAR_SLOT, HEAD_SLOT, compute_injection_plan, stitch_template_source, instrument_template_source,
+    injection_plan_is_current
+)
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('<html><head><title>T</title></head><body><!-- CUSTOM MARKER --><p>x</p></body></html>',
+     f'<html><head><title>T</title>{HEAD_SLOT}</head><body><!-- {NAVBAR_SLOT} --><p>x</p></body></html>'),
+    ('<html><HEAD></HEAD><body class="a"><p>x</p></body></html>',
+     f'<html><HEAD>{HEAD_SLOT}</HEAD><body class="a">{NAVBAR_SLOT}<p>x</p></body></html>'),
+    ('<p>fragment</p>', f'{HEAD_SLOT}{NAVBAR_SLOT}<p>fragment</p>'),
+    ('<head></head>CUSTOM MARKER and CUSTOM MARKER', f'<head>{HEAD_SLOT}</head>{NAVBAR_SLOT} and {NAVBAR_SLOT}'),
+])
+def test_plan_places_navbar_and_head_slots(source, expected):
+    plan = json.loads(json.dumps(compute_injection_plan(source))) # Survives storage as JSON
+    assert stitch_template_source(source, plan) == expected
+
+
+def test_stale_plan_is_ignored():
+    old_source = '<html><head></head><body><p>old</p></body></html>'
+    new_source = '<html><head></head><body><div>much longer new body</div></body></html>'
+    stale_plan_json = json.dumps(compute_injection_plan(old_source))
+    assert instrument_template_source(new_source, stale_plan_json) == \
+        stitch_template_source(new_source, compute_injection_plan(new_source))
+    assert instrument_template_source(new_source, 'not json') == instrument_template_source(new_source)
+
+
+def test_template_edit_stores_a_current_plan(app, client, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1)
+    response = client.post(f'/templates/edit/{template_id}', data={
+        'name': 'Edited', 'description': '',
+        'html_content': '<html><head></head><body><p>{{ body.text }}</p></body></html>',
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        template = db.session.get(PageTemplate, template_id)
+        assert injection_plan_is_current(template)
+        template.html_content += '<!-- changed outside the editor -->'
+        assert not injection_plan_is_current(template)
+
+
+def test_inserted_navbar_slot_is_empty_without_navbar(client, make_site):
+    html = '<html><head></head><body><h1>{{ hero.title }}</h1></body></html>'
+    project_id, _template_id, page_ids = make_site(pages=1, html=html)
+
+    preview = client.get(f'/preview/page/{page_ids[0]}').get_data(as_text=True)
+    assert 'CUSTOM MARKER' not in preview
+    assert '<body><h1>Page 0</h1>' in preview
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(f'/project/{project_id}/export_zip').data))
+    assert 'CUSTOM MARKER' not in archive.read('index.html').decode('utf-8')
+
+
+def test_template_nav_marker_kept_without_navbar(client, make_site):
+    _project_id, _template_id, page_ids = make_site(pages=1)
+    assert '<!-- CUSTOM MARKER -->' in client.get(f'/preview/page/{page_ids[0]}').get_data(as_text=True)
@@ -0,0 +1,60 @@
+# ISG_Project/tests/test_navbar_cache.py
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject, NavbarItem
+from internal_site_generator.rendering import get_navbar_html, navbar_fragment_cache
+
+from .conftest import count_statements
+
+
+def add_navbar(app, project_id, page_ids):
+    with app.app_context():
+        project = db.session.get(WebsiteProject, project_id)
+        for order, page_id in enumerate(page_ids):
+            db.session.add(NavbarItem(website_project_id=project_id, project_page_id=page_id,
+                                      link_text=f'Link {order}', order=order))
+        project.bump_navbar_version()
+        db.session.commit()
+
+
+def test_navbar_is_built_with_one_query_once_per_version(app, make_site):
+    project_id, _template_id, page_ids = make_site(pages=4)
+    add_navbar(app, project_id, page_ids)
+
+    with app.app_context():
+        project = db.session.get(WebsiteProject, project_id)
+        with count_statements(db.engine) as statements:
+            html = get_navbar_html(project)
+            assert get_navbar_html(project) == html
+        # Link text and slugs come from one join, not one lazy load per item.
+        assert len(statements) == 1
+        assert html.count('<li>') == 4
+        assert '<a href="page-3.html">Link 3</a>' in html
+
+
+def test_slug_change_rebuilds_navbar(app, client, make_site):
+    project_id, template_id, page_ids = make_site(pages=2)
+    add_navbar(app, project_id, page_ids)
+    with app.app_context():
+        assert 'page-1.html' in get_navbar_html(db.session.get(WebsiteProject, project_id))
+
+    response = client.post(f'/project/{project_id}/pages/edit/{page_ids[1]}', data={
+        'title': 'About', 'slug': 'about', 'page_template_id': str(template_id),
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        html = get_navbar_html(db.session.get(WebsiteProject, project_id))
+    assert '<a href="about.html">Link 1</a>' in html
+    assert 'page-1.html' not in html
+    # The fragment for the old navbar version was dropped, not left to age out.
+    assert len(navbar_fragment_cache) == 1
+
+
+def test_deleting_a_navbar_page_removes_its_link(app, client, make_site):
+    project_id, _template_id, page_ids = make_site(pages=3)
+    add_navbar(app, project_id, page_ids)
+
+    assert client.post(f'/project/{project_id}/pages/delete/{page_ids[2]}').status_code == 302
+    with app.app_context():
+        html = get_navbar_html(db.session.get(WebsiteProject, project_id))
+    assert 'page-2.html' not in html
+    assert html.count('<li>') == 2
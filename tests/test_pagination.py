@@ -0,0 +1,102 @@
+# ISG_Project/tests/test_pagination.py
+import re
+import html
+import itertools
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject, ProjectPage
+from internal_site_generator.pagination import paginate_keyset, encode_cursor, decode_cursor
+
+# Repeated titles: rows with equal names must still come in a stable (title, id) order.
+TITLES = ['b', 'a', 'c', 'a', 'b', 'a', 'd', 'c', 'a', 'e', 'b']
+
+_slugs = itertools.count()
+
+
+def add_pages(site, titles):
+    project_id, template_id = site
+    pages = [ProjectPage(title=title, slug=f'p{next(_slugs)}', website_project_id=project_id, page_template_id=template_id)
+             for title in titles]
+    db.session.add_all(pages)
+    db.session.commit()
+    return pages
+
+
+def page_of(project_id, per_page=3, after=None, before=None):
+    return paginate_keyset(ProjectPage.query.filter_by(website_project_id=project_id),
+                           (ProjectPage.title, ProjectPage.id), per_page, after=after, before=before)
+
+
+@pytest.fixture
+def site(make_site):
+    project_id, template_id, _page_ids = make_site(pages=0)
+    return project_id, template_id
+
+
+def test_forward_and_backward_walks_cover_every_row_once(app, site):
+    with app.app_context():
+        add_pages(site, TITLES)
+        expected = [(page.title, page.id) for page in
+                    ProjectPage.query.order_by(ProjectPage.title, ProjectPage.id)]
+
+        forward_pages = []
+        page = page_of(site[0])
+        assert not page.has_prev and page.prev_cursor is None
+        while True:
+            forward_pages.append([(p.title, p.id) for p in page.items])
+            if not page.has_next:
+                break
+            page = page_of(site[0], after=page.next_cursor)
+        assert [row for rows in forward_pages for row in rows] == expected
+        assert page.next_cursor is None and page.has_prev
+
+        backward_pages = []
+        while True:
+            backward_pages.append([(p.title, p.id) for p in page.items])
+            if not page.has_prev:
+                break
+            page = page_of(site[0], before=page.prev_cursor)
+        assert backward_pages[::-1] == forward_pages
+        assert page.has_next
+
+
+def test_rows_added_before_the_cursor_do_not_shift_later_pages(app, site):
+    with app.app_context():
+        add_pages(site, ['m', 'n', 'o', 'p', 'q', 'r'])
+        first = page_of(site[0])
+        assert [p.title for p in first.items] == ['m', 'n', 'o']
+        add_pages(site, ['a', 'b'])
+        assert [p.title for p in page_of(site[0], after=first.next_cursor).items] == ['p', 'q', 'r']
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', encode_cursor(['only one value']), encode_cursor({'a': 1})])
+def test_bad_cursor_starts_from_the_first_page(app, site, cursor):
+    assert decode_cursor(cursor, 2) is None
+    with app.app_context():
+        add_pages(site, TITLES)
+        assert [p.title for p in page_of(site[0], after=cursor).items] == ['a', 'a', 'a']
+
+
+@pytest.mark.parametrize('config_overrides', [{'LIST_PAGE_SIZE': 2}])
+def test_project_list_follows_next_and_previous_links(app, client):
+    with app.app_context():
+        db.session.add_all([WebsiteProject(project_name=f'Project {name}') for name in 'EDCBA'])
+        db.session.commit()
+
+    def names_and_links(url):
+        body = client.get(url).get_data(as_text=True)
+        names = re.findall(r'Project [A-E]', body)
+        links = {label: html.unescape(href) for href, label in
+                 re.findall(r'<a href="([^"]+)">(?:&[lr]saquo; )?(Next|Previous)', body)}
+        return sorted(set(names), key=names.index), links
+
+    names, links = names_and_links('/projects')
+    assert names == ['Project A', 'Project B'] and set(links) == {'Next'}
+    names, links = names_and_links(links['Next'])
+    assert names == ['Project C', 'Project D'] and set(links) == {'Next', 'Previous'}
+    next_url = links['Next']
+    names, links = names_and_links(links['Previous'])
+    assert names == ['Project A', 'Project B']
+    names, links = names_and_links(next_url)
+    assert names == ['Project E'] and set(links) == {'Previous'}
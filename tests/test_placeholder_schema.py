@@ -0,0 +1,63 @@
+# ISG_Project/tests/test_placeholder_schema.py
+import json
+
+from internal_site_generator import db, rendering
+from internal_site_generator.models import PageTemplate
+from internal_site_generator.rendering import (
+    PLACEHOLDER_SCHEMA_VERSION, build_placeholder_schema, get_placeholder_schema, placeholder_schema_is_current
+)
+
+SCHEMA_TEMPLATE_HTML = '''<html><head><title>{{ site.title }}</title></head><body>
+<img src="{{ hero.image }}"><a href="{{ cta.link }}">{{ cta.label | upper }}</a>
+<p>{{ about.paragraph }}</p>{% for item in items %}{{ item }}{% endfor %}
+</body></html>'''
+
+
+def test_schema_fields_and_kinds():
+    fields = build_placeholder_schema(SCHEMA_TEMPLATE_HTML)
+    assert [(f['key'], f['kind']) for f in fields] == [
+        ('about.paragraph', 'long_text'), ('cta.label', 'text'), ('cta.link', 'url'),
+        ('hero.image', 'image'), ('item', 'text'), ('site.title', 'text'),
+    ]
+    assert fields[0]['path'] == ['about', 'paragraph']
+
+
+def test_content_editor_uses_stored_schema(app, client, make_site, monkeypatch):
+    project_id, template_id, page_ids = make_site(pages=1, html=SCHEMA_TEMPLATE_HTML)
+    with app.app_context():
+        assert placeholder_schema_is_current(db.session.get(PageTemplate, template_id))
+
+    def no_parsing(_html):
+        raise AssertionError('template HTML was parsed on a request')
+
+    monkeypatch.setattr(rendering, 'extract_placeholders', no_parsing)
+    response = client.get(f'/project/{project_id}/page/{page_ids[0]}/edit_content')
+    assert response.status_code == 200
+    assert b'about.paragraph' in response.data
+
+
+def test_outdated_or_missing_schema_is_rebuilt(app, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1, html=SCHEMA_TEMPLATE_HTML)
+    expected = build_placeholder_schema(SCHEMA_TEMPLATE_HTML)
+    with app.app_context():
+        template = db.session.get(PageTemplate, template_id)
+        stored = json.loads(template.placeholder_schema_json)
+        assert stored['version'] == PLACEHOLDER_SCHEMA_VERSION and stored['fields'] == expected
+
+        template.placeholder_schema_json = json.dumps({**stored, 'version': PLACEHOLDER_SCHEMA_VERSION - 1, 'fields': []})
+        assert not placeholder_schema_is_current(template)
+        assert get_placeholder_schema(template) == expected
+
+        template.placeholder_schema_json = None
+        assert get_placeholder_schema(template) == expected
+
+
+def test_template_edit_refreshes_schema(app, client, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1)
+    client.post(f'/templates/edit/{template_id}', data={
+        'name': 'Edited', 'description': '', 'html_content': '<p>{{ new.field }}</p>',
+    })
+    with app.app_context():
+        template = db.session.get(PageTemplate, template_id)
+        assert [field['key'] for field in get_placeholder_schema(template)] == ['new.field']
+        assert placeholder_schema_is_current(template)
@@ -0,0 +1,73 @@
+# ISG_Project/tests/test_preview_cache.py
+import pytest
+
+from internal_site_generator import main
+
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    """Counts calls to render_final_page_html made by the preview route."""
+    calls = []
+    render = main.render_final_page_html
+
+    def counting_render(*args, **kwargs):
+        calls.append(kwargs.get('page_obj'))
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(main, 'render_final_page_html', counting_render)
+    return calls
+
+
+def test_repeat_preview_is_served_from_cache_and_revalidates(client, make_site, render_calls):
+    _project_id, _template_id, page_ids = make_site(pages=1)
+    url = f'/preview/page/{page_ids[0]}'
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+
+    second = client.get(url)
+    assert second.data == first.data
+    assert second.headers['ETag'] == etag
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert len(render_calls) == 1
+
+
+def test_edits_invalidate_cached_preview(client, make_site, render_calls):
+    project_id, template_id, page_ids = make_site(pages=2)
+    page_id = page_ids[0]
+    url = f'/preview/page/{page_id}'
+
+    def preview():
+        response = client.get(url)
+        assert response.status_code == 200
+        return response.get_data(as_text=True), response.headers['ETag']
+
+    html, etag = preview()
+    assert 'Page 0' in html
+
+    client.post(f'/project/{project_id}/page/{page_id}/edit_content',
+                data={'hero.title': 'New title', 'body.text': 'Hello'})
+    html, new_etag = preview()
+    assert 'New title' in html and new_etag != etag
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+    client.post(f'/templates/edit/{template_id}', data={
+        'name': 'Template edited', 'description': '',
+        'html_content': '<html><head></head><body><h2>{{ hero.title }}</h2></body></html>',
+    })
+    html, etag = preview()
+    assert '<h2>New title</h2>' in html
+
+    client.post(f'/projects/edit/{project_id}', data={'project_name': 'Site renamed', 'global_css': 'h2 { color: red; }'})
+    html, etag = preview()
+    assert 'h2 { color: red; }' in html
+
+    client.post(f'/project/{project_id}/navbar', data={
+        f'page_in_navbar_{page_ids[1]}': 'on', f'link_text_{page_ids[1]}': 'Second page', f'order_{page_ids[1]}': '1',
+    })
+    html, etag = preview()
+    assert '<a href="page-1.html">Second page</a>' in html
+
+    assert len(render_calls) == 5
@@ -0,0 +1,55 @@
+# ISG_Project/tests/test_query_counts.py
+import tempfile
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject, NavbarItem
+from internal_site_generator.export import build_project_archive
+from .conftest import clear_process_caches, count_statements
+
+
+@pytest.fixture
+def config_overrides():
+    return {'EXPORT_RENDER_CACHE': False}
+
+
+@pytest.fixture
+def sites(app, make_site):
+    """Two projects that differ only in page count (N and 2N), each with a navbar."""
+    sites = {}
+    for pages in (5, 10):
+        project_id, _template_id, page_ids = make_site(pages=pages)
+        with app.app_context():
+            for order, page_id in enumerate(page_ids):
+                db.session.add(NavbarItem(website_project_id=project_id, project_page_id=page_id,
+                                          link_text=f'Link {order}', order=order))
+            db.session.commit()
+        sites[pages] = (project_id, page_ids)
+    return sites
+
+
+def export_statements(app, project_id):
+    clear_process_caches()
+    with app.test_request_context():
+        project = db.session.get(WebsiteProject, project_id)
+        with count_statements(db.engine) as statements, tempfile.TemporaryFile() as out:
+            build_project_archive(out, project)
+        db.session.remove()
+    return statements
+
+
+def test_export_query_count_does_not_grow_with_pages(app, sites):
+    small, large = (export_statements(app, sites[n][0]) for n in (5, 10))
+    assert small and len(small) == len(large), (small, large)
+
+
+def test_preview_query_count_does_not_grow_with_pages(app, client, sites):
+    counts = []
+    for n in (5, 10):
+        _project_id, page_ids = sites[n]
+        clear_process_caches()
+        with app.app_context(), count_statements(db.engine) as statements:
+            response = client.get(f'/preview/page/{page_ids[-1]}')
+        assert response.status_code == 200 and b'Link 0' in response.data
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
@@ -0,0 +1,39 @@
+# ISG_Project/tests/test_query_plans.py
+import os
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from internal_site_generator import create_app, db
+from internal_site_generator.query_plans import check_query_plans
+from .conftest import make_config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture
+def migrated_app(tmp_path):
+    """An app on a database built by the Alembic migrations (not create_all), as in production."""
+    app = create_app(make_config(tmp_path))
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def scanning_queries(app):
+    with app.app_context():
+        return {name: scans for name, _plan, scans in check_query_plans() if scans}
+
+
+def test_hot_queries_use_indexes_on_migrated_database(migrated_app):
+    assert scanning_queries(migrated_app) == {}
+
+
+def test_dropped_index_is_reported(migrated_app):
+    with migrated_app.app_context():
+        db.session.execute(text('DROP INDEX ix_navbar_item_website_project_id_order'))
+        db.session.commit()
+    assert any('navbar' in name for name in scanning_queries(migrated_app))
@@ -0,0 +1,92 @@
+# ISG_Project/tests/test_render_memo.py
+import os
+import json
+import pytest
+
+from internal_site_generator import db, export
+from internal_site_generator.models import WebsiteProject, ProjectPage
+from internal_site_generator.export import export_render_cache_root
+
+from .conftest import export_pages
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """Ids of the pages actually rendered (not taken from the memo)."""
+    page_ids = []
+    render = export.render_export_page
+
+    def counting_render(snapshot, page):
+        page_ids.append(page.id)
+        return render(snapshot, page)
+
+    monkeypatch.setattr(export, 'render_export_page', counting_render)
+    return page_ids
+
+
+def test_unchanged_pages_are_reused_and_edits_re_render(app, make_site, rendered):
+    project_id, _template_id, page_ids = make_site(pages=4)
+    first = export_pages(app, project_id)
+    assert sorted(rendered) == sorted(page_ids)
+
+    rendered.clear()
+    assert export_pages(app, project_id) == first
+    assert rendered == []
+
+    with app.app_context():
+        db.session.get(ProjectPage, page_ids[2]).content_data_json = json.dumps({'hero.title': 'Edited', 'body.text': 'Hello'})
+        db.session.commit()
+    pages = export_pages(app, project_id)
+    assert rendered == [page_ids[2]]
+    assert b'Edited' in pages['page-2.html'] and pages['page-1.html'] == first['page-1.html']
+
+    # Project settings feed every page.
+    rendered.clear()
+    with app.app_context():
+        db.session.get(WebsiteProject, project_id).primary_color = '#abcdef'
+        db.session.commit()
+    export_pages(app, project_id)
+    assert sorted(rendered) == sorted(page_ids)
+
+
+def test_memo_is_pruned_to_the_latest_export(app, make_site, rendered):
+    project_id, _template_id, page_ids = make_site(pages=3)
+    export_pages(app, project_id)
+    with app.app_context():
+        db.session.get(ProjectPage, page_ids[0]).content_data_json = json.dumps({'hero.title': 'New', 'body.text': ''})
+        db.session.commit()
+        memo_dir = os.path.join(export_render_cache_root(), str(project_id))
+    export_pages(app, project_id)
+    assert len(os.listdir(memo_dir)) == 3
+
+
+def test_dashboard_counters_do_not_re_render(app, make_site, rendered):
+    project_id, template_id, page_ids = make_site(pages=2)
+    export_pages(app, project_id)
+
+    # A new page bumps page_count; only the new page is rendered.
+    rendered.clear()
+    with app.app_context():
+        page = ProjectPage(title='Extra', slug='extra', website_project_id=project_id, page_template_id=template_id,
+                           content_data_json=json.dumps({'hero.title': 'Extra', 'body.text': ''}))
+        db.session.add(page)
+        db.session.commit()
+        new_page_id = page.id
+        assert db.session.get(WebsiteProject, project_id).page_count == 3
+    export_pages(app, project_id)
+    assert rendered == [new_page_id]
+
+    rendered.clear()
+    with app.app_context():
+        db.session.get(WebsiteProject, project_id).asset_count += 1
+        db.session.commit()
+    export_pages(app, project_id)
+    assert rendered == []
+
+
+@pytest.mark.parametrize('config_overrides', [{'EXPORT_RENDER_CACHE': False}])
+def test_memo_can_be_turned_off(app, make_site, rendered):
+    project_id, _template_id, page_ids = make_site(pages=2)
+    export_pages(app, project_id)
+    export_pages(app, project_id)
+    assert len(rendered) == 4
@@ -0,0 +1,72 @@
+# ISG_Project/tests/test_serve_asset.py
+import io
+import os
+import gzip
+import hashlib
+
+from internal_site_generator import db
+from internal_site_generator.asset_storage import store_blob, add_project_asset_for_blob
+
+PNG_DATA = os.urandom(5000)
+SVG_DATA = b'<svg xmlns="http://www.w3.org/2000/svg">' + b'<g></g>' * 400 + b'</svg>'
+
+
+def add_asset(app, project_id, data, filename):
+    with app.app_context():
+        asset = add_project_asset_for_blob(project_id, 'image', store_blob(io.BytesIO(data)), filename)
+        db.session.commit()
+        return f'/uploads/{project_id}/images/{asset.stored_filename}'
+
+
+def test_blob_assets_are_immutable_and_support_ranges(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=0)
+    url = add_asset(app, project_id, PNG_DATA, 'photo.png')
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.data == PNG_DATA
+    assert response.mimetype == 'image/png'
+    assert response.headers['ETag'] == f'"{hashlib.sha256(PNG_DATA).hexdigest()}"'
+    cache_control = response.cache_control
+    assert cache_control.private and cache_control.immutable and cache_control.max_age == 365 * 24 * 60 * 60
+
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    partial = client.get(url, headers={'Range': 'bytes=100-199'})
+    assert partial.status_code == 206 and partial.data == PNG_DATA[100:200]
+    assert partial.headers['Content-Range'] == f'bytes 100-199/{len(PNG_DATA)}'
+
+
+def test_legacy_files_revalidate(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=0)
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], str(project_id), 'images')
+    os.makedirs(folder)
+    with open(os.path.join(folder, 'hand-named.png'), 'wb') as f:
+        f.write(PNG_DATA)
+
+    response = client.get(f'/uploads/{project_id}/images/hand-named.png')
+    assert response.status_code == 200 and response.data == PNG_DATA
+    assert response.cache_control.no_cache and not response.cache_control.immutable
+    assert client.get(f'/uploads/{project_id}/images/missing.png').status_code == 404
+    assert client.get(f'/uploads/{project_id}/secrets/hand-named.png').status_code == 404
+
+
+def test_text_assets_are_compressed_per_accept_encoding(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=0)
+    url = add_asset(app, project_id, SVG_DATA, 'logo.svg')
+
+    encoded = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert encoded.content_encoding == 'gzip' and gzip.decompress(encoded.data) == SVG_DATA
+    assert 'Accept-Encoding' in encoded.vary
+    assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': encoded.headers['ETag']}).status_code == 304
+    plain = client.get(url)
+    assert plain.content_encoding is None and plain.data == SVG_DATA
+
+
+def test_x_accel_redirect_hands_the_file_to_nginx(app, client, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=0)
+    url = add_asset(app, project_id, PNG_DATA, 'photo.png')
+    app.config['ASSET_X_ACCEL_REDIRECT_PREFIX'] = '/_protected_uploads/'
+
+    response = client.get(url)
+    sha256 = hashlib.sha256(PNG_DATA).hexdigest()
+    assert response.headers['X-Accel-Redirect'] == f'/_protected_uploads/blobs/{sha256[:2]}/{sha256}'
+    assert response.data == b'' and response.mimetype == 'image/png'
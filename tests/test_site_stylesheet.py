@@ -0,0 +1,63 @@
+# ISG_Project/tests/test_site_stylesheet.py
+import io
+import re
+import zipfile
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject
+from internal_site_generator.rendering import minify_css, build_site_stylesheet
+from internal_site_generator.export import build_project_archive
+
+
+@pytest.mark.parametrize('css, expected', [
+    # Space before ':' is kept: it cannot be told apart from a descendant selector (`a :hover`).
+    ('a  {\n  color : red ;\n  margin: 0;\n}\n', 'a{color :red;margin:0}'),
+    ('/* gone */ .a/**/.b { x: 1 }', '.a.b{x:1}'),
+    ('/*! License */\nb { y: 2; }', '/*! License */ b{y:2}'),
+    ('a :hover { content: "  ;}  /* kept */ "; }', 'a :hover{content:"  ;}  /* kept */ "}'),
+    ('div > p + span { width: calc(100% - 2px) }', 'div > p + span{width:calc(100% - 2px)}'),
+])
+def test_minify_css(css, expected):
+    assert minify_css(css) == expected
+
+
+def test_stylesheet_is_named_by_its_content():
+    project = WebsiteProject(project_name='Styled', primary_color='#123456', global_css='p { margin: 0; }')
+    name, data = build_site_stylesheet(project)
+    assert re.fullmatch(r'site\.[0-9a-f]{12}\.css', name)
+    assert data == b':root{--theme-primary-color:#123456}p{margin:0}'
+    project.global_css = 'p { margin: 1px; }'
+    assert build_site_stylesheet(project)[0] != name
+    assert build_site_stylesheet(WebsiteProject(project_name='Bare')) is None
+
+
+def export_archive(app, project_id):
+    with app.test_request_context():
+        out = io.BytesIO()
+        build_project_archive(out, db.session.get(WebsiteProject, project_id))
+    return zipfile.ZipFile(out)
+
+
+def test_export_pages_link_one_shared_stylesheet(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=3)
+    zf = export_archive(app, project_id)
+
+    stylesheets = [name for name in zf.namelist() if name.endswith('.css')]
+    assert len(stylesheets) == 1 and stylesheets[0].startswith('assets/css/site.')
+    assert b'--theme-primary-color:#112233' in zf.read(stylesheets[0])
+    for page in ['index.html', 'page-1.html', 'page-2.html']:
+        html = zf.read(page).decode()
+        assert f'<link rel="stylesheet" id="global-project-css" href="{stylesheets[0]}">' in html
+        assert '<style' not in html
+
+
+def test_project_without_css_exports_no_stylesheet(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    with app.app_context():
+        project = db.session.get(WebsiteProject, project_id)
+        project.global_css, project.primary_color = None, None
+        db.session.commit()
+    zf = export_archive(app, project_id)
+    assert not [name for name in zf.namelist() if name.endswith('.css')]
+    assert 'stylesheet' not in zf.read('index.html').decode()
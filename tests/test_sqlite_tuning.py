@@ -0,0 +1,42 @@
+# ISG_Project/tests/test_sqlite_tuning.py
+import pytest
+from sqlalchemy import text
+
+from internal_site_generator import db
+from internal_site_generator.sqlite_tuning import pragma_statements
+
+
+def test_pragma_statements():
+    assert pragma_statements({'journal_mode': 'WAL', 'busy_timeout': 5000, 'cache_size': -2000, 'mmap_size': None}) == [
+        'PRAGMA journal_mode = WAL', 'PRAGMA busy_timeout = 5000', 'PRAGMA cache_size = -2000',
+    ]
+    assert pragma_statements(None) == []
+
+
+@pytest.mark.parametrize('pragmas', [
+    {'journal_mode': 'WAL; DROP TABLE user'}, {'busy timeout': 1}, {'Journal_Mode': 'WAL'}, {'cache_size': '1.5'},
+])
+def test_unsafe_pragmas_are_rejected(pragmas):
+    with pytest.raises(ValueError):
+        pragma_statements(pragmas)
+
+
+def pragma(name):
+    with db.engine.connect() as connection:
+        return connection.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_every_connection_gets_the_configured_pragmas(app):
+    with app.app_context():
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('busy_timeout') == app.config['SQLITE_PRAGMAS']['busy_timeout']
+        assert pragma('synchronous') == 1 # NORMAL
+        db.engine.dispose() # New pooled connections are tuned as well
+        assert pragma('cache_size') == app.config['SQLITE_PRAGMAS']['cache_size']
+
+
+@pytest.mark.parametrize('config_overrides', [{'SQLITE_PRAGMAS': {}}])
+def test_no_pragmas_leaves_sqlite_defaults(app):
+    with app.app_context():
+        assert pragma('journal_mode') == 'delete'
+        assert pragma('synchronous') == 2 # FULL
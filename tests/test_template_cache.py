@@ -0,0 +1,30 @@
+# ISG_Project/tests/test_template_cache.py
+from internal_site_generator import db
+from internal_site_generator.models import PageTemplate
+from internal_site_generator.rendering import get_compiled_template, compiled_template_cache, page_template_name
+
+RAW_HTML = '<html><head></head><body><p>{{ body.text }}</p></body></html>'
+
+
+def test_stored_template_compiles_once_per_version(app, make_site):
+    _project_id, template_id, _page_ids = make_site(pages=1)
+    with app.test_request_context():
+        template = db.session.get(PageTemplate, template_id)
+        compiled = get_compiled_template(template.html_content, template)
+        assert get_compiled_template(template.html_content, template) is compiled
+        old_name = page_template_name(template)
+
+        template.html_content = '<html><head></head><body><p>v2 {{ body.text }}</p></body></html>'
+        db.session.commit()
+        assert page_template_name(template) != old_name
+        recompiled = get_compiled_template(template.html_content, template)
+        assert recompiled is not compiled
+        assert 'v2 Hi' in recompiled.render(body={'text': 'Hi'}, _isg_navbar_html='', _isg_head_html='')
+
+
+def test_raw_html_is_cached_by_content(app):
+    with app.test_request_context():
+        compiled = get_compiled_template(RAW_HTML)
+        assert get_compiled_template(str(RAW_HTML)) is compiled
+        assert get_compiled_template(RAW_HTML + ' ') is not compiled
+        assert len(compiled_template_cache) == 2
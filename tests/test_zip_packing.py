@@ -0,0 +1,74 @@
+# ISG_Project/tests/test_zip_packing.py
+import io
+import os
+import random
+import zipfile
+import pytest
+
+from internal_site_generator import db
+from internal_site_generator.models import WebsiteProject
+from internal_site_generator.asset_storage import store_blob, add_project_asset_for_blob
+from internal_site_generator.export import build_project_archive
+
+
+def export_archive(app, project_id):
+    with app.test_request_context():
+        out = io.BytesIO()
+        build_project_archive(out, db.session.get(WebsiteProject, project_id))
+    return zipfile.ZipFile(out)
+
+
+def add_assets(app, project_id):
+    with app.app_context():
+        names = {}
+        for label, data, filename in [('png', os.urandom(4096), 'photo.png'), ('svg', b'<svg></svg>' * 200, 'logo.svg')]:
+            names[label] = add_project_asset_for_blob(project_id, 'image', store_blob(io.BytesIO(data)), filename).stored_filename
+        db.session.commit()
+        return names
+
+
+def test_compressed_formats_are_stored_and_text_is_deflated(app, make_site):
+    project_id, _template_id, _page_ids = make_site(pages=2)
+    names = add_assets(app, project_id)
+    zf = export_archive(app, project_id)
+
+    assert zf.getinfo(f"assets/images/{names['png']}").compress_type == zipfile.ZIP_STORED
+    for name in ['index.html', 'manifest.json', f"assets/images/{names['svg']}"]:
+        assert zf.getinfo(name).compress_type == zipfile.ZIP_DEFLATED, name
+    svg = zf.getinfo(f"assets/images/{names['svg']}")
+    assert svg.compress_size < svg.file_size / 10
+    assert zf.testzip() is None
+
+
+@pytest.mark.parametrize('config_overrides', [{'EXPORT_STORED_EXTENSIONS': {'svg'}}])
+def test_level_and_stored_extensions_come_from_config(app, make_site):
+    words = random.Random(0).choices(['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta'], k=5000)
+    project_id, _template_id, _page_ids = make_site(pages=1, content={'hero.title': 'T', 'body.text': ' '.join(words)})
+    names = add_assets(app, project_id)
+    zf = export_archive(app, project_id)
+
+    assert zf.getinfo(f"assets/images/{names['svg']}").compress_type == zipfile.ZIP_STORED
+    assert zf.getinfo(f"assets/images/{names['png']}").compress_type == zipfile.ZIP_DEFLATED
+
+    sizes = {}
+    for level in (1, 9):
+        app.config['EXPORT_DEFLATE_LEVEL'] = level
+        sizes[level] = export_archive(app, project_id).getinfo('index.html').compress_size
+    assert sizes[1] > sizes[9]
+
+
+def test_copied_assets_use_the_configured_level(app, make_site):
+    words = random.Random(1).choices(['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta'], k=5000)
+    project_id, _template_id, _page_ids = make_site(pages=1)
+    with app.app_context():
+        svg = f"<svg><text>{' '.join(words)}</text></svg>".encode('utf-8')
+        name = add_project_asset_for_blob(project_id, 'image', store_blob(io.BytesIO(svg)), 'words.svg').stored_filename
+        db.session.commit()
+
+    sizes = {}
+    for level in (1, 9):
+        app.config['EXPORT_DEFLATE_LEVEL'] = level
+        zf = export_archive(app, project_id)
+        sizes[level] = zf.getinfo(f"assets/images/{name}").compress_size
+        assert zf.read(f"assets/images/{name}") == svg
+    assert sizes[1] > sizes[9]